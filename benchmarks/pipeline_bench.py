@@ -0,0 +1,219 @@
+"""
+Message Pipeline Benchmark
+Drives the real handlers (handle_text, check_media, handle_punishment) against
+in-memory stand-ins and reports throughput, p50/p99 latency and allocations.
+
+Usage:
+    python -m benchmarks.pipeline_bench [--messages 2000] [--words 3000] [--db-latency-ms 0]
+"""
+
+import os
+import sys
+import time
+import random
+import asyncio
+import logging
+import argparse
+import tracemalloc
+from types import SimpleNamespace
+from typing import Callable, List
+
+from telegram import Update
+from src.database import adb
+from src.inmemory import InMemoryDatabaseManager, RecordingBot
+from src.user_registry import user_registry
+from src.deletion_scheduler import deletion_scheduler
+from src.outbound import outbound
+from src.media_verdicts import media_verdicts
+from src.handlers import message_handler
+
+CHAT_ID = -1001234567890
+ADMIN_ID = 777
+
+# ==================== CORPORA ====================
+
+CLEAN_TEXTS = [
+    "سلام به همه دوستان، امروز جلسه ساعت ۵ برگزار میشه",
+    "کسی میدونه امتحان فردا از کدوم فصل هاست؟",
+    "ممنون از توضیحات خوبتون 🙏",
+    "Hello everyone, the meeting is moved to Monday.",
+    "Does anyone have the notes from yesterday's lecture?",
+    "عالی بود 👌 مرسی",
+    "I think the answer to question 3 is 42",
+    "برنامه هفته بعد رو کی اعلام میکنید؟",
+]
+
+LINK_TEXTS = [
+    "join now https://example.com/offer",
+    "کانال ما: t.me/spam_channel",
+    "visit www.cheap-stuff.ir",
+    "free gift at bit.ly/abc123",
+    "best deals on shop.net today",
+]
+
+OBFUSCATED_LINKS = [
+    "w w w . g o o g l e . c o m",
+    "g.o.o.g.l.e com",
+    "instagram . com / page",
+    "t . m e / channel",
+    "h t t p s : / / spam . xyz",
+    "yyyoutuube...com",
+]
+
+HIDDEN_WORDS = [
+    "ت.ب.ل.ی.غ ویژه",
+    "ف🔥ر🔥و🔥ش فوری",
+    "خ_ر_ی_د عمده",
+    "ک ر ی پ ت و رایگان",
+    "بییییت کوین",
+]
+
+MIXED = CLEAN_TEXTS * 6 + LINK_TEXTS + OBFUSCATED_LINKS + HIDDEN_WORDS
+
+PERSIAN_LETTERS = "ابپتثجچحخدذرزژسشصضطظعغفقکگلمنوهی"
+
+
+def synthetic_words(count: int, seed: int) -> List[str]:
+    """Random Persian-letter words to grow the banned list to a realistic size"""
+    rng = random.Random(seed)
+    return ["".join(rng.choice(PERSIAN_LETTERS) for _ in range(rng.randint(4, 8))) for _ in range(count)]
+
+
+# ==================== FAKE UPDATES ====================
+
+def make_update(bot, update_id: int, user_id: int, text: str = None, photo: bool = False) -> Update:
+    message = {
+        "message_id": update_id,
+        "date": int(time.time()),
+        "chat": {"id": CHAT_ID, "type": "supergroup", "title": "Benchmark"},
+        "from": {"id": user_id, "is_bot": False, "first_name": "user", "username": f"user{user_id}"},
+    }
+    if photo:
+        message["photo"] = [{"file_id": f"file{update_id}", "file_unique_id": f"uniq{update_id % 50}", "width": 90, "height": 90}]
+        if text: message["caption"] = text
+    else:
+        message["text"] = text
+    return Update.de_json({"update_id": update_id, "message": message}, bot)
+
+
+# ==================== RUNNER ====================
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def measure(name: str, call: Callable, updates: List[Update], alloc_samples: int) -> dict:
+    """Time every call, then re-run a prefix under tracemalloc for allocation figures"""
+    timings = []
+    started = time.perf_counter()
+    for update in updates:
+        t0 = time.perf_counter()
+        await call(update)
+        timings.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - started
+
+    peaks = []
+    blocks_before = sys.getallocatedblocks()
+    tracemalloc.start()
+    for update in updates[:alloc_samples]:
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        await call(update)
+        peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    tracemalloc.stop()
+    retained = (sys.getallocatedblocks() - blocks_before) / max(1, alloc_samples)
+
+    return {
+        "name": name,
+        "messages": len(updates),
+        "throughput": len(updates) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(timings, 50) * 1000,
+        "p99_ms": percentile(timings, 99) * 1000,
+        "alloc_kib": sum(peaks) / max(1, len(peaks)) / 1024,
+        "retained_blocks": retained,
+    }
+
+
+def report(results: List[dict]):
+    print(f"\n{'scenario':<28}{'msgs':>7}{'msg/s':>10}{'p50 ms':>9}{'p99 ms':>9}{'KiB/msg':>9}{'blocks/msg':>12}")
+    print("-" * 84)
+    for r in results:
+        print(f"{r['name']:<28}{r['messages']:>7}{r['throughput']:>10.0f}{r['p50_ms']:>9.3f}"
+              f"{r['p99_ms']:>9.3f}{r['alloc_kib']:>9.1f}{r['retained_blocks']:>12.1f}")
+
+
+async def run(args) -> List[dict]:
+    bot = RecordingBot(admins={CHAT_ID: [ADMIN_ID]}, record=False)
+    database = InMemoryDatabaseManager(allowed_groups=[CHAT_ID], latency=args.db_latency_ms / 1000)
+    for word in synthetic_words(args.words, args.seed):
+        database.words.append(word)
+    adb.manager = database
+
+    context = SimpleNamespace(bot=bot, args=[])
+    rng = random.Random(args.seed)
+    ids = iter(range(1, 10_000_000))
+
+    def batch(texts: List[str], photo: bool = False) -> List[Update]:
+        return [make_update(bot, next(ids), rng.randint(1, 5000), rng.choice(texts), photo) for _ in range(args.messages)]
+
+    async def text_call(update):
+        await message_handler.handle_text(update, context)
+
+    async def media_call(update):
+        await message_handler.check_media(update, context)
+
+    async def punish_call(update):
+        await message_handler.handle_punishment(update, context, update.effective_user, "benchmark")
+
+    user_registry.start()
+    await deletion_scheduler.start(outbound)
+    outbound.start(bot)
+    await text_call(make_update(bot, next(ids), 1, CLEAN_TEXTS[0]))  # warm caches/matcher
+
+    scenarios = [
+        ("handle_text: clean", text_call, batch(CLEAN_TEXTS)),
+        ("handle_text: links", text_call, batch(LINK_TEXTS)),
+        ("handle_text: obfuscated", text_call, batch(OBFUSCATED_LINKS)),
+        ("handle_text: hidden words", text_call, batch(HIDDEN_WORDS)),
+        ("handle_text: mixed", text_call, batch(MIXED)),
+        ("handle_text: flood", text_call, [make_update(bot, next(ids), 4242, rng.choice(CLEAN_TEXTS)) for _ in range(args.messages)]),
+        ("check_media", media_call, batch(["", "caption"], photo=True)),
+        ("handle_punishment", punish_call, batch(CLEAN_TEXTS)),
+    ]
+
+    results = []
+    for name, call, updates in scenarios:
+        results.append(await measure(name, call, updates, min(args.alloc_samples, len(updates))))
+
+    # Same files again once the owner has decided on them (benchmark photos reuse 50 file_unique_ids)
+    for n in range(50):
+        await media_verdicts.record(CHAT_ID, f"uniq{n}", n % 5 != 0)
+    updates = batch(["", "caption"], photo=True)
+    results.append(await measure("check_media: known files", media_call, updates, min(args.alloc_samples, len(updates))))
+
+    await user_registry.stop()
+    await outbound.stop()
+    await deletion_scheduler.stop()
+    for task in asyncio.all_tasks():
+        if task is not asyncio.current_task(): task.cancel()
+
+    print(f"\nbanned words: {len(database.words)} | db round trips: {database.calls} | bot calls: {sum(bot.counts.values())}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the message pipeline with in-memory stand-ins")
+    parser.add_argument("--messages", type=int, default=2000, help="messages per scenario")
+    parser.add_argument("--words", type=int, default=3000, help="synthetic banned words added to the defaults")
+    parser.add_argument("--db-latency-ms", type=float, default=0.0, help="simulated database round trip")
+    parser.add_argument("--alloc-samples", type=int, default=300, help="messages re-run under tracemalloc")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "CRITICAL"))
+    report(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+-- Schema updates for the Supabase database
+-- Run in the Supabase SQL editor, top to bottom. Every statement is idempotent.
+
+-- ==================== Users: write-behind registration ====================
+-- Bulk upserts only send user_id/username, so new rows need a warn_count default.
+ALTER TABLE users ALTER COLUMN warn_count SET DEFAULT 0;
+
+-- ==================== Warns: atomic increment ====================
+-- One round trip, no lost increments: creates the user if needed and returns the new count.
+CREATE OR REPLACE FUNCTION increment_warn(p_user_id BIGINT)
+RETURNS INTEGER
+LANGUAGE sql
+AS $$
+  INSERT INTO users (user_id, username, warn_count)
+  VALUES (p_user_id, 'unknown', 1)
+  ON CONFLICT (user_id) DO UPDATE SET warn_count = COALESCE(users.warn_count, 0) + 1
+  RETURNING warn_count;
+$$;
+
+-- ==================== Approval queue ====================
+-- Media forwarded to the owner and waiting for "تایید" / "رد" (survives restarts).
+CREATE TABLE IF NOT EXISTS pending_approvals (
+  message_id BIGINT PRIMARY KEY,   -- forwarded message ID in the owner chat
+  chat_id BIGINT NOT NULL,
+  user_id BIGINT NOT NULL,
+  created_at BIGINT NOT NULL       -- epoch seconds
+);
+CREATE INDEX IF NOT EXISTS pending_approvals_created_at_idx ON pending_approvals (created_at);
+
+-- ==================== Scheduled deletions ====================
+-- Flash messages still waiting to be deleted when the bot shut down.
+CREATE TABLE IF NOT EXISTS scheduled_deletions (
+  chat_id BIGINT NOT NULL,
+  message_id BIGINT NOT NULL,
+  due_at DOUBLE PRECISION NOT NULL,   -- epoch seconds
+  PRIMARY KEY (chat_id, message_id)
+);
+
+-- ==================== Banned words: per-chat lists ====================
+-- chat_id NULL = global word inherited by every group, otherwise the word only applies to that group.
+ALTER TABLE banned_words ADD COLUMN IF NOT EXISTS chat_id BIGINT;
+ALTER TABLE banned_words DROP CONSTRAINT IF EXISTS banned_words_word_key;
+CREATE UNIQUE INDEX IF NOT EXISTS banned_words_scope_word_idx ON banned_words (COALESCE(chat_id, 0), word);
+CREATE INDEX IF NOT EXISTS banned_words_chat_id_idx ON banned_words (chat_id) WHERE chat_id IS NOT NULL;
+
+-- ==================== Banned words: version stamps ====================
+-- Every change to banned_words bumps its scope's version (scope = chat_id, 0 = global list).
+-- Instances poll "version > last seen" and only reload what changed.
+CREATE SEQUENCE IF NOT EXISTS banned_words_version_seq;
+CREATE TABLE IF NOT EXISTS banned_words_versions (
+  scope BIGINT PRIMARY KEY,
+  version BIGINT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS banned_words_versions_version_idx ON banned_words_versions (version);
+
+CREATE OR REPLACE FUNCTION bump_banned_words_version()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  IF TG_OP IN ('INSERT', 'UPDATE') THEN
+    INSERT INTO banned_words_versions (scope, version)
+    VALUES (COALESCE(NEW.chat_id, 0), nextval('banned_words_version_seq'))
+    ON CONFLICT (scope) DO UPDATE SET version = EXCLUDED.version;
+  END IF;
+  IF TG_OP IN ('DELETE', 'UPDATE') THEN
+    INSERT INTO banned_words_versions (scope, version)
+    VALUES (COALESCE(OLD.chat_id, 0), nextval('banned_words_version_seq'))
+    ON CONFLICT (scope) DO UPDATE SET version = EXCLUDED.version;
+  END IF;
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS banned_words_version_trigger ON banned_words;
+CREATE TRIGGER banned_words_version_trigger
+AFTER INSERT OR UPDATE OR DELETE ON banned_words
+FOR EACH ROW EXECUTE FUNCTION bump_banned_words_version();
+
+-- ==================== Media verdicts ====================
+-- Owner's "تایید" / "رد" per file (file_unique_id), so the same media is not forwarded again.
+-- scope = chat_id with MEDIA_VERDICT_PER_CHAT=1, otherwise 0 (applies to every group).
+ALTER TABLE pending_approvals ADD COLUMN IF NOT EXISTS file_unique_id TEXT;
+CREATE TABLE IF NOT EXISTS media_verdicts (
+  scope BIGINT NOT NULL,
+  file_unique_id TEXT NOT NULL,
+  approved BOOLEAN NOT NULL,
+  decided_at BIGINT NOT NULL,      -- epoch seconds
+  PRIMARY KEY (scope, file_unique_id)
+);
+CREATE INDEX IF NOT EXISTS media_verdicts_decided_at_idx ON media_verdicts (decided_at);
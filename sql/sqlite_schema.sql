@@ -0,0 +1,89 @@
+-- Schema for the embedded SQLite backend (DB_BACKEND=sqlite)
+-- Applied by SQLiteDatabaseManager on connect. Every statement is idempotent.
+-- Same tables as the Supabase database (see schema_updates.sql).
+
+-- ==================== Users ====================
+CREATE TABLE IF NOT EXISTS users (
+  user_id INTEGER PRIMARY KEY,
+  username TEXT,
+  warn_count INTEGER NOT NULL DEFAULT 0
+);
+-- /warn @username and friends look users up by name
+CREATE INDEX IF NOT EXISTS users_username_idx ON users (username);
+
+-- ==================== License ====================
+-- chat_id is the rowid, so the license lookup is a single b-tree probe
+CREATE TABLE IF NOT EXISTS allowed_groups (
+  chat_id INTEGER PRIMARY KEY,
+  note TEXT
+);
+
+-- ==================== Banned words ====================
+-- chat_id NULL = global word inherited by every group, otherwise the word only applies to that group.
+CREATE TABLE IF NOT EXISTS banned_words (
+  id INTEGER PRIMARY KEY,
+  word TEXT NOT NULL,
+  chat_id INTEGER
+);
+CREATE UNIQUE INDEX IF NOT EXISTS banned_words_scope_word_idx ON banned_words (COALESCE(chat_id, 0), word);
+CREATE INDEX IF NOT EXISTS banned_words_chat_id_idx ON banned_words (chat_id);
+
+-- ==================== Banned words: version stamps ====================
+-- Every change to banned_words bumps its scope's version (scope = chat_id, 0 = global list).
+CREATE TABLE IF NOT EXISTS banned_words_versions (
+  scope INTEGER PRIMARY KEY,
+  version INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS banned_words_versions_version_idx ON banned_words_versions (version);
+
+CREATE TRIGGER IF NOT EXISTS banned_words_insert_version AFTER INSERT ON banned_words
+BEGIN
+  INSERT INTO banned_words_versions (scope, version)
+  VALUES (COALESCE(NEW.chat_id, 0), (SELECT COALESCE(MAX(version), 0) + 1 FROM banned_words_versions))
+  ON CONFLICT (scope) DO UPDATE SET version = excluded.version;
+END;
+
+CREATE TRIGGER IF NOT EXISTS banned_words_delete_version AFTER DELETE ON banned_words
+BEGIN
+  INSERT INTO banned_words_versions (scope, version)
+  VALUES (COALESCE(OLD.chat_id, 0), (SELECT COALESCE(MAX(version), 0) + 1 FROM banned_words_versions))
+  ON CONFLICT (scope) DO UPDATE SET version = excluded.version;
+END;
+
+CREATE TRIGGER IF NOT EXISTS banned_words_update_version AFTER UPDATE ON banned_words
+BEGIN
+  INSERT INTO banned_words_versions (scope, version)
+  VALUES (COALESCE(OLD.chat_id, 0), (SELECT COALESCE(MAX(version), 0) + 1 FROM banned_words_versions))
+  ON CONFLICT (scope) DO UPDATE SET version = excluded.version;
+  INSERT INTO banned_words_versions (scope, version)
+  VALUES (COALESCE(NEW.chat_id, 0), (SELECT COALESCE(MAX(version), 0) + 1 FROM banned_words_versions))
+  ON CONFLICT (scope) DO UPDATE SET version = excluded.version;
+END;
+
+-- ==================== Approval queue ====================
+CREATE TABLE IF NOT EXISTS pending_approvals (
+  message_id INTEGER PRIMARY KEY,   -- forwarded message ID in the owner chat
+  chat_id INTEGER NOT NULL,
+  user_id INTEGER NOT NULL,
+  file_unique_id TEXT,
+  created_at INTEGER NOT NULL       -- epoch seconds
+);
+CREATE INDEX IF NOT EXISTS pending_approvals_created_at_idx ON pending_approvals (created_at);
+
+-- ==================== Media verdicts ====================
+CREATE TABLE IF NOT EXISTS media_verdicts (
+  scope INTEGER NOT NULL,
+  file_unique_id TEXT NOT NULL,
+  approved INTEGER NOT NULL,        -- 0 / 1
+  decided_at INTEGER NOT NULL,      -- epoch seconds
+  PRIMARY KEY (scope, file_unique_id)
+);
+CREATE INDEX IF NOT EXISTS media_verdicts_decided_at_idx ON media_verdicts (decided_at);
+
+-- ==================== Scheduled deletions ====================
+CREATE TABLE IF NOT EXISTS scheduled_deletions (
+  chat_id INTEGER NOT NULL,
+  message_id INTEGER NOT NULL,
+  due_at REAL NOT NULL,             -- epoch seconds
+  PRIMARY KEY (chat_id, message_id)
+);
@@ -0,0 +1,92 @@
+"""
+Admin Roster Cache
+Per-chat set of administrator IDs shared by every handler
+"""
+
+import os
+import asyncio
+import logging
+from typing import Dict, Set
+from telegram import ChatMember, ChatMemberUpdated
+from src.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+ADMIN_STATUSES = {ChatMember.ADMINISTRATOR, ChatMember.OWNER}
+
+
+class AdminRoster:
+    """
+    Caches each chat's administrators.
+
+    A roster is loaded with one get_chat_administrators call, patched in place
+    by ChatMemberUpdated updates and reloaded once its TTL expires. A failed
+    load is cached as an empty roster for ADMIN_CACHE_NEGATIVE_TTL seconds,
+    so a chat the bot cannot query is not asked again on every message.
+    """
+
+    def __init__(self, ttl: float = None, max_chats: int = 5000, negative_ttl: float = None):
+        ttl = ttl if ttl is not None else float(os.getenv("ADMIN_CACHE_TTL", "600"))
+        self.negative_ttl = negative_ttl if negative_ttl is not None else float(os.getenv("ADMIN_CACHE_NEGATIVE_TTL", "30"))
+        self._rosters = TTLCache(ttl=ttl, max_size=max_chats)
+        self._locks: Dict[int, asyncio.Lock] = {}
+
+    async def get_admins(self, bot, chat_id: int) -> Set[int]:
+        """
+        Get the admin user IDs of a chat, loading them on a cache miss.
+
+        Args:
+            bot: Telegram bot used for get_chat_administrators
+            chat_id: Group chat ID
+
+        Returns:
+            Set of admin user IDs (empty if the roster could not be loaded)
+        """
+        admins = self._rosters.get(chat_id)
+        if admins is not None:
+            return admins
+
+        # One request per chat even if many messages miss at the same time
+        lock = self._locks.setdefault(chat_id, asyncio.Lock())
+        async with lock:
+            admins = self._rosters.get(chat_id)
+            if admins is not None:
+                return admins
+            try:
+                members = await bot.get_chat_administrators(chat_id)
+                admins = {member.user.id for member in members}
+                self._rosters.set(chat_id, admins)
+                logger.info(f"Loaded {len(admins)} admins for chat {chat_id}")
+            except Exception as e:
+                logger.error(f"Error loading admins for chat {chat_id}: {e}")
+                admins = set()
+                self._rosters.set(chat_id, admins, self.negative_ttl)
+
+            # Only once the result is cached: callers queued on this lock read it instead of calling again
+            self._locks.pop(chat_id, None)
+            return admins
+
+    async def is_admin(self, bot, chat_id: int, user_id: int) -> bool:
+        """Check whether user_id administers chat_id"""
+        return user_id in await self.get_admins(bot, chat_id)
+
+    def apply_update(self, member_update: ChatMemberUpdated):
+        """Patch a loaded roster from a ChatMemberUpdated (promotion/demotion/leave)"""
+        admins = self._rosters.get(member_update.chat.id)
+        if admins is None: return
+
+        member = member_update.new_chat_member
+        if member.status in ADMIN_STATUSES:
+            admins.add(member.user.id)
+        else:
+            admins.discard(member.user.id)
+
+    def invalidate(self, chat_id: int):
+        """Force a reload on the next lookup"""
+        self._rosters.invalidate(chat_id)
+
+    def stats(self) -> dict:
+        return self._rosters.stats()
+
+
+admin_roster = AdminRoster()
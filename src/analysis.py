@@ -0,0 +1,146 @@
+"""
+Message Analysis
+Text forms of a message computed once and shared by every filter
+"""
+
+import re
+import unicodedata
+from typing import Dict, Optional, Sequence
+
+_REPEATS = re.compile(r'(.)\1+')
+_LATIN_REPEATS = re.compile(rb'([a-z])\1+')
+
+# bytes.translate table that deletes everything except a-z
+_NON_LATIN_BYTES = bytes(c for c in range(256) if not (ord('a') <= c <= ord('z')))
+
+# Arabic letters that look like (and are typed instead of) Persian ones
+CONFUSABLES = {
+    "ي": "ی", "ى": "ی", "ئ": "ی",
+    "ك": "ک",
+    "ة": "ه", "ۀ": "ه",
+    "أ": "ا", "إ": "ا", "ٱ": "ا",
+    "ؤ": "و",
+}
+
+TATWEEL = "ـ"  # ـ stretches letters, تـبـلـیـغ
+
+
+def _fold_char(ch: str) -> Optional[str]:
+    """What one character becomes in the skeleton (None = dropped)"""
+    folded = []
+    # NFKC turns fullwidth / math / presentation forms into plain letters and digits
+    for c in unicodedata.normalize("NFKC", ch).lower():
+        if c == TATWEEL or unicodedata.category(c) == "Mn": continue  # diacritics
+        if c.isdecimal():
+            folded.append(str(unicodedata.decimal(c)))  # ۱ / ١ / 𝟏 -> 1
+        elif c.isalnum():
+            folded.append(CONFUSABLES.get(c, c))
+    return "".join(folded) or None
+
+
+# Ranges in the translate table. Characters that stay the same get an entry too,
+# since a missing key costs str.translate a raised and swallowed KeyError; the
+# big CJK and Hangul letter blocks and the rest of the astral planes are left
+# to _FoldCache.
+_TABLE_RANGES = (
+    range(0x0000, 0x3400),
+    range(0xA000, 0xAC00),
+    range(0xD7B0, 0xD800),
+    range(0xE000, 0x10000),
+    range(0x1D400, 0x1D800),   # mathematical letters and digits
+    range(0x1F000, 0x1FB00),   # emoji and pictographs
+)
+
+
+def _build_table() -> Dict[int, Optional[str]]:
+    return {code: _fold_char(chr(code)) for codes in _TABLE_RANGES for code in codes}
+
+
+_FOLD = _build_table()
+
+# Anything the first pass may have left untouched sits at U+3400 or above
+_OUTSIDE_TABLE = re.compile(r'[^\x00-\u33ff]')
+
+
+class _FoldCache(dict):
+    """Second-pass translate table, folding code points outside _FOLD on first sight"""
+
+    max_size = 65536
+
+    def __missing__(self, code: int) -> Optional[str]:
+        folded = chr(code) if code in _FOLD else _fold_char(chr(code))  # _FOLD ones are folded already
+        if len(self) < self.max_size:
+            self[code] = folded
+        return folded
+
+
+_FOLD_REST = _FoldCache()
+
+
+def normalize_text(text: str) -> str:
+    """
+    Skeleton used for evasion-resistant matching (ت.ب.ل.ي.غ -> تبلیغ).
+
+    One translate pass drops symbols, emoji, zero-width characters, tatweel
+    and diacritics, lowercases, folds compatibility forms, Arabic confusables
+    and digit variants. Text with characters outside the table (CJK, tag
+    characters, variation selectors, ...) gets a second pass that keeps
+    only letters and digits. Repeated letters are then collapsed.
+    """
+    if not text: return ""
+    clean = text.translate(_FOLD)
+    if not clean.isascii() and _OUTSIDE_TABLE.search(clean):
+        clean = clean.translate(_FOLD_REST)
+    return _REPEATS.sub(r'\1', clean)
+
+
+def latin_skeleton(text: str) -> str:
+    """Keep only a-z and collapse repeated letters (w w w . g o o g l e -> wgogle)"""
+    letters = text.encode('ascii', 'ignore').translate(None, _NON_LATIN_BYTES)
+    return _LATIN_REPEATS.sub(rb'\1', letters).decode('ascii')
+
+
+class MessageAnalysis:
+    """
+    One message's text in the forms the filters need.
+
+    Each form is computed on first use and then shared, so the link
+    detector, banned word matchers and spam fingerprints never lowercase or
+    normalize the same text twice.
+    """
+
+    __slots__ = ("text", "entities", "_lower", "_clean", "_latin")
+
+    def __init__(self, text: str, entities: Sequence = ()):
+        self.text = text or ""
+        self.entities = entities
+        self._lower: Optional[str] = None
+        self._clean: Optional[str] = None
+        self._latin: Optional[str] = None
+
+    @classmethod
+    def from_message(cls, message) -> "MessageAnalysis":
+        """Text or caption of a Telegram message with all of its entities"""
+        entities = tuple(message.entities or ()) + tuple(message.caption_entities or ())
+        return cls(message.text or message.caption or "", entities)
+
+    @property
+    def lower(self) -> str:
+        """Lowercased text"""
+        if self._lower is None:
+            self._lower = self.text.lower()
+        return self._lower
+
+    @property
+    def clean(self) -> str:
+        """normalize_text() skeleton"""
+        if self._clean is None:
+            self._clean = normalize_text(self.text)
+        return self._clean
+
+    @property
+    def latin(self) -> str:
+        """Latin letters of the skeleton (fullwidth and styled letters included)"""
+        if self._latin is None:
+            self._latin = latin_skeleton(self.clean)
+        return self._latin
@@ -0,0 +1,106 @@
+"""
+Approval Store
+Bounded, persistent queue of media waiting for the owner's "تایید" / "رد"
+"""
+
+import os
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Optional
+from src.database import adb
+from src import events
+
+logger = logging.getLogger(__name__)
+
+
+class ApprovalStore:
+    """
+    Pending approvals keyed by the forwarded message ID in the owner chat.
+
+    Entries expire after `ttl` seconds and the least recently used ones are
+    evicted beyond `max_size`. Every entry is written to the
+    pending_approvals table, and the table is reloaded lazily on the first
+    lookup after a restart, so deploys no longer lose approvals.
+    """
+
+    def __init__(self, ttl: float = None, max_size: int = None):
+        self.ttl = ttl or float(os.getenv("APPROVAL_TTL", str(48 * 3600)))
+        self.max_size = max_size or int(os.getenv("APPROVAL_MAX", "2000"))
+        self._entries: "OrderedDict[int, dict]" = OrderedDict()
+        self._loaded = False
+        self._load_lock = asyncio.Lock()
+        self.evicted = 0
+        self.expired = 0
+        events.subscribe(events.APPROVAL_ADDED, self._remember)
+        events.subscribe(events.APPROVAL_REMOVED, lambda message_id: self._entries.pop(message_id, None))
+
+    async def _ensure_loaded(self):
+        if self._loaded: return
+        async with self._load_lock:
+            if self._loaded: return
+            cutoff = int(time.time() - self.ttl)
+            rows = await adb.load_pending_approvals(cutoff, self.max_size)
+            # Oldest first so the newest end up most recently used
+            for row in reversed(rows):
+                self._entries.setdefault(row["message_id"], {
+                    "chat_id": row["chat_id"],
+                    "user_id": row["user_id"],
+                    "file_unique_id": row.get("file_unique_id"),
+                    "created_at": row["created_at"],
+                })
+            self._loaded = True
+            await adb.purge_pending_approvals(cutoff)
+            logger.info(f"Reloaded {len(rows)} pending approvals")
+
+    def _remember(self, message_id: int, data: dict) -> list:
+        """Insert in memory only, returns the IDs evicted to stay within max_size"""
+        self._entries[message_id] = data
+        self._entries.move_to_end(message_id)
+
+        evicted = []
+        while len(self._entries) > self.max_size:
+            evicted_id, _ = self._entries.popitem(last=False)
+            evicted.append(evicted_id)
+        self.evicted += len(evicted)
+        return evicted
+
+    async def put(self, message_id: int, chat_id: int, user_id: int, file_unique_id: Optional[str] = None):
+        """Remember a forwarded media item and persist it"""
+        data = {"chat_id": chat_id, "user_id": user_id, "file_unique_id": file_unique_id, "created_at": int(time.time())}
+        for evicted_id in self._remember(message_id, data):
+            await adb.delete_pending_approval(evicted_id)
+
+        await adb.save_pending_approval(message_id, data)
+        # The owner's reply may land on another worker
+        events.publish(events.APPROVAL_ADDED, message_id=message_id, data=data)
+
+    async def get(self, message_id: int) -> Optional[dict]:
+        """Look up a pending approval (None if unknown or expired)"""
+        await self._ensure_loaded()
+        data = self._entries.get(message_id)
+        if data is None: return None
+
+        if data["created_at"] + self.ttl < time.time():
+            await self.pop(message_id)
+            self.expired += 1
+            return None
+
+        self._entries.move_to_end(message_id)
+        return data
+
+    async def pop(self, message_id: int):
+        """Forget an approval once it has been handled"""
+        self._entries.pop(message_id, None)
+        await adb.delete_pending_approval(message_id)
+        events.publish(events.APPROVAL_REMOVED, message_id=message_id)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        return {"size": len(self._entries), "evicted": self.evicted, "expired": self.expired}
+
+
+approval_store = ApprovalStore()
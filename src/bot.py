@@ -4,17 +4,38 @@ Persian Community Management Bot for large group administration
 """
 
 import os
+import time
 import logging
 import asyncio
+import functools
+from typing import Optional
 from dotenv import load_dotenv
 from telegram import Update, BotCommand, BotCommandScopeAllChatAdministrators
-from telegram.request import HTTPXRequest
-from telegram.ext import Application, ContextTypes, CommandHandler, MessageHandler, filters
+from telegram.ext import Application, ContextTypes, CommandHandler, MessageHandler, ChatMemberHandler, TypeHandler, filters
 
 # Import handlers
 from src.handlers.commands import start, help_command, stats
-from src.handlers.moderation import warn, ban, unmute, addword, authorize
-from src.handlers.message_handler import handle_text, check_media, handle_approval, handle_new_chat_members
+from src.handlers.moderation import warn, ban, unmute, addword, authorize, profile, run_profile_command
+from src.handlers.message_handler import handle_text, check_media, handle_approval, handle_new_chat_members, handle_chat_member_update, shed_update
+from src.database import adb
+from src.user_registry import user_registry
+from src.warn_ledger import warn_ledger
+from src.deletion_scheduler import deletion_scheduler
+from src.outbound import outbound
+from src.word_watcher import banned_words_watcher
+from src.approval_store import approval_store
+from src.media_verdicts import media_verdicts
+from src.admin_cache import admin_roster
+from src.flood import flood_detector
+from src.fingerprint import spam_index
+from src.latency import delivery_latency
+from src.metrics import registry, start_metrics_server, InstrumentedRequest
+from src.latency import observe_update
+from src.webhook import run_webhook, get_allowed_updates
+from src.workers import build_supervisor
+from src.update_processor import ChatOrderedUpdateProcessor
+from src.profiler import profiler
+from src import events
 
 # Load environment variables
 load_dotenv(override=False)
@@ -59,20 +80,68 @@ async def setup_commands(app):
         logger.error(f"Error setting commands: {e}")
 
 
-async def setup_application():
-    """Setup and return the application (non-blocking setup)"""
-    # Get token from environment
-    token = os.getenv("TELEGRAM_TOKEN")
-    
-    if not token:
-        logger.error("Missing TELEGRAM_TOKEN")
-        raise ValueError("TELEGRAM_TOKEN must be set in environment variables")
-    
-    # Create application with timeout settings to prevent Railway/Render crashes
-    request = HTTPXRequest(connect_timeout=60, read_timeout=60)
-    application = Application.builder().token(token).request(request).build()
-    
-    # Add handlers
+async def track_latency(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Record Telegram -> bot delivery latency (runs before every other handler)"""
+    observe_update(update)
+
+
+async def count_profiled_update(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Count updates toward /profile N-update runs (runs after the other handlers)"""
+    profiler.count_update()
+
+
+def setup_metrics(update_processor: Optional[ChatOrderedUpdateProcessor] = None):
+    """Register state gauges and start the local /metrics endpoint"""
+    license_cache = adb.manager.license_cache
+    registry.gauge("bot_pending_approvals", "Media waiting for owner approval", lambda: len(approval_store))
+    registry.gauge("bot_media_verdicts", "Media files with a remembered owner verdict", lambda: len(media_verdicts))
+    registry.gauge("bot_media_verdict_hits", "Media decided from a remembered verdict", lambda: media_verdicts.stats()["hits"])
+    registry.gauge("bot_outbound_queue", "Bot API calls waiting in the outbound scheduler", lambda: len(outbound))
+    registry.gauge("bot_scheduled_deletions", "Messages queued for deletion", lambda: len(deletion_scheduler))
+    registry.gauge("bot_license_cache_hits", "License cache hits", lambda: license_cache.hits)
+    registry.gauge("bot_license_cache_misses", "License cache misses", lambda: license_cache.misses)
+    registry.gauge("bot_admin_roster_chats", "Chats with a cached admin roster", lambda: admin_roster.stats()["size"])
+    registry.gauge("bot_users_pending_flush", "Users waiting for the registry flush", lambda: len(user_registry))
+    registry.gauge("bot_flood_tracked_users", "Chat/user pairs tracked by the flood detector", lambda: len(flood_detector))
+    registry.gauge("bot_spam_fingerprints", "Confirmed spam fingerprints remembered", lambda: len(spam_index.spam))
+    registry.gauge("bot_spam_fingerprint_rejections", "Messages rejected as near-duplicates of spam", lambda: spam_index.rejected)
+    registry.gauge("bot_warn_ledger_users", "Users tracked by the warn ledger", lambda: len(warn_ledger))
+    if update_processor is not None:
+        registry.gauge("bot_updates_active", "Updates being handled right now", lambda: update_processor.active)
+        registry.gauge("bot_updates_waiting", "Updates waiting for their chat's turn", lambda: update_processor.waiting)
+        registry.gauge("bot_update_busy_chats", "Chats with an update in progress", lambda: update_processor.stats()["busy_chats"])
+    registry.gauge("bot_delivery_latency_p50_seconds", "Telegram delivery latency p50", lambda: delivery_latency.percentile(50))
+    registry.gauge("bot_delivery_latency_p99_seconds", "Telegram delivery latency p99", lambda: delivery_latency.percentile(99))
+    start_metrics_server()
+
+
+async def on_startup(app):
+    """Start background workers once the event loop is running"""
+    setup_metrics(app.update_processor)
+    user_registry.start()
+    await banned_words_watcher.start()
+    # In worker mode only the first worker restores persisted deletions
+    await deletion_scheduler.start(outbound, restore=app.bot_data.get("worker_index", 0) == 0)
+    outbound.start(app.bot)
+    # /profile handled by another worker applies here too
+    events.subscribe(events.PROFILE_COMMAND, functools.partial(run_profile_command, app.bot))
+
+
+async def on_shutdown(app):
+    """Release background resources when the application stops"""
+    await user_registry.stop()
+    await banned_words_watcher.stop()
+    await warn_ledger.drain()
+    # Outbound first: notices still in flight schedule their deletion, and the
+    # deletion round that stop() finishes goes straight to the Bot API
+    await outbound.stop()
+    await deletion_scheduler.stop()
+    adb.close()
+    logger.info("✅ Database executor closed")
+
+
+def register_handlers(application: Application):
+    """Add the command and moderation handlers (shared with the offline replay tool)"""
     application.add_handler(CommandHandler("start", start))
     application.add_handler(CommandHandler("help", help_command))
     application.add_handler(CommandHandler("stats", stats))
@@ -84,12 +153,18 @@ async def setup_application():
     # 🟢 Authorize Command (Owner Only)
     application.add_handler(CommandHandler("authorize", authorize))
     
+    # 🟢 Profile Command (Owner Only)
+    application.add_handler(CommandHandler("profile", profile))
+    
     # 🟢 Approval Handler (Listens for "تایید" or "رد" in Private Chat)
     application.add_handler(MessageHandler(filters.Regex(r"^(تایید|رد)$") & filters.ChatType.PRIVATE, handle_approval))
    
     # 🟢 Trigger License Check when added to group
     application.add_handler(MessageHandler(filters.StatusUpdate.NEW_CHAT_MEMBERS, handle_new_chat_members))
 
+    # 🟢 Admin Roster Sync (promotions / demotions)
+    application.add_handler(ChatMemberHandler(handle_chat_member_update, ChatMemberHandler.ANY_CHAT_MEMBER))
+
     # 🟢 Media Handler (Photos, Videos, GIFs, Stickers)
     application.add_handler(MessageHandler(
         filters.PHOTO | filters.VIDEO | filters.ANIMATION | filters.Sticker.ALL, 
@@ -99,10 +174,64 @@ async def setup_application():
     # 🟢 Text Handler (Links & Bad Words)
     application.add_handler(MessageHandler((filters.TEXT | filters.CAPTION) & ~filters.COMMAND, handle_text))
     
+    # Group 1 runs once group 0 is done with the update
+    application.add_handler(TypeHandler(Update, count_profiled_update), group=1)
+
+
+async def setup_application(worker_index: Optional[int] = None):
+    """
+    Setup and return the application (non-blocking setup)
+    
+    worker_index is set when running as a worker process (see src/workers.py):
+    the application gets no updater and leaves bot commands to the supervisor.
+    """
+    # Get token from environment
+    token = os.getenv("TELEGRAM_TOKEN")
+    
+    if not token:
+        logger.error("Missing TELEGRAM_TOKEN")
+        raise ValueError("TELEGRAM_TOKEN must be set in environment variables")
+    
+    startup_started = time.perf_counter()
+    
+    # Connect database, seed defaults, warm caches (nothing connects at import time)
+    timings = await adb.initialize()
+    
+    # Create application with timeout settings to prevent Railway/Render crashes
+    request = InstrumentedRequest(connect_timeout=60, read_timeout=60)
+    builder = (
+        Application.builder()
+        .token(token)
+        .request(request)
+        .post_init(on_startup)
+        .post_shutdown(on_shutdown)
+        # Different chats in parallel, each chat in order; overflow is deleted unread
+        .concurrent_updates(ChatOrderedUpdateProcessor(on_overflow=shed_update))
+    )
+    if worker_index is not None:
+        builder = builder.updater(None)
+    application = builder.build()
+    if worker_index is not None:
+        application.bot_data["worker_index"] = worker_index
+    
+    started = time.perf_counter()
+    
+    # Delivery latency (group -1 never blocks the real handlers)
+    application.add_handler(TypeHandler(Update, track_latency), group=-1)
+    
+    register_handlers(application)
+    
     logger.info("✅ Handlers setup completed")
+    timings["handlers"] = time.perf_counter() - started
+    
+    # Setup commands (the supervisor does this in worker mode)
+    if worker_index is None:
+        started = time.perf_counter()
+        await setup_commands(application)
+        timings["commands"] = time.perf_counter() - started
     
-    # Setup commands
-    await setup_commands(application)
+    timings["total"] = time.perf_counter() - startup_started
+    logger.info("⏱️ Startup: " + " | ".join(f"{phase} {seconds * 1000:.0f}ms" for phase, seconds in timings.items()))
     
     return application
 
@@ -116,11 +245,19 @@ def main():
     asyncio.set_event_loop(loop)
     
     try:
-        # Setup the application using the event loop
-        application = loop.run_until_complete(setup_application())
+        # WORKERS>1: this process only receives updates and shards them by chat
+        workers = int(os.getenv("WORKERS", "1"))
+        if workers > 1:
+            application = build_supervisor(workers)
+        else:
+            # Setup the application using the event loop
+            application = loop.run_until_complete(setup_application())
         
-        # Run polling
-        application.run_polling(allowed_updates=Update.ALL_TYPES)
+        # BOT_MODE=webhook runs the built-in listener, default is long polling
+        if os.getenv("BOT_MODE", "polling").lower() == "webhook":
+            loop.run_until_complete(run_webhook(application))
+        else:
+            application.run_polling(allowed_updates=get_allowed_updates())
     finally:
         loop.close()
 
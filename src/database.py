@@ -1,35 +1,490 @@
 """
-Supabase Database Module
-Handles all database operations for the Telegram bot
+Database Module
+Storage interface with its caches, the Supabase backend and the async facade used by handlers
 """
 
 import os
+import time
+import asyncio
 import logging
-from typing import List, Optional
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
 from dotenv import load_dotenv
 from supabase import create_client, Client
+from src.word_matcher import BannedWordMatcher, LayeredMatcher
+from src.cache import TTLCache
+from src.metrics import db_latency, DatabaseErrorCounter
+from src import events
 
 load_dotenv()
 logger = logging.getLogger(__name__)
+logger.addHandler(DatabaseErrorCounter())
 
+# Default Persian spam and profanity words
+DEFAULT_BANNED_WORDS = [
+    # Spam/Advertising words
+    "تبلیغ",
+    "صیغه",
+    "لینک",
+    "فروش",
+    "خرید",
+    "کسب درآمد",
+    "کار در خانه",
+    "کریپتو",
+    "بیت کوین",
+    # Profanity and explicit words
+    "کون",
+    "کونی",
+    "کونکش",
+    "کون گشاد",
+    "کص",
+    "کصکش",
+    "کص کش",
+    "کیر",
+    "دودول",
+    "خایه",
+    "گوه",
+    "عن",
+    "کون کش",
+    "کس کش",
+    "کسکش",
+    "بیشرف",
+    "قهبه",
+    "جنده",
+    "ناموس",
+    "بیناموس",
+    "بی ناموس",
+    "گاییدم",
+    "گایید",
+    "کیرم",
+    "کیرت",
+    "گاییدن",
+    "گایش",
+    "مادرتو",
+    "ننتو",
+    "مامانتو",
+    "حرومزاده",
+    "حرامزاده",
+    "حروم زاده",
+    "حرام زاده",
+    "بیخایه",
+    "بی خایه"
+]
 
-class DatabaseManager:
-    """Database manager for Supabase operations"""
+
+class DatabaseManager(ABC):
+    """
+    Storage interface shared by every backend, plus the caches in front of it.
+    
+    Backends subclass this and implement the abstract methods under each
+    "storage" section; a backend missing one fails when instantiated.
+    Public methods log and return a failure value (None / False / []) like
+    the rest of the bot expects; the underscore hooks (_connect,
+    _fetch_global_words, _insert_banned_word, _delete_banned_word,
+    _fetch_group_license, _insert_allowed_group) raise instead and the
+    caching methods here handle their errors. Pick a backend with DB_BACKEND
+    (see create_database_manager).
+    """
     
     def __init__(self):
-        """Initialize Supabase client and cache"""
-        self.url = os.getenv("SUPABASE_URL")
-        self.key = os.getenv("SUPABASE_KEY")
+        """Read configuration and create empty caches (no I/O, see initialize())"""
+        self._init_caches()
+    
+    @abstractmethod
+    def _connect(self):
+        """Open the connection / client (raises on bad configuration)"""
+        raise NotImplementedError
+    
+    def initialize(self) -> Dict[str, float]:
+        """
+        Connect, seed default banned words and warm the caches.
+        Called once from setup_application.
         
-        if not self.url or not self.key:
-            raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set in .env file")
+        Returns:
+            Seconds spent in each startup phase
+        """
+        timings = {}
+        started = time.perf_counter()
+        self._connect()
+        timings["connect"] = time.perf_counter() - started
+        
+        started = time.perf_counter()
+        self.initialize_default_banned_words()
+        timings["seed_defaults"] = time.perf_counter() - started
         
-        self.client: Client = create_client(self.url, self.key)
-        self.initialize_default_banned_words() 
+        started = time.perf_counter()
+        self.load_banned_words_cache()
+        self.get_banned_word_matcher()
+        timings["banned_words"] = time.perf_counter() - started
+        
+        logger.info("DatabaseManager initialized")
+        return timings
+    
+    def _init_caches(self):
+        """Create the in-process caches (shared with in-memory stand-ins)"""
         self.banned_words_cache: List[str] = []
         self._cache_loaded = False
+        self._words_retry_at = 0.0
+        self.words_retry_delay = float(os.getenv("BANNED_WORDS_RETRY", "30"))
+        self._word_matcher: Optional[BannedWordMatcher] = None
         
-        logger.info("DatabaseManager initialized")
+        # Per-chat overlays (global words + the chat's own), LRU-bounded, built on first message
+        self.chat_word_matchers = TTLCache(
+            ttl=float(os.getenv("CHAT_WORDS_TTL", "3600")),
+            max_size=int(os.getenv("CHAT_MATCHER_MAX", "1000")),
+        )
+        
+        # License cache: positive and negative entries with separate TTLs
+        self.license_ttl = float(os.getenv("LICENSE_CACHE_TTL", "300"))
+        self.license_negative_ttl = float(os.getenv("LICENSE_NEGATIVE_TTL", "60"))
+        self.license_cache = TTLCache(ttl=self.license_ttl)
+    
+
+    # ==================== Storage: Users ====================
+    
+    @abstractmethod
+    def initialize_user(self, user_id: int, username: str) -> Optional[dict]:
+        """Create the user if missing and return their row (None on error)"""
+        raise NotImplementedError
+    
+    @abstractmethod
+    def upsert_users(self, users: List[dict]) -> bool:
+        """Insert or rename many users in one write, keeping warn_count"""
+        raise NotImplementedError
+    
+    @abstractmethod
+    def add_warn(self, user_id: int) -> Optional[int]:
+        """Atomically increment a user's warns and return the new count (None on error)"""
+        raise NotImplementedError
+    
+    @abstractmethod
+    def get_user_stats(self, user_id: int) -> Optional[dict]:
+        """{user_id, username, warn_count} or None if unknown / error"""
+        raise NotImplementedError
+    
+    @abstractmethod
+    def get_user_id_by_username(self, username: str) -> Optional[int]:
+        """Find user ID by username (leading @ ignored)"""
+        raise NotImplementedError
+    
+    @abstractmethod
+    def reset_warns(self, user_id: int) -> bool:
+        """Reset user warnings to 0"""
+        raise NotImplementedError
+    
+    # ==================== Storage: Banned Words ====================
+    
+    @abstractmethod
+    def _fetch_global_words(self) -> List[str]:
+        """Words of the global list, lowercased"""
+        raise NotImplementedError
+    
+    @abstractmethod
+    def _insert_banned_word(self, word: str, chat_id: Optional[int]) -> Tuple[Optional[dict], bool]:
+        """Insert a lowercased word unless present. Returns (row, created)"""
+        raise NotImplementedError
+    
+    @abstractmethod
+    def _delete_banned_word(self, word: str, chat_id: Optional[int]):
+        """Delete a lowercased word from one scope"""
+        raise NotImplementedError
+    
+    @abstractmethod
+    def load_chat_words(self, chat_id: int) -> Optional[List[str]]:
+        """Words a single group added on top of the global list (None on error)"""
+        raise NotImplementedError
+    
+    @abstractmethod
+    def fetch_banned_word_versions(self, since: Optional[int]) -> Optional[List[dict]]:
+        """Rows {scope, version} newer than `since` (latest stamp if None), None on error"""
+        raise NotImplementedError
+    
+    @abstractmethod
+    def initialize_default_banned_words(self) -> bool:
+        """Seed DEFAULT_BANNED_WORDS if the global list is empty"""
+        raise NotImplementedError
+    
+    # ==================== Storage: License System ====================
+    
+    @abstractmethod
+    def _fetch_group_license(self, chat_id: int) -> bool:
+        """Whether the group is in allowed_groups"""
+        raise NotImplementedError
+    
+    @abstractmethod
+    def _insert_allowed_group(self, chat_id: int, note: str) -> bool:
+        """Add a group to allowed_groups"""
+        raise NotImplementedError
+    
+    # ==================== Storage: Approval Queue ====================
+    
+    @abstractmethod
+    def save_pending_approval(self, message_id: int, data: dict) -> bool:
+        """Persist a media item waiting for owner approval"""
+        raise NotImplementedError
+    
+    @abstractmethod
+    def load_pending_approvals(self, since: int, limit: int) -> List[dict]:
+        """Load the newest pending approvals created after `since` (epoch seconds)"""
+        raise NotImplementedError
+    
+    @abstractmethod
+    def delete_pending_approval(self, message_id: int) -> bool:
+        """Remove a handled or evicted approval"""
+        raise NotImplementedError
+    
+    @abstractmethod
+    def purge_pending_approvals(self, before: int) -> bool:
+        """Delete approvals created before `before` (epoch seconds)"""
+        raise NotImplementedError
+    
+    # ==================== Storage: Media Verdicts ====================
+    
+    @abstractmethod
+    def save_media_verdict(self, row: dict) -> bool:
+        """Persist the owner's verdict on a media file"""
+        raise NotImplementedError
+    
+    @abstractmethod
+    def load_media_verdicts(self, since: int, limit: int) -> List[dict]:
+        """Load the newest verdicts decided after `since` (epoch seconds)"""
+        raise NotImplementedError
+    
+    @abstractmethod
+    def purge_media_verdicts(self, before: int) -> bool:
+        """Delete verdicts decided before `before` (epoch seconds)"""
+        raise NotImplementedError
+    
+    # ==================== Storage: Scheduled Deletions ====================
+    
+    @abstractmethod
+    def save_scheduled_deletions(self, rows: List[dict]) -> bool:
+        """Persist queued deletions on shutdown"""
+        raise NotImplementedError
+    
+    @abstractmethod
+    def load_scheduled_deletions(self) -> List[dict]:
+        """Load deletions persisted by the previous run"""
+        raise NotImplementedError
+    
+    @abstractmethod
+    def clear_scheduled_deletions(self) -> bool:
+        """Empty the table once its rows are back in memory"""
+        raise NotImplementedError
+    
+    # ==================== Banned Words Cache ====================
+    
+    def load_banned_words_cache(self) -> bool:
+        """
+        Load banned words from database into cache.
+        
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            words = self._fetch_global_words()
+            
+            # Compile before swapping so lookups keep using the old matcher meanwhile
+            self._word_matcher = BannedWordMatcher(words)
+            self.banned_words_cache = words
+            self._cache_loaded = True
+            
+            logger.info(f"Loaded {len(self.banned_words_cache)} banned words into cache")
+            return True
+            
+        except Exception as e:
+            # Keep serving the last good list, retry after words_retry_delay
+            logger.error(f"Error loading banned words cache: {e}")
+            self._words_retry_at = time.time() + self.words_retry_delay
+            return False
+    
+    
+    def banned_words_stale(self) -> bool:
+        """True when the global list must be (re)loaded before use"""
+        return not self._cache_loaded and time.time() >= self._words_retry_at
+    
+    def get_banned_words(self) -> List[str]:
+        """
+        Get cached list of banned words. Loads from database if not loaded yet
+        (an empty list is cached like any other).
+        
+        Returns:
+            List of banned words
+        """
+        if self.banned_words_stale():
+            self.load_banned_words_cache()
+        
+        return self.banned_words_cache
+    
+    def get_banned_word_matcher(self) -> BannedWordMatcher:
+        """
+        Get the compiled matcher for the banned words list.
+        Built lazily and only rebuilt after the list changes.
+        
+        Returns:
+            BannedWordMatcher over the cached banned words
+        """
+        words = self.get_banned_words()
+        if self._word_matcher is None:
+            self._word_matcher = BannedWordMatcher(words)
+            logger.info(f"Compiled banned word matcher ({len(self._word_matcher)} words)")
+        
+        return self._word_matcher
+    
+    def get_chat_word_matcher(self, chat_id: int) -> LayeredMatcher:
+        """
+        Get the matcher for one group: its own words layered over the global matcher.
+        Only the chat's overlay is compiled here; the global one is shared.
+        
+        Args:
+            chat_id: Telegram chat ID
+            
+        Returns:
+            LayeredMatcher for the chat
+        """
+        base = self.get_banned_word_matcher()
+        entry = self.chat_word_matchers.get(chat_id)
+        if entry is None:
+            words = self.load_chat_words(chat_id)
+            entry = LayeredMatcher(base, BannedWordMatcher(words or []))
+            if words is not None:
+                self.chat_word_matchers.set(chat_id, entry)
+        elif entry.base is not base:
+            # Global list changed: keep the chat overlay, swap the base
+            entry = LayeredMatcher(base, entry.overlay)
+            self.chat_word_matchers.set(chat_id, entry)
+        return entry
+    
+    def _update_chat_overlay(self, chat_id: int, added: Optional[str] = None, removed: Optional[str] = None):
+        # Patch the cached overlay instead of reloading it (nothing to do if not cached)
+        entry = self.chat_word_matchers.get(chat_id)
+        if entry is None: return
+        words = [w for w in entry.overlay.words if w != removed]
+        if added and added not in words:
+            words.append(added)
+        self.chat_word_matchers.set(chat_id, LayeredMatcher(entry.base, BannedWordMatcher(words)))
+    
+    def invalidate_banned_words(self, chat_id: Optional[int] = None):
+        """Drop cached words so the next lookup reloads them (one chat, or the global list)"""
+        if chat_id is not None:
+            self.chat_word_matchers.invalidate(chat_id)
+            return
+        self._cache_loaded = False
+        self._word_matcher = None
+    
+    def add_banned_word(self, word: str, chat_id: Optional[int] = None) -> Optional[dict]:
+        """
+        Add a word to the banned words list.
+        
+        Args:
+            word: Word to ban
+            chat_id: Group the word applies to, None for the global list
+            
+        Returns:
+            Added word data or None if error
+        """
+        try:
+            word_lower = word.lower()
+            row, created = self._insert_banned_word(word_lower, chat_id)
+            
+            if not created:
+                if row: logger.info(f"Word '{word}' already in banned list")
+                return row
+            
+            # Update cache
+            if chat_id is not None:
+                self._update_chat_overlay(chat_id, added=word_lower)
+                logger.info(f"Added '{word}' to banned words of chat {chat_id}")
+            else:
+                self.banned_words_cache.append(word_lower)
+                self._word_matcher = None
+                logger.info(f"Added '{word}' to banned words")
+            
+            return row
+            
+        except Exception as e:
+            logger.error(f"Error adding banned word '{word}': {e}")
+            return None
+    
+    def remove_banned_word(self, word: str, chat_id: Optional[int] = None) -> bool:
+        """
+        Remove a word from the banned words list.
+        
+        Args:
+            word: Word to remove
+            chat_id: Group the word applies to, None for the global list
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            word_lower = word.lower()
+            
+            self._delete_banned_word(word_lower, chat_id)
+            
+            # Update cache
+            if chat_id is not None:
+                self._update_chat_overlay(chat_id, removed=word_lower)
+            elif word_lower in self.banned_words_cache:
+                self.banned_words_cache.remove(word_lower)
+                self._word_matcher = None
+            
+            logger.info(f"Removed '{word}' from banned words")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error removing banned word '{word}': {e}")
+            return False
+    
+    # ==================== License Cache ====================
+    
+    def is_group_allowed(self, chat_id: int) -> bool:
+        """Check if group is in allowed_groups table (cached)"""
+        cached = self.license_cache.get(chat_id)
+        if cached is not None:
+            return cached
+        return self.fetch_group_license(chat_id)
+    
+    def fetch_group_license(self, chat_id: int) -> bool:
+        """Query allowed_groups and refresh the license cache entry"""
+        try:
+            allowed = self._fetch_group_license(chat_id)
+            self.license_cache.set(chat_id, allowed, self.license_ttl if allowed else self.license_negative_ttl)
+            return allowed
+        except Exception as e:
+            logger.error(f"Error checking license: {e}")
+            return False
+
+    def add_allowed_group(self, chat_id: int, note: str = "") -> bool:
+        """Add a group to the whitelist"""
+        try:
+            return self._insert_allowed_group(chat_id, note)
+        except Exception as e:
+            logger.error(f"Error adding group: {e}")
+            return False
+        finally:
+            self.license_cache.invalidate(chat_id)
+    
+    def license_cache_stats(self) -> dict:
+        """License cache hit/miss counters"""
+        return self.license_cache.stats()
+
+
+class SupabaseDatabaseManager(DatabaseManager):
+    """Storage on Supabase (PostgREST over HTTPS), see sql/schema_updates.sql"""
+    
+    def __init__(self):
+        super().__init__()
+        self.url = os.getenv("SUPABASE_URL")
+        self.key = os.getenv("SUPABASE_KEY")
+        self.client: Optional[Client] = None
+        self._warn_rpc_available = True
+    
+    def _connect(self):
+        if not self.url or not self.key:
+            raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set in .env file")
+        self.client = create_client(self.url, self.key)
     
     # ==================== User Management ====================
     
@@ -66,9 +521,32 @@ class DatabaseManager:
             logger.error(f"Error initializing user {user_id}: {e}")
             return None
     
+    def upsert_users(self, users: List[dict]) -> bool:
+        """
+        Insert or rename many users in one round trip.
+        Only user_id/username are written, so warn_count keeps its value
+        (new rows rely on the column default of 0).
+        
+        Args:
+            users: List of {"user_id": ..., "username": ...}
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        if not users: return True
+        try:
+            self.client.table("users").upsert(users, on_conflict="user_id").execute()
+            logger.info(f"Upserted {len(users)} users")
+            return True
+        except Exception as e:
+            logger.error(f"Error upserting {len(users)} users: {e}")
+            return False
+    
     def add_warn(self, user_id: int) -> Optional[int]:
         """
-        Increment the warn count for a user.
+        Atomically increment the warn count for a user.
+        Uses the increment_warn SQL function (sql/schema_updates.sql), which
+        creates the user if needed and returns the new count in one call.
         
         Args:
             user_id: Telegram user ID
@@ -76,6 +554,25 @@ class DatabaseManager:
         Returns:
             Updated warn count or None if error
         """
+        if not self._warn_rpc_available:
+            return self._add_warn_legacy(user_id)
+        
+        try:
+            response = self.client.rpc("increment_warn", {"p_user_id": user_id}).execute()
+            new_warn_count = int(response.data)
+            logger.info(f"User {user_id} warned. New warn count: {new_warn_count}")
+            return new_warn_count
+            
+        except Exception as e:
+            if "increment_warn" in str(e):
+                logger.warning("increment_warn function missing, falling back to read-modify-write warns")
+                self._warn_rpc_available = False
+                return self._add_warn_legacy(user_id)
+            logger.error(f"Error adding warn to user {user_id}: {e}")
+            return None
+    
+    def _add_warn_legacy(self, user_id: int) -> Optional[int]:
+        """Read-modify-write warn increment (used until increment_warn is deployed)"""
         try:
             # First, ensure user exists
             user = self.client.table("users").select("warn_count").eq("user_id", user_id).execute()
@@ -85,7 +582,7 @@ class DatabaseManager:
                 self.initialize_user(user_id, "unknown")
             
             # Increment warn count
-            current_warns = user.data[0]["warn_count"] if user.data else 0
+            current_warns = (user.data[0]["warn_count"] or 0) if user.data else 0
             new_warn_count = current_warns + 1
             
             response = self.client.table("users").update(
@@ -120,7 +617,7 @@ class DatabaseManager:
             return {
                 "user_id": user_data["user_id"],
                 "username": user_data["username"],
-                "warn_count": user_data["warn_count"]
+                "warn_count": user_data["warn_count"] or 0
             }
             
         except Exception as e:
@@ -146,40 +643,71 @@ class DatabaseManager:
             logger.error(f"Error finding user by username: {e}")
             return None
     
+    def reset_warns(self, user_id: int) -> bool:
+        """Reset user warnings to 0"""
+        try:
+            self.client.table("users").update({"warn_count": 0}).eq("user_id", user_id).execute()
+            logger.info(f"Reset warnings for user {user_id}")
+            return True
+        except Exception as e:
+            logger.error(f"Error resetting warns: {e}")
+            return False
+    
     # ==================== Banned Words Management ====================
     
-    def load_banned_words_cache(self) -> bool:
+    def _fetch_global_words(self) -> List[str]:
+        response = self.client.table("banned_words").select("word").is_("chat_id", "null").execute()
+        return [item["word"].lower() for item in response.data]
+    
+    def _insert_banned_word(self, word: str, chat_id: Optional[int]) -> Tuple[Optional[dict], bool]:
+        # Check if word already exists
+        response = self._scoped_words(self.client.table("banned_words").select("word").eq("word", word), chat_id).execute()
+        if response.data:
+            return response.data[0], False
+        
+        response = self.client.table("banned_words").insert({"word": word, "chat_id": chat_id}).execute()
+        return (response.data[0], True) if response.data else (None, False)
+    
+    def _delete_banned_word(self, word: str, chat_id: Optional[int]):
+        self._scoped_words(self.client.table("banned_words").delete().eq("word", word), chat_id).execute()
+    
+    def load_chat_words(self, chat_id: int) -> Optional[List[str]]:
         """
-        Load banned words from database into cache.
+        Load the words a single group added on top of the global list.
         
+        Args:
+            chat_id: Telegram chat ID
+            
         Returns:
-            True if successful, False otherwise
+            List of words or None if the query failed
         """
         try:
-            response = self.client.table("banned_words").select("word").execute()
-            
-            self.banned_words_cache = [item["word"].lower() for item in response.data]
-            self._cache_loaded = True
-            
-            logger.info(f"Loaded {len(self.banned_words_cache)} banned words into cache")
-            return True
-            
+            response = self.client.table("banned_words").select("word").eq("chat_id", chat_id).execute()
+            return [item["word"].lower() for item in response.data]
         except Exception as e:
-            logger.error(f"Error loading banned words cache: {e}")
-            self.banned_words_cache = []
-            return False
+            logger.error(f"Error loading banned words for chat {chat_id}: {e}")
+            return None
     
-    def get_banned_words(self) -> List[str]:
+    def fetch_banned_word_versions(self, since: Optional[int]) -> Optional[List[dict]]:
         """
-        Get cached list of banned words. Loads from database if cache is empty.
+        Read banned word version stamps (bumped by a trigger on every change).
         
+        Args:
+            since: Last version seen, None for just the latest stamp
+            
         Returns:
-            List of banned words
+            Rows {scope, version} newer than `since` (scope 0 = global list), or None on error
         """
-        if not self._cache_loaded or not self.banned_words_cache:
-            self.load_banned_words_cache()
-        
-        return self.banned_words_cache
+        try:
+            query = self.client.table("banned_words_versions").select("scope, version")
+            if since is None:
+                response = query.order("version", desc=True).limit(1).execute()
+            else:
+                response = query.gt("version", since).execute()
+            return response.data
+        except Exception as e:
+            logger.error(f"Error checking banned word versions: {e}")
+            return None
     
     def initialize_default_banned_words(self) -> bool:
         """
@@ -190,167 +718,330 @@ class DatabaseManager:
         """
         try:
             # Check if banned words table has any entries
-            response = self.client.table("banned_words").select("id").limit(1).execute()
+            response = self.client.table("banned_words").select("id").is_("chat_id", "null").limit(1).execute()
             
             if response.data:
                 logger.info("Banned words already exist in database")
                 return True
             
-            # Default Persian spam and profanity words
-            default_words = [
-                # Spam/Advertising words
-                "تبلیغ",
-                "صیغه",
-                "لینک",
-                "فروش",
-                "خرید",
-                "کسب درآمد",
-                "کار در خانه",
-                "کریپتو",
-                "بیت کوین",
-                # Profanity and explicit words
-                "کون",
-                "کونی",
-                "کونکش",
-                "کون گشاد",
-                "کص",
-                "کصکش",
-                "کص کش",
-                "کیر",
-                "دودول",
-                "خایه",
-                "گوه",
-                "عن",
-                "کون کش",
-                "کس کش",
-                "کسکش",
-                "بیشرف",
-                "قهبه",
-                "جنده",
-                "ناموس",
-                "بیناموس",
-                "بی ناموس",
-                "گاییدم",
-                "گایید",
-                "کیرم",
-                "کیرت",
-                "گاییدن",
-                "گایش",
-                "مادرتو",
-                "ننتو",
-                "مامانتو",
-                "حرومزاده",
-                "حرامزاده",
-                "حروم زاده",
-                "حرام زاده",
-                "بیخایه",
-                "بی خایه"
-            ]
-            
-            # Insert default words
-            for word in default_words:
-                self.client.table("banned_words").insert({
-                    "word": word.lower()
-                }).execute()
-            
-            # Reload cache
-            self.load_banned_words_cache()
-            logger.info(f"Initialized {len(default_words)} default banned words")
+            # Insert default words in one round trip
+            self.client.table("banned_words").insert(
+                [{"word": word.lower()} for word in DEFAULT_BANNED_WORDS]
+            ).execute()
+            
+            logger.info(f"Initialized {len(DEFAULT_BANNED_WORDS)} default banned words")
             return True
             
         except Exception as e:
             logger.error(f"Error initializing default banned words: {e}")
             return False
     
-    def add_banned_word(self, word: str) -> Optional[dict]:
+    def _scoped_words(self, query, chat_id: Optional[int]):
+        return query.eq("chat_id", chat_id) if chat_id is not None else query.is_("chat_id", "null")
+    
+    # ==================== License System ====================
+    
+    def _fetch_group_license(self, chat_id: int) -> bool:
+        response = self.client.table("allowed_groups").select("chat_id").eq("chat_id", chat_id).execute()
+        return len(response.data) > 0
+    
+    def _insert_allowed_group(self, chat_id: int, note: str) -> bool:
+        self.client.table("allowed_groups").insert({"chat_id": chat_id, "note": note}).execute()
+        return True
+    
+    # ==================== Approval Queue ====================
+    
+    def save_pending_approval(self, message_id: int, data: dict) -> bool:
         """
-        Add a word to the banned words list.
+        Persist a media item waiting for owner approval.
         
         Args:
-            word: Word to ban
+            message_id: ID of the message forwarded to the owner
+            data: {"chat_id", "user_id", "file_unique_id", "created_at"}
             
         Returns:
-            Added word data or None if error
+            True if successful, False otherwise
         """
         try:
-            word_lower = word.lower()
-            
-            # Check if word already exists
-            response = self.client.table("banned_words").select("word").eq("word", word_lower).execute()
-            
-            if response.data:
-                logger.info(f"Word '{word}' already in banned list")
-                return response.data[0]
-            
-            # Add new banned word
-            new_word = {"word": word_lower}
-            response = self.client.table("banned_words").insert(new_word).execute()
-            
-            # Update cache
-            if response.data:
-                self.banned_words_cache.append(word_lower)
-                logger.info(f"Added '{word}' to banned words")
-            
-            return response.data[0] if response.data else None
-            
+            self.client.table("pending_approvals").upsert({"message_id": message_id, **data}, on_conflict="message_id").execute()
+            return True
         except Exception as e:
-            logger.error(f"Error adding banned word '{word}': {e}")
-            return None
+            logger.error(f"Error saving pending approval {message_id}: {e}")
+            return False
+    
+    def load_pending_approvals(self, since: int, limit: int) -> List[dict]:
+        """Load the newest pending approvals created after `since` (epoch seconds)"""
+        try:
+            response = (
+                self.client.table("pending_approvals").select("*")
+                .gte("created_at", since)
+                .order("created_at", desc=True)
+                .limit(limit)
+                .execute()
+            )
+            return response.data or []
+        except Exception as e:
+            logger.error(f"Error loading pending approvals: {e}")
+            return []
     
-    def remove_banned_word(self, word: str) -> bool:
+    def delete_pending_approval(self, message_id: int) -> bool:
+        """Remove a handled or evicted approval"""
+        try:
+            self.client.table("pending_approvals").delete().eq("message_id", message_id).execute()
+            return True
+        except Exception as e:
+            logger.error(f"Error deleting pending approval {message_id}: {e}")
+            return False
+    
+    def purge_pending_approvals(self, before: int) -> bool:
+        """Delete approvals created before `before` (epoch seconds)"""
+        try:
+            self.client.table("pending_approvals").delete().lt("created_at", before).execute()
+            return True
+        except Exception as e:
+            logger.error(f"Error purging pending approvals: {e}")
+            return False
+    
+    # ==================== Media Verdicts ====================
+    
+    def save_media_verdict(self, row: dict) -> bool:
         """
-        Remove a word from the banned words list.
+        Persist the owner's verdict on a media file.
         
         Args:
-            word: Word to remove
+            row: {"scope", "file_unique_id", "approved", "decided_at"}
             
         Returns:
             True if successful, False otherwise
         """
         try:
-            word_lower = word.lower()
-            
-            self.client.table("banned_words").delete().eq("word", word_lower).execute()
-            
-            # Update cache
-            if word_lower in self.banned_words_cache:
-                self.banned_words_cache.remove(word_lower)
-            
-            logger.info(f"Removed '{word}' from banned words")
+            self.client.table("media_verdicts").upsert(row, on_conflict="scope,file_unique_id").execute()
             return True
-            
         except Exception as e:
-            logger.error(f"Error removing banned word '{word}': {e}")
+            logger.error(f"Error saving media verdict {row.get('file_unique_id')}: {e}")
             return False
-
-    def reset_warns(self, user_id: int) -> bool:
-        """Reset user warnings to 0"""
+    
+    def load_media_verdicts(self, since: int, limit: int) -> List[dict]:
+        """Load the newest verdicts decided after `since` (epoch seconds)"""
         try:
-            self.client.table("users").update({"warn_count": 0}).eq("user_id", user_id).execute()
-            logger.info(f"Reset warnings for user {user_id}")
+            response = (
+                self.client.table("media_verdicts").select("*")
+                .gte("decided_at", since)
+                .order("decided_at", desc=True)
+                .limit(limit)
+                .execute()
+            )
+            return response.data or []
+        except Exception as e:
+            logger.error(f"Error loading media verdicts: {e}")
+            return []
+    
+    def purge_media_verdicts(self, before: int) -> bool:
+        """Delete verdicts decided before `before` (epoch seconds)"""
+        try:
+            self.client.table("media_verdicts").delete().lt("decided_at", before).execute()
             return True
         except Exception as e:
-            logger.error(f"Error resetting warns: {e}")
+            logger.error(f"Error purging media verdicts: {e}")
             return False
-    # ==================== License System ====================
     
-    def is_group_allowed(self, chat_id: int) -> bool:
-        """Check if group is in allowed_groups table"""
+    # ==================== Scheduled Deletions ====================
+    
+    def save_scheduled_deletions(self, rows: List[dict]) -> bool:
+        """
+        Persist queued deletions on shutdown.
+        
+        Args:
+            rows: List of {"chat_id", "message_id", "due_at"}
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        if not rows: return True
         try:
-            response = self.client.table("allowed_groups").select("chat_id").eq("chat_id", chat_id).execute()
-            return len(response.data) > 0
+            self.client.table("scheduled_deletions").upsert(rows, on_conflict="chat_id,message_id").execute()
+            return True
         except Exception as e:
-            logger.error(f"Error checking license: {e}")
+            logger.error(f"Error saving {len(rows)} scheduled deletions: {e}")
             return False
-
-    def add_allowed_group(self, chat_id: int, note: str = "") -> bool:
-        """Add a group to the whitelist"""
+    
+    def load_scheduled_deletions(self) -> List[dict]:
+        """Load deletions persisted by the previous run"""
         try:
-            self.client.table("allowed_groups").insert({"chat_id": chat_id, "note": note}).execute()
+            response = self.client.table("scheduled_deletions").select("chat_id, message_id, due_at").execute()
+            return response.data or []
+        except Exception as e:
+            logger.error(f"Error loading scheduled deletions: {e}")
+            return []
+    
+    def clear_scheduled_deletions(self) -> bool:
+        """Empty the table once its rows are back in memory"""
+        try:
+            self.client.table("scheduled_deletions").delete().gte("message_id", 0).execute()
             return True
         except Exception as e:
-            logger.error(f"Error adding group: {e}")
+            logger.error(f"Error clearing scheduled deletions: {e}")
             return False
 
-# Initialize database manager instance
-db = DatabaseManager()
+
+class AsyncDatabaseManager:
+    """
+    Non-blocking facade over DatabaseManager for use inside handlers.
+    
+    Every backend is synchronous (supabase client, sqlite3), so every call
+    runs on a bounded thread pool (DB_MAX_WORKERS) instead of freezing the
+    event loop.
+    """
+    
+    def __init__(self, manager: DatabaseManager, max_workers: Optional[int] = None):
+        self.manager = manager
+        self.max_workers = max_workers or int(os.getenv("DB_MAX_WORKERS", "8"))
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="db")
+        
+        # Changes made by other worker processes
+        events.subscribe(events.BANNED_WORDS_CHANGED, lambda chat_id=None: self.manager.invalidate_banned_words(chat_id))
+        events.subscribe(events.LICENSE_CHANGED, lambda chat_id: self.manager.license_cache.invalidate(chat_id))
+    
+    async def _run(self, func, *args, **kwargs):
+        """Run a blocking DatabaseManager call on the executor (timed per method)"""
+        def timed_call():
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                db_latency.observe(time.perf_counter() - started, method=func.__name__)
+        
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, timed_call)
+    
+    async def initialize(self) -> Dict[str, float]:
+        return await self._run(self.manager.initialize)
+    
+    # ==================== User Management ====================
+    
+    async def initialize_user(self, user_id: int, username: str) -> Optional[dict]:
+        return await self._run(self.manager.initialize_user, user_id, username)
+    
+    async def upsert_users(self, users: List[dict]) -> bool:
+        return await self._run(self.manager.upsert_users, users)
+    
+    async def add_warn(self, user_id: int) -> Optional[int]:
+        return await self._run(self.manager.add_warn, user_id)
+    
+    async def get_user_stats(self, user_id: int) -> Optional[dict]:
+        return await self._run(self.manager.get_user_stats, user_id)
+    
+    async def get_user_id_by_username(self, username: str) -> Optional[int]:
+        return await self._run(self.manager.get_user_id_by_username, username)
+    
+    async def reset_warns(self, user_id: int) -> bool:
+        return await self._run(self.manager.reset_warns, user_id)
+    
+    # ==================== Banned Words Management ====================
+    
+    async def load_banned_words_cache(self) -> bool:
+        return await self._run(self.manager.load_banned_words_cache)
+    
+    async def get_banned_words(self) -> List[str]:
+        return await self._run(self.manager.get_banned_words)
+    
+    async def get_banned_word_matcher(self, chat_id: Optional[int] = None):
+        """
+        Return the compiled matcher (global, or layered for chat_id),
+        touching the executor only when something must be (re)loaded.
+        """
+        matcher = self.manager._word_matcher
+        if matcher is not None and not self.manager.banned_words_stale():
+            if chat_id is None:
+                return matcher
+            entry = self.manager.chat_word_matchers.get(chat_id)
+            if entry is not None and entry.base is matcher:
+                return entry
+        if chat_id is None:
+            return await self._run(self.manager.get_banned_word_matcher)
+        return await self._run(self.manager.get_chat_word_matcher, chat_id)
+    
+    async def fetch_banned_word_versions(self, since: Optional[int]) -> Optional[List[dict]]:
+        return await self._run(self.manager.fetch_banned_word_versions, since)
+    
+    async def add_banned_word(self, word: str, chat_id: Optional[int] = None) -> Optional[dict]:
+        result = await self._run(self.manager.add_banned_word, word, chat_id)
+        if result: events.publish(events.BANNED_WORDS_CHANGED, chat_id=chat_id)
+        return result
+    
+    async def remove_banned_word(self, word: str, chat_id: Optional[int] = None) -> bool:
+        result = await self._run(self.manager.remove_banned_word, word, chat_id)
+        if result: events.publish(events.BANNED_WORDS_CHANGED, chat_id=chat_id)
+        return result
+    
+    # ==================== License System ====================
+    
+    async def is_group_allowed(self, chat_id: int) -> bool:
+        cached = self.manager.license_cache.get(chat_id)
+        if cached is not None:
+            return cached
+        return await self._run(self.manager.fetch_group_license, chat_id)
+    
+    async def add_allowed_group(self, chat_id: int, note: str = "") -> bool:
+        result = await self._run(self.manager.add_allowed_group, chat_id, note)
+        events.publish(events.LICENSE_CHANGED, chat_id=chat_id)
+        return result
+    
+    # ==================== Approval Queue ====================
+    
+    async def save_pending_approval(self, message_id: int, data: dict) -> bool:
+        return await self._run(self.manager.save_pending_approval, message_id, data)
+    
+    async def load_pending_approvals(self, since: int, limit: int) -> List[dict]:
+        return await self._run(self.manager.load_pending_approvals, since, limit)
+    
+    async def delete_pending_approval(self, message_id: int) -> bool:
+        return await self._run(self.manager.delete_pending_approval, message_id)
+    
+    async def purge_pending_approvals(self, before: int) -> bool:
+        return await self._run(self.manager.purge_pending_approvals, before)
+    
+    # ==================== Media Verdicts ====================
+    
+    async def save_media_verdict(self, row: dict) -> bool:
+        return await self._run(self.manager.save_media_verdict, row)
+    
+    async def load_media_verdicts(self, since: int, limit: int) -> List[dict]:
+        return await self._run(self.manager.load_media_verdicts, since, limit)
+    
+    async def purge_media_verdicts(self, before: int) -> bool:
+        return await self._run(self.manager.purge_media_verdicts, before)
+    
+    # ==================== Scheduled Deletions ====================
+    
+    async def save_scheduled_deletions(self, rows: List[dict]) -> bool:
+        return await self._run(self.manager.save_scheduled_deletions, rows)
+    
+    async def load_scheduled_deletions(self) -> List[dict]:
+        return await self._run(self.manager.load_scheduled_deletions)
+    
+    async def clear_scheduled_deletions(self) -> bool:
+        return await self._run(self.manager.clear_scheduled_deletions)
+    
+    def close(self):
+        """Stop the executor (waits for in-flight calls)"""
+        self._executor.shutdown(wait=True)
+
+
+def create_database_manager(backend: Optional[str] = None) -> DatabaseManager:
+    """
+    Storage backend named by DB_BACKEND: "supabase" (default) or "sqlite"
+    (embedded file at SQLITE_PATH, for single-node deployments and offline runs).
+    """
+    backend = (backend or os.getenv("DB_BACKEND", "supabase")).lower()
+    if backend == "supabase":
+        return SupabaseDatabaseManager()
+    if backend == "sqlite":
+        from src.sqlite_backend import SQLiteDatabaseManager
+        return SQLiteDatabaseManager()
+    raise ValueError(f"Unknown DB_BACKEND '{backend}' (expected supabase or sqlite)")
+
+
+# Database manager instance (connects in setup_application via adb.initialize())
+db = create_database_manager()
+adb = AsyncDatabaseManager(db)
@@ -0,0 +1,132 @@
+"""
+Deletion Scheduler
+One timer heap for every "delete this message in N seconds" in the bot
+"""
+
+import os
+import time
+import heapq
+import asyncio
+import logging
+from typing import Dict, List, Optional, Tuple
+from src.database import adb
+
+logger = logging.getLogger(__name__)
+
+# Telegram's deleteMessages accepts at most 100 IDs per call
+MAX_BATCH = 100
+
+
+class DeletionScheduler:
+    """
+    Replaces one sleeping task per message with a single background worker.
+
+    Due deletions are grouped per chat and sent with deleteMessages (up to
+    100 IDs per request) through the outbound scheduler, so they share its
+    rate limits. Whatever is still queued on shutdown is saved to
+    the scheduled_deletions table and picked up again on the next start.
+    """
+
+    def __init__(self, max_batch: int = MAX_BATCH):
+        self.max_batch = max_batch
+        self.grace = float(os.getenv("DELETION_GRACE", "0.5"))
+        self._heap: List[Tuple[float, int, int]] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._round: Optional[asyncio.Future] = None
+        self._sender = None
+        self.deleted = 0
+        self.requests = 0
+
+    def schedule(self, chat_id: int, message_id: int, delay: float):
+        """Delete message_id in chat_id after `delay` seconds"""
+        due_at = time.time() + delay
+        heapq.heappush(self._heap, (due_at, chat_id, message_id))
+        if self._wakeup and self._heap[0][0] == due_at:
+            self._wakeup.set()
+
+    async def _delete_chat_batch(self, chat_id: int, message_ids: List[int]):
+        for i in range(0, len(message_ids), self.max_batch):
+            chunk = message_ids[i:i + self.max_batch]
+            self.requests += 1
+            try:
+                await self._sender.delete_messages(chat_id=chat_id, message_ids=chunk)
+                self.deleted += len(chunk)
+            except Exception as e:
+                logger.debug(f"Scheduled deletion failed in chat {chat_id}: {e}")
+
+    async def _run(self):
+        while True:
+            if not self._heap:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+
+            wait = self._heap[0][0] - time.time()
+            if wait > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                continue
+
+            # Everything due within the grace window goes out in the same round
+            horizon = time.time() + self.grace
+            due: Dict[int, List[int]] = {}
+            while self._heap and self._heap[0][0] <= horizon:
+                _, chat_id, message_id = heapq.heappop(self._heap)
+                due.setdefault(chat_id, []).append(message_id)
+
+            # Shielded: these IDs are off the heap, so stop() lets the round finish instead of losing them
+            self._round = asyncio.gather(*(self._delete_chat_batch(chat_id, ids) for chat_id, ids in due.items()))
+            await asyncio.shield(self._round)
+
+    async def start(self, sender, restore: bool = True):
+        """
+        Reload persisted deletions (unless restore=False) and start the worker.
+
+        Args:
+            sender: Anything with an awaitable delete_messages(chat_id, message_ids),
+                normally the outbound scheduler
+            restore: Load the deletions saved by the last stop()
+        """
+        if self._task: return
+        self._sender = sender
+        self._wakeup = asyncio.Event()
+
+        rows = await adb.load_scheduled_deletions() if restore else []
+        for row in rows:
+            heapq.heappush(self._heap, (row["due_at"], row["chat_id"], row["message_id"]))
+        if rows:
+            await adb.clear_scheduled_deletions()
+            logger.info(f"Restored {len(rows)} scheduled deletions")
+
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the worker, finish the round in flight and persist whatever is still queued"""
+        if self._task:
+            self._task.cancel()
+            try: await self._task
+            except asyncio.CancelledError: pass
+            self._task = None
+        if self._round is not None:
+            await self._round
+            self._round = None
+
+        if self._heap:
+            rows = [{"chat_id": chat_id, "message_id": message_id, "due_at": due_at} for due_at, chat_id, message_id in self._heap]
+            if await adb.save_scheduled_deletions(rows):
+                logger.info(f"Persisted {len(rows)} scheduled deletions")
+                self._heap.clear()
+
+    def __len__(self) -> int:
+        """Queue depth"""
+        return len(self._heap)
+
+    def stats(self) -> dict:
+        return {"queued": len(self._heap), "deleted": self.deleted, "requests": self.requests}
+
+
+deletion_scheduler = DeletionScheduler()
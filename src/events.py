@@ -0,0 +1,55 @@
+"""
+Event Bus
+Shared-state changes (banned words, licenses, warns, approvals, media verdicts, spam) and owner commands propagated between worker processes
+"""
+
+import logging
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Event names
+BANNED_WORDS_CHANGED = "banned_words_changed"
+LICENSE_CHANGED = "license_changed"
+WARN_CHANGED = "warn_changed"
+APPROVAL_ADDED = "approval_added"
+APPROVAL_REMOVED = "approval_removed"
+SPAM_FINGERPRINT = "spam_fingerprint"
+MEDIA_VERDICT = "media_verdict"
+PROFILE_COMMAND = "profile_command"
+
+_subscribers: Dict[str, List[Callable[..., None]]] = {}
+_transport: Optional[Callable[[str, dict], None]] = None
+
+
+def subscribe(name: str, callback: Callable[..., None]):
+    """Call `callback(**payload)` whenever another process publishes `name`"""
+    _subscribers.setdefault(name, []).append(callback)
+
+
+def set_transport(transport: Optional[Callable[[str, dict], None]]):
+    """Install the function that ships events to the other processes (worker mode only)"""
+    global _transport
+    _transport = transport
+
+
+def publish(name: str, **payload):
+    """
+    Announce a change this process already applied locally.
+
+    A no-op in single-process mode, so callers publish unconditionally.
+    """
+    if _transport is None: return
+    try:
+        _transport(name, payload)
+    except Exception as e:
+        logger.error(f"Could not publish {name}: {e}")
+
+
+def dispatch(name: str, payload: dict):
+    """Apply an event received from another process"""
+    for callback in _subscribers.get(name, ()):
+        try:
+            callback(**payload)
+        except Exception as e:
+            logger.error(f"Event handler for {name} failed: {e}")
@@ -0,0 +1,191 @@
+"""
+Spam Fingerprints
+Near-duplicate detection for copy-paste spam waves across chats (MinHash + LSH bands)
+"""
+
+import os
+import time
+import zlib
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple, Union
+from src import events
+from src.analysis import MessageAnalysis, normalize_text
+
+# Signature layout: BINS one-permutation MinHash values, split into BANDS for lookup
+BINS = 32
+BANDS = 8
+ROWS = BINS // BANDS
+MAX_CHARS = 600            # long messages are fingerprinted on their beginning
+EMPTY = 1 << 64            # above any shingle hash
+
+Signature = Tuple[int, ...]
+
+
+class Fingerprint(NamedTuple):
+    clean: str             # normalize_text() skeleton, what other processes rebuild the signature from
+    signature: Signature
+
+
+def minhash_signature(clean: str) -> Signature:
+    """
+    One-permutation MinHash over character 3-shingles of a normalized text.
+
+    Shingles are hashed with CRC-32 of their UTF-8 bytes, so a text has the
+    same signature in every process and across restarts, and binned by
+    their low bits, keeping the minimum per bin. Every step runs in C: sort
+    descending, and the dict keeps the last (smallest) hash written to each
+    bin.
+    """
+    shingles = map(str.encode, map("".join, zip(clean, clean[1:], clean[2:])))
+    hashes = sorted(map(zlib.crc32, shingles), reverse=True)
+    bins = dict(zip(map((BINS - 1).__and__, hashes), hashes))
+    return tuple([bins.get(i, EMPTY) for i in range(BINS)])
+
+
+def fingerprint(text: Union[str, MessageAnalysis], min_chars: int = 24) -> Optional[Fingerprint]:
+    """
+    Fingerprint a message (text or its MessageAnalysis).
+
+    Returns:
+        Fingerprint or None if the message is too short to compare
+    """
+    clean = (text.clean if isinstance(text, MessageAnalysis) else normalize_text(text))[:MAX_CHARS]
+    if len(clean) < min_chars: return None
+    return Fingerprint(clean, minhash_signature(clean))
+
+
+def similarity(a: Signature, b: Signature) -> float:
+    """Estimated Jaccard similarity (bins empty in both are ignored)"""
+    same = used = 0
+    for x, y in zip(a, b):
+        if x == EMPTY and y == EMPTY: continue
+        used += 1
+        if x == y: same += 1
+    return same / used if used else 0.0
+
+
+def _band_keys(signature: Signature) -> List[int]:
+    return [hash((band,) + signature[band * ROWS:(band + 1) * ROWS]) for band in range(BANDS)]
+
+
+class _BandIndex:
+    """Signatures with expiry and a hard cap, looked up through their LSH band keys"""
+
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: "OrderedDict[Signature, list]" = OrderedDict()  # signature -> [added_at, chats]
+        self._bands: Dict[int, Signature] = {}
+
+    def _remove(self, signature: Signature):
+        self._entries.pop(signature, None)
+        for key in _band_keys(signature):
+            if self._bands.get(key) == signature:
+                del self._bands[key]
+
+    def _expire(self, now: float):
+        while self._entries:
+            signature, (added_at, _) = next(iter(self._entries.items()))
+            if now - added_at < self.ttl and len(self._entries) <= self.max_size: return
+            self._remove(signature)
+
+    def find(self, signature: Signature, threshold: float, now: float) -> Optional[Signature]:
+        self._expire(now)
+        for key in _band_keys(signature):
+            candidate = self._bands.get(key)
+            if candidate is not None and similarity(signature, candidate) >= threshold:
+                return candidate
+        return None
+
+    def add(self, signature: Signature, now: float) -> list:
+        entry = self._entries.get(signature)
+        if entry is None:
+            entry = self._entries[signature] = [now, set()]
+            for key in _band_keys(signature):
+                self._bands[key] = signature
+            self._expire(now)
+        return entry
+
+    def entry(self, signature: Signature) -> Optional[list]:
+        return self._entries.get(signature)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SpamFingerprintIndex:
+    """
+    Remembers fingerprints of confirmed spam so near-duplicates are rejected
+    in any chat without running the rest of the pipeline.
+
+    Spam is confirmed when the link or global banned word checks catch a
+    message (confirm()), or, if FINGERPRINT_WAVE_CHATS is set, when near-identical
+    messages show up in that many different chats within FINGERPRINT_WAVE_TTL.
+    Both indexes expire entries and are capped, and lookups cost one
+    signature plus BANDS dict probes. Nothing is computed until the first
+    spam is confirmed (or wave detection is enabled).
+    """
+
+    def __init__(self):
+        self.threshold = float(os.getenv("FINGERPRINT_SIMILARITY", "0.7"))
+        self.min_chars = int(os.getenv("FINGERPRINT_MIN_CHARS", "24"))
+        self.wave_chats = int(os.getenv("FINGERPRINT_WAVE_CHATS", "0"))
+        self.spam = _BandIndex(
+            ttl=float(os.getenv("FINGERPRINT_SPAM_TTL", str(6 * 3600))),
+            max_size=int(os.getenv("FINGERPRINT_SPAM_MAX", "20000")),
+        )
+        self.recent = _BandIndex(
+            ttl=float(os.getenv("FINGERPRINT_WAVE_TTL", "900")),
+            max_size=int(os.getenv("FINGERPRINT_RECENT_MAX", "50000")),
+        )
+        self.rejected = 0
+        events.subscribe(events.SPAM_FINGERPRINT, lambda clean: self._add_spam(minhash_signature(clean)))
+
+    @property
+    def active(self) -> bool:
+        """Whether messages need fingerprinting at all"""
+        return bool(self.wave_chats) or len(self.spam) > 0
+
+    def fingerprint(self, text: Union[str, MessageAnalysis]) -> Optional[Fingerprint]:
+        return fingerprint(text, self.min_chars)
+
+    def _add_spam(self, signature: Signature):
+        self.spam.add(signature, time.monotonic())
+
+    def is_spam(self, fp: Optional[Fingerprint]) -> bool:
+        """True if the message is a near-duplicate of confirmed spam"""
+        if fp is None or not len(self.spam): return False
+        if self.spam.find(fp.signature, self.threshold, time.monotonic()) is None: return False
+        self.rejected += 1
+        return True
+
+    def confirm(self, fp: Optional[Fingerprint]):
+        """Record a message the pipeline found to be spam (shared with other workers)"""
+        if fp is None: return
+        self._add_spam(fp.signature)
+        events.publish(events.SPAM_FINGERPRINT, clean=fp.clean)
+
+    def observe(self, fp: Optional[Fingerprint], chat_id: int) -> bool:
+        """
+        Track a clean message for wave detection.
+
+        Returns:
+            True if it completes a wave (and was confirmed as spam)
+        """
+        if fp is None or not self.wave_chats: return False
+        now = time.monotonic()
+        match = self.recent.find(fp.signature, self.threshold, now)
+        entry = self.recent.entry(match) if match is not None else self.recent.add(fp.signature, now)
+        chats: Set[int] = entry[1]
+        if len(chats) < self.wave_chats:
+            chats.add(chat_id)
+        if len(chats) >= self.wave_chats:
+            self.confirm(fp)
+            return True
+        return False
+
+    def stats(self) -> dict:
+        return {"spam": len(self.spam), "recent": len(self.recent), "rejected": self.rejected}
+
+
+spam_index = SpamFingerprintIndex()
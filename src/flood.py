@@ -0,0 +1,144 @@
+"""
+Flood Detector
+Per-chat, per-user message rate limits in fixed-size array-backed storage
+"""
+
+import os
+import time
+from array import array
+from collections import OrderedDict
+from typing import List, NamedTuple, Optional
+
+
+class FloodHit(NamedTuple):
+    rule: str    # "window" (too many messages in the window) or "rate" (token bucket empty)
+    first: bool  # first hit of this flood, later ones inside the cooldown only get deleted
+
+
+class FloodDetector:
+    """
+    Two limits per (chat, user), both O(1) per message:
+
+    - sliding window: more than `max_messages` within `window` seconds,
+      kept as a ring of the last `max_messages` timestamps;
+    - token bucket: sustained rate above `rate` msg/s with `burst` headroom.
+
+    Every tracked pair owns a slot in preallocated arrays, so memory is
+    fixed by `capacity` regardless of group size. Pairs idle for `idle`
+    seconds are evicted first; when all slots are taken the least recently
+    active pair gives up its slot.
+    """
+
+    def __init__(self, max_messages: int = None, window: float = None, rate: float = None,
+                 burst: float = None, capacity: int = None, idle: float = None):
+        self.max_messages = max_messages or int(os.getenv("FLOOD_MAX_MESSAGES", "8"))
+        self.window = window or float(os.getenv("FLOOD_WINDOW", "10"))
+        self.rate = rate or float(os.getenv("FLOOD_RATE", "1"))
+        self.burst = burst or float(os.getenv("FLOOD_BURST", "5"))
+        self.capacity = capacity or int(os.getenv("FLOOD_MAX_TRACKED", "50000"))
+        self.idle = idle or float(os.getenv("FLOOD_IDLE", "60"))
+        self.clock = time.monotonic  # replaced by the replay tool with recorded message times
+
+        n = self.capacity
+        self._stamps = array("d", bytes(8 * n * self.max_messages))  # ring of timestamps per slot
+        self._heads = array("I", bytes(4 * n))                       # next ring position
+        self._tokens = array("d", bytes(8 * n))
+        self._last_seen = array("d", bytes(8 * n))
+        self._cooldown = array("d", bytes(8 * n))                    # flood flagged until
+
+        self._slots: "OrderedDict[int, int]" = OrderedDict()  # pair key -> slot, least recently active first
+        self._free: List[int] = list(range(n - 1, -1, -1))
+        self.evicted = 0
+        self.hits = 0
+
+    @staticmethod
+    def _key(chat_id: int, user_id: int) -> int:
+        # One int instead of a tuple per tracked pair (user IDs fit in 64 bits)
+        return (chat_id << 64) | user_id
+
+    def _evict_idle(self, now: float):
+        slots = self._slots
+        while slots:
+            slot = slots[next(iter(slots))]
+            if now - self._last_seen[slot] < self.idle: return
+            slots.popitem(last=False)
+            self._free.append(slot)
+            self.evicted += 1
+
+    def _allocate(self, key: int) -> int:
+        if self._free:
+            slot = self._free.pop()
+        else:
+            _, slot = self._slots.popitem(last=False)
+            self.evicted += 1
+
+        base = slot * self.max_messages
+        for i in range(base, base + self.max_messages):
+            self._stamps[i] = 0.0
+        self._heads[slot] = 0
+        self._tokens[slot] = self.burst
+        self._cooldown[slot] = 0.0
+        self._slots[key] = slot
+        return slot
+
+    def check(self, chat_id: int, user_id: int, now: Optional[float] = None) -> Optional[FloodHit]:
+        """
+        Count one message and tell whether it exceeds a limit.
+
+        Args:
+            chat_id: Telegram chat ID
+            user_id: Telegram user ID
+            now: Message time (defaults to self.clock())
+
+        Returns:
+            FloodHit if the user is flooding, None otherwise
+        """
+        now = self.clock() if now is None else now
+        self._evict_idle(now)
+
+        key = self._key(chat_id, user_id)
+        slot = self._slots.get(key)
+        if slot is None:
+            slot = self._allocate(key)
+            elapsed = 0.0
+        else:
+            self._slots.move_to_end(key)
+            elapsed = now - self._last_seen[slot]
+        self._last_seen[slot] = now
+
+        # Sliding window: the oldest of the last max_messages stamps
+        head = self._heads[slot]
+        index = slot * self.max_messages + head
+        oldest = self._stamps[index]
+        self._stamps[index] = now
+        self._heads[slot] = (head + 1) % self.max_messages
+        rule = "window" if oldest and now - oldest < self.window else None
+
+        # Token bucket
+        tokens = min(self.burst, self._tokens[slot] + elapsed * self.rate)
+        if tokens >= 1:
+            self._tokens[slot] = tokens - 1
+        else:
+            self._tokens[slot] = tokens
+            rule = rule or "rate"
+
+        if rule is None: return None
+        self.hits += 1
+        first = now >= self._cooldown[slot]
+        self._cooldown[slot] = now + self.window
+        return FloodHit(rule, first)
+
+    def forget(self, chat_id: int, user_id: int):
+        """Drop a user's history (e.g. after an admin unmutes them)"""
+        slot = self._slots.pop(self._key(chat_id, user_id), None)
+        if slot is not None:
+            self._free.append(slot)
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def stats(self) -> dict:
+        return {"tracked": len(self._slots), "capacity": self.capacity, "evicted": self.evicted, "hits": self.hits}
+
+
+flood_detector = FloodDetector()
@@ -3,21 +3,15 @@ Command handlers for the Telegram bot (Persian/Farsi)
 """
 
 import logging
-import asyncio
 from telegram import Update
 from telegram.ext import ContextTypes
-from src.database import db
+from src.database import adb
+from src.deletion_scheduler import deletion_scheduler
+from src.user_registry import user_registry
+from src.warn_ledger import warn_ledger
 
 logger = logging.getLogger(__name__)
 
-# Helper for Flash Messages
-async def delete_later(bot, chat_id, message_id, delay):
-    try:
-        await asyncio.sleep(delay)
-        await bot.delete_message(chat_id=chat_id, message_id=message_id)
-    except Exception:
-        pass
-
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /start command - Detailed Welcome Message"""
     try:
@@ -27,7 +21,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
         user = update.effective_user
         
         # Initialize user in database
-        db.initialize_user(user.id, user.username or "Unknown")
+        user_registry.observe(user.id, user.username or "Unknown")
         
         # 🟢 NEW DETAILED WELCOME MESSAGE
         welcome_message = f"""👋 سلام {user.first_name} عزیز!
@@ -59,9 +53,9 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
         
         # Auto-delete after 30 seconds if sent in a group (keep chat clean)
         if update.message.chat.type != 'private':
-            asyncio.create_task(delete_later(context.bot, update.message.chat_id, response.message_id, 30))
+            deletion_scheduler.schedule(update.message.chat_id, response.message_id, 30)
             # Delete user's command
-            asyncio.create_task(delete_later(context.bot, update.message.chat_id, update.message.message_id, 30))
+            deletion_scheduler.schedule(update.message.chat_id, update.message.message_id, 30)
             
     except Exception as e:
         logger.error(f"Error in /start command: {e}")
@@ -83,7 +77,7 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 /warn - اخطار دستی به کاربر (ریپلای)
 /ban - مسدود کردن کاربر (ریپلای)
 /unmute - بخشش و رفع مسدودیت (ریپلای یا آیدی)
-/addword [کلمه] - افزودن کلمه به لیست سیاه
+/addword [کلمه] - افزودن کلمه به لیست سیاه همین گروه
 
 ✅ <b>تایید مدیا:</b>
 برای تایید عکس/فیلم کاربران، در چت خصوصی روی آن ریپلای کنید: <b>تایید</b>
@@ -92,8 +86,8 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         response = await update.message.reply_text(help_text, parse_mode="HTML")
         
         if update.message.chat.type != 'private':
-            asyncio.create_task(delete_later(context.bot, update.message.chat_id, response.message_id, 20))
-            asyncio.create_task(delete_later(context.bot, update.message.chat_id, update.message.message_id, 20))
+            deletion_scheduler.schedule(update.message.chat_id, response.message_id, 20)
+            deletion_scheduler.schedule(update.message.chat_id, update.message.message_id, 20)
             
     except Exception as e:
         logger.error(f"Error in /help command: {e}")
@@ -106,14 +100,18 @@ async def stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
             return
         
         user = update.effective_user
-        user_stats = db.get_user_stats(user.id)
         
-        if not user_stats:
-            # If user not found, init them and say 0 warnings
-            db.initialize_user(user.id, user.username or "Unknown")
-            warn_count = 0
-        else:
-            warn_count = user_stats.get("warn_count", 0)
+        # Warn ledger first: it already knows recently warned users
+        warn_count = warn_ledger.get(user.id)
+        
+        if warn_count is None:
+            user_stats = await adb.get_user_stats(user.id)
+            if not user_stats:
+                # If user not found, init them and say 0 warnings
+                user_registry.observe(user.id, user.username or "Unknown")
+                warn_count = 0
+            else:
+                warn_count = user_stats.get("warn_count", 0)
             
         if warn_count == 0:
             status = "✅ وضعیت: عالی (بدون اخطار)"
@@ -133,8 +131,8 @@ async def stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
         msg = await update.message.reply_text(response, parse_mode="HTML")
         
         if update.message.chat.type != 'private':
-            asyncio.create_task(delete_later(context.bot, update.message.chat_id, msg.message_id, 15))
-            asyncio.create_task(delete_later(context.bot, update.message.chat_id, update.message.message_id, 15))
+            deletion_scheduler.schedule(update.message.chat_id, msg.message_id, 15)
+            deletion_scheduler.schedule(update.message.chat_id, update.message.message_id, 15)
             
     except Exception as e:
         logger.error(f"Error in /stats command: {e}")
\ No newline at end of file
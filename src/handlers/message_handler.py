@@ -4,22 +4,33 @@ Portfolio Version - Manual Approval Only
 """
 
 import logging
-import re
-import asyncio
-from telegram import Update, ChatMember, ChatPermissions, MessageEntity
+from typing import Optional
+from telegram import Update, ChatMember, ChatPermissions
 from telegram.ext import ContextTypes
-from src.database import db
+from src.database import adb
+from src.deletion_scheduler import deletion_scheduler
+from src.analysis import MessageAnalysis
+from src.link_detector import link_detector
+from src.admin_cache import admin_roster
+from src.user_registry import user_registry
+from src.warn_ledger import warn_ledger
+from src.approval_store import approval_store
+from src.media_verdicts import media_verdicts, media_unique_id
+from src.flood import flood_detector
+from src.outbound import outbound, PRIORITY_NOTICE
+from src.fingerprint import spam_index
+from src.metrics import timed_handler
+from src.profiler import profiler
+from src.word_matcher import WordMatch
 
 logger = logging.getLogger(__name__)
 
-# MEMORY for Approval System
-PENDING_APPROVALS = {}
-
 # 🔴 GLOBAL OWNER ID
 OWNER_ID = 2117254740
 
 # ==================== HELPER FUNCTIONS ====================
 
+@profiler.stage("license")
 async def check_license(update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
     """Returns True if allowed, False if bot should leave."""
     if not update.message: return True
@@ -27,7 +38,7 @@ async def check_license(update: Update, context: ContextTypes.DEFAULT_TYPE) -> b
     
     if chat.type == 'private': return True
         
-    if db.is_group_allowed(chat.id):
+    if await adb.is_group_allowed(chat.id):
         return True
         
     try:
@@ -44,12 +55,7 @@ async def check_license(update: Update, context: ContextTypes.DEFAULT_TYPE) -> b
         
     return False
 
-async def delete_later(bot, chat_id, message_id, delay):
-    try:
-        await asyncio.sleep(delay)
-        await bot.delete_message(chat_id=chat_id, message_id=message_id)
-    except Exception: pass
-
+@profiler.stage("admin")
 async def is_admin(update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
     """Check if user is Admin OR The Bot Owner (God Mode)"""
     if not update.message or not update.effective_user: return False
@@ -58,12 +64,8 @@ async def is_admin(update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
     if update.effective_user.id == OWNER_ID:
         return True
 
-    try:
-        user_status = await update.message.chat.get_member(update.effective_user.id)
-        admin_statuses = [ChatMember.ADMINISTRATOR, ChatMember.OWNER]
-        if hasattr(ChatMember, 'CREATOR'): admin_statuses.append(ChatMember.CREATOR)
-        return user_status.status in admin_statuses
-    except Exception: return False
+    if update.message.chat.type == 'private': return False
+    return await admin_roster.is_admin(context.bot, update.message.chat_id, update.effective_user.id)
 
 async def log_spam_event(user_id: int, username: str, spam_type: str, content: str, chat_id: int):
     try:
@@ -71,61 +73,73 @@ async def log_spam_event(user_id: int, username: str, spam_type: str, content: s
     except Exception: pass
 
 async def handle_punishment(update: Update, context: ContextTypes.DEFAULT_TYPE, user, reason: str):
-    new_warn_count = db.add_warn(user.id)
+    new_warn_count = await warn_ledger.add_warn(user.id)
+    if new_warn_count is None: return
     user_mention = user.mention_html()
     
+    chat_id = update.message.chat_id
+    
     if new_warn_count >= 3:
-        try:
-            await context.bot.ban_chat_member(chat_id=update.message.chat_id, user_id=user.id)
-            msg_text = f"🚫 کاربر {user_mention} به دلیل {reason} و دریافت ۳ اخطار **مسدود شد**!"
-        except Exception:
-            msg_text = f"🚫 اخطار سوم برای {user_mention} (ربات دسترسی بن ندارد)."
-    else:
-        msg_text = f"🚫 {user_mention} عزیز، {reason} مجاز نیست.\n⚠️ اخطار: {new_warn_count}/3"
+        # The notice follows the ban's outcome without holding up the handler
+        def announce(ban):
+            if not ban.cancelled() and ban.exception() is None:
+                msg_text = f"🚫 کاربر {user_mention} به دلیل {reason} و دریافت ۳ اخطار **مسدود شد**!"
+            else:
+                msg_text = f"🚫 اخطار سوم برای {user_mention} (ربات دسترسی بن ندارد)."
+            outbound.notice(chat_id, user.id, msg_text, delete_after=5)
+        
+        outbound.ban(chat_id, user.id).add_done_callback(announce)
+        return
 
-    warning = await context.bot.send_message(chat_id=update.message.chat_id, text=msg_text, parse_mode="HTML")
-    asyncio.create_task(delete_later(context.bot, update.message.chat_id, warning.message_id, 5))
+    # Repeated warnings for the same user collapse into one message
+    msg_text = f"🚫 {user_mention} عزیز، {reason} مجاز نیست.\n⚠️ اخطار: {new_warn_count}/3"
+    outbound.notice(chat_id, user.id, msg_text, delete_after=5)
 
-# ==================== LOGIC: TEXT CLEANING ====================
+@profiler.stage("flood")
+async def check_flood(update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
+    """Returns True if the message was part of a flood and has been dealt with."""
+    chat = update.message.chat
+    if chat.type == 'private': return False
 
-def normalize_text(text: str) -> str:
-    if not text: return ""
-    clean = re.sub(r'[^\w\d\u0600-\u06FF]', '', text)
-    clean = clean.replace('_', '')
-    clean = re.sub(r'(.)\1+', r'\1', clean)
-    return clean.lower()
+    user = update.effective_user
+    hit = flood_detector.check(chat.id, user.id)
+    if not hit: return False
+    if await is_admin(update, context): return False
+
+    # Every flood message is deleted, only the first one of a burst is punished
+    outbound.delete(chat.id, update.message.message_id)
+    if hit.first:
+        logger.debug(f"Flood rule '{hit.rule}' matched for user {user.id} in chat {chat.id}")
+        await handle_punishment(update, context, user, "ارسال پیام‌های پشت سر هم")
+    return True
+
+async def shed_update(update: object):
+    """
+    Backpressure fallback for an update its chat queue had no room for.
+    Group messages from anyone but an admin are deleted without notices or
+    warns, so a raid cannot get spam past the bot by outrunning it.
+    """
+    if not isinstance(update, Update) or not update.message or not update.effective_user: return
+    chat = update.message.chat
+    if chat.type == 'private' or update.effective_user.id == OWNER_ID: return
+    if not await adb.is_group_allowed(chat.id): return
+    if await admin_roster.is_admin(update.get_bot(), chat.id, update.effective_user.id): return
+    outbound.delete(chat.id, update.message.message_id)
+
+# ==================== LOGIC: TEXT CLEANING ====================
 
 def has_link(message) -> bool:
-    entities = message.entities or []
-    caption_entities = message.caption_entities or []
-    all_entities = list(entities) + list(caption_entities)
-    for entity in all_entities:
-        if entity.type in [MessageEntity.URL, MessageEntity.TEXT_LINK]: return True
-
-    text_content = message.text or message.caption or ""
-    text_lower = text_content.lower()
-    
-    url_keywords = ['http://', 'https://', 'www.', '.com', '.ir', '.net', '.org', 't.me', 'bit.ly']
-    for keyword in url_keywords:
-        if keyword in text_lower: return True
-
-    skeleton = re.sub(r'[^a-z]+', '', text_lower)
-    skeleton_clean = re.sub(r'(.)\1+', r'\1', skeleton)
-    extensions = ['com', 'ir', 'net', 'org', 'xyz', 'tk', 'info', 'io', 'me', 'site']
-    common_sites = ['google', 'youtube', 'instagram', 'telegram', 'whatsapp', 'sex', 'porn', 'xxx']
-    prefixes = ['http', 'https', 'www', 'tme']
-
-    for site in common_sites:
-        for ext in extensions:
-            if site + ext in skeleton_clean: return True
-    for p in prefixes:
-        if p in skeleton_clean: return True
-    has_symbols = bool(re.search(r'[\./,\\_]', text_lower))
-    if has_symbols:
-        for ext in extensions:
-            if skeleton_clean.endswith(ext) and len(skeleton_clean) > len(ext) + 2:
-                return True
-    return False
+    return link_detector.detect(message) is not None
+
+@profiler.stage("links")
+def detect_link(message, analysis: MessageAnalysis) -> Optional[str]:
+    return link_detector.detect(message, analysis)
+
+@profiler.stage("words")
+async def find_banned_word(chat, analysis: MessageAnalysis) -> Optional[WordMatch]:
+    # Groups get their own words on top of the global list
+    matcher = await adb.get_banned_word_matcher(chat.id if chat.type != 'private' else None)
+    return matcher.find(analysis)
 
 # ==================== HANDLER 1: APPROVAL LOGIC ====================
 
@@ -134,7 +148,7 @@ async def handle_approval(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not update.message.reply_to_message: return
 
     target_msg_id = update.message.reply_to_message.message_id
-    data = PENDING_APPROVALS.get(target_msg_id)
+    data = await approval_store.get(target_msg_id)
 
     if not data:
         await update.message.reply_text("⚠️ پیام یافت نشد.")
@@ -146,41 +160,71 @@ async def handle_approval(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     try:
         if command == "تایید":
-            await update.message.reply_to_message.copy(chat_id=group_id, caption="✅ <b>تایید شد</b>", parse_mode="HTML")
+            await outbound.submit(
+                "copy_message", PRIORITY_NOTICE, group_id,
+                from_chat_id=update.message.chat_id, message_id=update.message.reply_to_message.message_id,
+                caption="✅ <b>تایید شد</b>", parse_mode="HTML",
+            )
             await update.message.reply_text("✅ ارسال شد.")
         elif command == "رد":
             try:
                 member = await context.bot.get_chat_member(group_id, user_id)
                 user_mention = member.user.mention_html()
             except: user_mention = "کاربر"
-            msg = await context.bot.send_message(chat_id=group_id, text=f"❌ مدیا ارسالی {user_mention} **رد شد**.", parse_mode="HTML")
-            asyncio.create_task(delete_later(context.bot, group_id, msg.message_id, 10))
+            msg = await outbound.submit("send_message", PRIORITY_NOTICE, group_id, text=f"❌ مدیا ارسالی {user_mention} **رد شد**.", parse_mode="HTML")
+            deletion_scheduler.schedule(group_id, msg.message_id, 10)
             await update.message.reply_text("❌ رد شد.")
-        del PENDING_APPROVALS[target_msg_id]
+        # Same file sent again is decided without asking
+        await media_verdicts.record(group_id, data.get('file_unique_id'), command == "تایید")
+        await approval_store.pop(target_msg_id)
     except Exception as e:
         logger.error(f"Approval error: {e}")
 
 # ==================== HANDLER 2: MEDIA (MANUAL ONLY) ====================
 
+@timed_handler("check_media")
 async def check_media(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not update.message or not update.effective_user: return
     
     # 🟢 CHECK 1: License
     if not await check_license(update, context): return
 
-    # 🟢 CHECK 2: Owner/Admin Immunity
+    # 🟢 CHECK 2: Flood (before any other work)
+    if await check_flood(update, context): return
+
+    # 🟢 CHECK 3: Owner/Admin Immunity
     if await is_admin(update, context): return
 
+    # 🟢 CHECK 4: Owner already decided on this file
+    file_unique_id = media_unique_id(update.message)
+    verdict = await media_verdicts.get(update.message.chat_id, file_unique_id)
+    if verdict is True:
+        # The file itself is fine, its caption still goes through the text filters
+        analysis = MessageAnalysis.from_message(update.message)
+        if not analysis.text: return
+        if detect_link(update.message, analysis):
+            reason = "ارسال لینک"
+        elif await find_banned_word(update.message.chat, analysis):
+            reason = "ارسال کلمات نامناسب"
+        else:
+            return
+        outbound.delete(update.message.chat_id, update.message.message_id)
+        await handle_punishment(update, context, update.effective_user, reason)
+        return
+    if verdict is False:
+        outbound.delete(update.message.chat_id, update.message.message_id)
+        outbound.notice(update.message.chat_id, update.effective_user.id, f"❌ مدیا ارسالی {update.effective_user.mention_html()} مجاز نیست.", delete_after=5)
+        return
+
     try:
         try:
             forwarded_msg = await update.message.forward(chat_id=OWNER_ID)
-            PENDING_APPROVALS[forwarded_msg.message_id] = {'chat_id': update.message.chat_id, 'user_id': update.effective_user.id}
+            await approval_store.put(forwarded_msg.message_id, update.message.chat_id, update.effective_user.id, file_unique_id)
             await context.bot.send_message(chat_id=OWNER_ID, text=f"📩 مدیا برای بررسی:\nتایید / رد")
         except Exception: pass 
 
-        await update.message.delete()
-        msg = await context.bot.send_message(chat_id=update.message.chat_id, text=f"🔒 {update.effective_user.mention_html()} مدیا برای بررسی ارسال شد.", parse_mode="HTML")
-        asyncio.create_task(delete_later(context.bot, update.message.chat_id, msg.message_id, 5))
+        outbound.delete(update.message.chat_id, update.message.message_id)
+        outbound.notice(update.message.chat_id, update.effective_user.id, f"🔒 {update.effective_user.mention_html()} مدیا برای بررسی ارسال شد.", delete_after=5)
     except Exception as e:
         logger.error(f"Media error: {e}")
 
@@ -200,39 +244,60 @@ async def handle_new_chat_members(update: Update, context: ContextTypes.DEFAULT_
             # If licensed, say hello
             await update.message.reply_text("✅ ربات آماده به کار است.")
 
+async def handle_chat_member_update(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Keep the cached admin roster in sync with promotions and demotions"""
+    member_update = update.chat_member or update.my_chat_member
+    if member_update:
+        admin_roster.apply_update(member_update)
+
+@timed_handler("handle_text")
 async def handle_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not update.message or not update.effective_user: return
     
     # 🟢 CHECK 1: License
     if not await check_license(update, context): return
 
+    # 🟢 CHECK 2: Flood (before any other work)
+    if await check_flood(update, context): return
+
     user = update.effective_user
-    db.initialize_user(user.id, user.username or "Unknown")
+    user_registry.observe(user.id, user.username or "Unknown")
     
-    # 🟢 CHECK 2: Owner/Admin Immunity
+    # 🟢 CHECK 3: Owner/Admin Immunity
     if await is_admin(update, context): return
 
-    message_text = update.message.text or update.message.caption or ""
-    if not message_text: return
-    message_text_lower = message_text.lower()
+    # Lowercase / skeleton forms are computed once and shared by every filter below
+    analysis = MessageAnalysis.from_message(update.message)
+    if not analysis.text: return
     
-    if has_link(update.message):
-        try:
-            await update.message.delete()
-            await handle_punishment(update, context, user, "ارسال لینک")
-            return
-        except Exception: pass
+    chat = update.message.chat
     
-    banned_words = db.get_banned_words()
-    if banned_words:
-        cleaned_message = normalize_text(message_text_lower)
-        for word in banned_words:
-            if word in message_text_lower:
-                await update.message.delete()
-                await handle_punishment(update, context, user, "ارسال کلمات نامناسب")
-                return
-            word_clean = normalize_text(word)
-            if word_clean and word_clean in cleaned_message:
-                await update.message.delete()
-                await handle_punishment(update, context, user, "ارسال کلمات نامناسب")
-                return
\ No newline at end of file
+    # Near-duplicate of spam already caught in any chat: reject without further checks
+    fingerprint = spam_index.fingerprint(analysis) if spam_index.active else None
+    if spam_index.is_spam(fingerprint):
+        outbound.delete(chat.id, update.message.message_id)
+        await handle_punishment(update, context, user, "ارسال پیام تبلیغاتی")
+        return
+    
+    link_rule = detect_link(update.message, analysis)
+    if link_rule:
+        logger.debug(f"Link rule '{link_rule}' matched for user {user.id}")
+        spam_index.confirm(fingerprint or spam_index.fingerprint(analysis))
+        outbound.delete(chat.id, update.message.message_id)
+        await handle_punishment(update, context, user, "ارسال لینک")
+        return
+    
+    match = await find_banned_word(chat, analysis)
+    if match:
+        # The fingerprint index is shared by every chat, a chat's own words stay out of it
+        if not match.chat_word:
+            spam_index.confirm(fingerprint or spam_index.fingerprint(analysis))
+        outbound.delete(chat.id, update.message.message_id)
+        await handle_punishment(update, context, user, "ارسال کلمات نامناسب")
+        return
+    
+    # Same text turning up in many chats at once (FINGERPRINT_WAVE_CHATS)
+    if chat.type != 'private' and spam_index.observe(fingerprint, chat.id):
+        outbound.delete(chat.id, update.message.message_id)
+        await handle_punishment(update, context, user, "ارسال پیام تبلیغاتی")
+        return
@@ -2,25 +2,26 @@
 Moderation handlers for group administration (Persian/Farsi)
 """
 
+import os
+import html
 import logging
-import asyncio
+from typing import Optional
 from telegram import Update, ChatMember, ChatPermissions
 from telegram.ext import ContextTypes
-from src.database import db
+from src.database import adb
+from src.admin_cache import admin_roster
+from src.warn_ledger import warn_ledger
+from src.flood import flood_detector
+from src.outbound import outbound, PRIORITY_BAN
+from src.metrics import timed_handler
+from src.profiler import profiler
+from src import events
 
 logger = logging.getLogger(__name__)
 
 # 🔴 GLOBAL OWNER ID
 OWNER_ID = 2117254740
 
-async def delete_later(bot, chat_id, message_id, delay):
-    """Wait for 'delay' seconds, then delete the message"""
-    try:
-        await asyncio.sleep(delay)
-        await bot.delete_message(chat_id=chat_id, message_id=message_id)
-    except Exception:
-        pass
-
 async def is_admin(update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
     """Check if the user is a group administrator OR the Bot Owner"""
     if not update.message or not update.effective_user:
@@ -30,21 +31,12 @@ async def is_admin(update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
     if update.effective_user.id == OWNER_ID:
         return True
 
-    try:
-        # Get user status in the chat
-        user_status = await update.message.chat.get_member(update.effective_user.id)
-        
-        # Check if user is admin or owner
-        admin_statuses = [ChatMember.ADMINISTRATOR, ChatMember.OWNER]
-        
-        if hasattr(ChatMember, 'CREATOR'):
-            admin_statuses.append(ChatMember.CREATOR)
-        
-        return user_status.status in admin_statuses
-    except Exception as e:
-        logger.error(f"Error checking admin: {e}")
+    if update.message.chat.type == 'private':
         return False
 
+    # Shared roster: one get_chat_administrators per chat instead of get_member per call
+    return await admin_roster.is_admin(context.bot, update.message.chat_id, update.effective_user.id)
+
 
 async def delete_messages(context: ContextTypes.DEFAULT_TYPE, chat_id: int, message_id: int, admin_message_id: int = None):
     """Delete bot and admin messages after 5 seconds"""
@@ -56,64 +48,56 @@ async def delete_messages(context: ContextTypes.DEFAULT_TYPE, chat_id: int, mess
         logger.warning(f"Error deleting message: {e}")
 
 
+@timed_handler("warn")
 async def warn(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /warn command"""
     if not update.message or not update.effective_user: return
     if not await is_admin(update, context): return
 
-    try: await update.message.delete()
-    except Exception: pass
+    outbound.delete(update.message.chat_id, update.message.message_id)
     
     if not update.message.reply_to_message or not update.message.reply_to_message.from_user:
-        msg = await context.bot.send_message(chat_id=update.message.chat_id, text="⚠️ لطفاً به پیام کاربر پاسخ دهید.")
-        asyncio.create_task(delete_later(context.bot, update.message.chat_id, msg.message_id, 3))
+        outbound.notice(update.message.chat_id, update.effective_user.id, "⚠️ لطفاً به پیام کاربر پاسخ دهید.", delete_after=3, parse_mode=None)
         return
     
     target_user = update.message.reply_to_message.from_user
-    new_warn_count = db.add_warn(target_user.id)
+    new_warn_count = await warn_ledger.add_warn(target_user.id)
     
     if new_warn_count is None: return
 
     if new_warn_count >= 3:
         try:
-            await context.bot.restrict_chat_member(
-                chat_id=update.message.chat_id,
-                user_id=target_user.id,
-                permissions=ChatPermissions(can_send_messages=False)
-            )
+            await outbound.restrict(update.message.chat_id, target_user.id, ChatPermissions(can_send_messages=False))
             warning_msg = f"🚫 کاربر {target_user.mention_html()} به دلیل دریافت ۳ اخطار مسدود شد!"
         except Exception:
             warning_msg = f"🚫 اخطار سوم برای {target_user.mention_html()} (خطا در مسدود سازی)"
     else:
         warning_msg = f"⚠️ اخطار برای {target_user.mention_html()}\n📊 تعداد: {new_warn_count}/3"
     
-    response = await context.bot.send_message(chat_id=update.message.chat_id, text=warning_msg, parse_mode="HTML")
-    asyncio.create_task(delete_later(context.bot, update.message.chat_id, response.message_id, 10))
+    outbound.notice(update.message.chat_id, target_user.id, warning_msg, delete_after=10)
 
 
+@timed_handler("ban")
 async def ban(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /ban command"""
     if not update.message or not update.effective_user: return
     if not await is_admin(update, context): return
 
-    try: await update.message.delete()
-    except Exception: pass
+    outbound.delete(update.message.chat_id, update.message.message_id)
     
     if not update.message.reply_to_message:
-        msg = await context.bot.send_message(chat_id=update.message.chat_id, text="⚠️ لطفاً به پیام کاربر پاسخ دهید.")
-        asyncio.create_task(delete_later(context.bot, update.message.chat_id, msg.message_id, 3))
+        outbound.notice(update.message.chat_id, update.effective_user.id, "⚠️ لطفاً به پیام کاربر پاسخ دهید.", delete_after=3, parse_mode=None)
         return
     
     target_user = update.message.reply_to_message.from_user
     
     try:
-        await context.bot.ban_chat_member(chat_id=update.message.chat_id, user_id=target_user.id)
+        await outbound.ban(update.message.chat_id, target_user.id)
         ban_msg = f"🚫 کاربر {target_user.mention_html()} از گروه اخراج شد."
     except Exception as e:
         ban_msg = "❌ خطا در بن کردن کاربر."
     
-    response = await context.bot.send_message(chat_id=update.message.chat_id, text=ban_msg, parse_mode="HTML")
-    asyncio.create_task(delete_later(context.bot, update.message.chat_id, response.message_id, 5))
+    outbound.notice(update.message.chat_id, target_user.id, ban_msg, delete_after=5)
 
 
 async def unmute(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -121,8 +105,7 @@ async def unmute(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not update.message or not update.effective_user: return
     if not await is_admin(update, context): return
 
-    try: await update.message.delete()
-    except Exception: pass
+    outbound.delete(update.message.chat_id, update.message.message_id)
     
     target_user_id = None
     target_name = "کاربر"
@@ -133,13 +116,12 @@ async def unmute(update: Update, context: ContextTypes.DEFAULT_TYPE):
     elif context.args:
         arg = context.args[0]
         if arg.startswith("@") or not arg.isdigit():
-            found_id = db.get_user_id_by_username(arg)
+            found_id = await adb.get_user_id_by_username(arg)
             if found_id:
                 target_user_id = found_id
                 target_name = f"{arg}"
             else:
-                msg = await context.bot.send_message(chat_id=update.message.chat_id, text=f"❌ کاربر {arg} یافت نشد.")
-                asyncio.create_task(delete_later(context.bot, update.message.chat_id, msg.message_id, 5))
+                outbound.notice(update.message.chat_id, update.effective_user.id, f"❌ کاربر {arg} یافت نشد.", parse_mode=None)
                 return
         else:
             try:
@@ -148,26 +130,26 @@ async def unmute(update: Update, context: ContextTypes.DEFAULT_TYPE):
             except ValueError: pass
 
     if not target_user_id:
-        msg = await context.bot.send_message(chat_id=update.message.chat_id, text="⚠️ لطفا ریپلای کنید یا آیدی/نام کاربری وارد کنید.", parse_mode="HTML")
-        asyncio.create_task(delete_later(context.bot, update.message.chat_id, msg.message_id, 5))
+        outbound.notice(update.message.chat_id, update.effective_user.id, "⚠️ لطفا ریپلای کنید یا آیدی/نام کاربری وارد کنید.")
         return
     
     try:
-        await context.bot.unban_chat_member(chat_id=update.message.chat_id, user_id=target_user_id)
-        db.reset_warns(target_user_id)
+        await outbound.submit("unban_chat_member", PRIORITY_BAN, update.message.chat_id, user_id=target_user_id)
+        await adb.reset_warns(target_user_id)
+        warn_ledger.reset(target_user_id)
+        flood_detector.forget(update.message.chat_id, target_user_id)
         try:
-            await context.bot.restrict_chat_member(
-                chat_id=update.message.chat_id,
-                user_id=target_user_id,
-                permissions=ChatPermissions(can_send_messages=True, can_send_media_messages=True, can_send_polls=True, can_add_web_page_previews=True)
+            await outbound.restrict(
+                update.message.chat_id,
+                target_user_id,
+                ChatPermissions(can_send_messages=True, can_send_media_messages=True, can_send_polls=True, can_add_web_page_previews=True)
             )
         except Exception: pass
         msg_text = f"✅ محدودیت‌های {target_name} برداشته شد."
     except Exception as e:
         msg_text = f"❌ خطا: {e}"
     
-    response = await context.bot.send_message(chat_id=update.message.chat_id, text=msg_text, parse_mode="HTML")
-    asyncio.create_task(delete_later(context.bot, update.message.chat_id, response.message_id, 5))
+    outbound.notice(update.message.chat_id, target_user_id, msg_text, delete_after=5)
 
 
 async def addword(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -175,22 +157,24 @@ async def addword(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not update.message or not update.effective_user: return
     if not await is_admin(update, context): return
     
-    try: await update.message.delete()
-    except Exception: pass
+    outbound.delete(update.message.chat_id, update.message.message_id)
 
     if not context.args or len(context.args) == 0:
-        msg = await context.bot.send_message(chat_id=update.message.chat_id, text="⚠️ لطفا کلمه را وارد کنید.")
-        asyncio.create_task(delete_later(context.bot, update.message.chat_id, msg.message_id, 2))
+        outbound.notice(update.message.chat_id, update.effective_user.id, "⚠️ لطفا کلمه را وارد کنید.", delete_after=2, parse_mode=None)
         return
     
     word = " ".join(context.args).strip()
-    result = db.add_banned_word(word)
+    
+    # In a group the word only applies to that group, in the owner's private chat to every group
+    chat = update.message.chat
+    chat_id = chat.id if chat.type != 'private' else None
+    result = await adb.add_banned_word(word, chat_id)
     
     if result is None: text = f"⚠️ کلمه '{word}' قبلاً وجود داشت."
+    elif chat_id is None: text = f"✅ کلمه '{word}' به لیست همه گروه‌ها اضافه شد."
     else: text = f"✅ کلمه '{word}' اضافه شد."
     
-    response = await context.bot.send_message(chat_id=update.message.chat_id, text=text)
-    asyncio.create_task(delete_later(context.bot, update.message.chat_id, response.message_id, 2))
+    outbound.notice(update.message.chat_id, update.effective_user.id, text, delete_after=2, parse_mode=None)
 
 
 async def authorize(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -204,10 +188,95 @@ async def authorize(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat_id = update.message.chat_id
     chat_title = update.message.chat.title or "Unknown Group"
     
-    if db.add_allowed_group(chat_id, chat_title):
+    if await adb.add_allowed_group(chat_id, chat_title):
         await update.message.reply_text("✅ این گروه با موفقیت فعال شد (Licensed).")
     else:
         await update.message.reply_text("⚠️ این گروه قبلاً فعال شده است.")
     
     try: await update.message.delete() 
-    except: pass
\ No newline at end of file
+    except: pass
+
+
+PROFILE_USAGE = (
+    "📈 پروفایل:\n"
+    "/profile 30 — ۳۰ ثانیه\n"
+    "/profile 500u — ۵۰۰ آپدیت\n"
+    "/profile 30 sample — نمونه‌برداری (سبک‌تر)\n"
+    "/profile stop — پایان زودتر\n"
+    "/profile stages [on|off] — زمان هر مرحله"
+)
+
+def _owner_report(bot):
+    """Report callback sending a finished profile to the owner"""
+    async def report(summary: str, path: str):
+        try:
+            await bot.send_message(OWNER_ID, f"<pre>{html.escape(summary[:3900])}</pre>", parse_mode="HTML")
+            with open(path, "rb") as f:
+                await bot.send_document(OWNER_ID, f)
+        except Exception as e:
+            logger.error(f"Error sending profile: {e}")
+    return report
+
+def run_profile_command(bot, action: str, seconds: Optional[float] = None, updates: Optional[int] = None,
+                        sampling: bool = False, stages: bool = False) -> bool:
+    """
+    Apply a /profile command in this process. In worker mode the command is
+    broadcast and every worker runs it (see on_startup), each reporting its own profile.
+
+    Returns:
+        Whether anything changed (False: nothing to stop / already running)
+    """
+    if action == "stop":
+        return profiler.stop()
+    if action == "stages":
+        profiler.stages = stages
+        return True
+    return profiler.start(seconds=seconds, updates=updates, sampling=sampling, report=_owner_report(bot))
+
+async def profile(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """(Owner Only) Profile the handlers for N seconds / updates, or show per-stage timing"""
+    if not update.message or not update.effective_user: return
+    
+    # Check GLOBAL Owner ID
+    if update.effective_user.id != OWNER_ID:
+        return
+    
+    args = [arg.lower() for arg in context.args or []]
+    workers = int(os.getenv("WORKERS", "1"))
+    
+    if args and args[0] == "stop":
+        stopped = run_profile_command(context.bot, "stop")
+        events.publish(events.PROFILE_COMMAND, action="stop")
+        if not stopped and workers == 1:
+            await update.message.reply_text("⚠️ پروفایلی در حال اجرا نیست.")
+        return
+    
+    if args and args[0] == "stages":
+        if len(args) > 1 and args[1] in ("on", "off"):
+            run_profile_command(context.bot, "stages", stages=args[1] == "on")
+            events.publish(events.PROFILE_COMMAND, action="stages", stages=profiler.stages)
+        state = "روشن" if profiler.stages else "خاموش"
+        # Timings are per process; the other workers' are on their own /metrics
+        scope = f" (فقط همین worker از {workers})" if workers > 1 else ""
+        await update.message.reply_text(
+            f"⏱️ زمان مراحل: {state}{scope}\n<pre>{html.escape(profiler.stage_summary())}</pre>",
+            parse_mode="HTML"
+        )
+        return
+    
+    try:
+        amount = args[0]
+        updates = int(amount[:-1]) if amount.endswith("u") else None
+        seconds = None if updates else float(amount.rstrip("s"))
+        if (updates or seconds or 0) <= 0: raise ValueError(amount)
+    except (IndexError, ValueError):
+        await update.message.reply_text(PROFILE_USAGE)
+        return
+    
+    sampling = "sample" in args[1:]
+    if run_profile_command(context.bot, "start", seconds=seconds, updates=updates, sampling=sampling):
+        events.publish(events.PROFILE_COMMAND, action="start", seconds=seconds, updates=updates, sampling=sampling)
+        scope = f"\nهمه‌ی {workers} worker پروفایل می‌شوند و هر کدام نتیجه‌ی خود را می‌فرستد." if workers > 1 else ""
+        await update.message.reply_text(f"📈 پروفایل شروع شد، نتیجه در پیوی ارسال می‌شود.{scope}")
+    else:
+        await update.message.reply_text("⚠️ یک پروفایل در حال اجراست (/profile stop).")
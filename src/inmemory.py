@@ -0,0 +1,283 @@
+"""
+In-Memory Stand-ins
+DatabaseManager and Bot replacements for benchmarks and offline tools
+"""
+
+import time
+import itertools
+from types import SimpleNamespace
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from telegram import User
+from src.database import DatabaseManager, DEFAULT_BANNED_WORDS
+
+
+class InMemoryDatabaseManager(DatabaseManager):
+    """
+    DatabaseManager backed by dicts instead of a real backend.
+
+    Keeps the real caching behaviour (banned word matcher, license cache) and
+    can simulate a database round trip with `latency` seconds per call.
+    """
+
+    def __init__(self, banned_words: Optional[Iterable[str]] = None, allowed_groups: Iterable[int] = (), latency: float = 0.0):
+        super().__init__()
+        self.latency = latency
+        self.users: Dict[int, dict] = {}
+        self.words: List[str] = [w.lower() for w in (DEFAULT_BANNED_WORDS if banned_words is None else banned_words)]
+        self.chat_words: Dict[int, List[str]] = {}
+        self.word_versions: Dict[int, int] = {}
+        self._version = 0
+        self.groups: Set[int] = set(allowed_groups)
+        self.approvals: Dict[int, dict] = {}
+        self.verdicts: Dict[tuple, dict] = {}
+        self.deletions: List[dict] = []
+        self.calls = 0
+
+    def _round_trip(self):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _connect(self):
+        pass
+
+    # ==================== User Management ====================
+
+    def initialize_user(self, user_id: int, username: str) -> Optional[dict]:
+        self._round_trip()
+        return self.users.setdefault(user_id, {"user_id": user_id, "username": username, "warn_count": 0})
+
+    def upsert_users(self, users: List[dict]) -> bool:
+        self._round_trip()
+        for row in users:
+            user = self.users.setdefault(row["user_id"], {"user_id": row["user_id"], "username": row["username"], "warn_count": 0})
+            user["username"] = row["username"]
+        return True
+
+    def add_warn(self, user_id: int) -> Optional[int]:
+        self._round_trip()
+        user = self.users.setdefault(user_id, {"user_id": user_id, "username": "unknown", "warn_count": 0})
+        user["warn_count"] += 1
+        return user["warn_count"]
+
+    def get_user_stats(self, user_id: int) -> Optional[dict]:
+        self._round_trip()
+        user = self.users.get(user_id)
+        return dict(user) if user else None
+
+    def get_user_id_by_username(self, username: str) -> Optional[int]:
+        self._round_trip()
+        clean_username = username.lstrip("@")
+        for user in self.users.values():
+            if user["username"] == clean_username:
+                return user["user_id"]
+        return None
+
+    def reset_warns(self, user_id: int) -> bool:
+        self._round_trip()
+        if user_id in self.users:
+            self.users[user_id]["warn_count"] = 0
+        return True
+
+    # ==================== Banned Words Management ====================
+
+    def _fetch_global_words(self) -> List[str]:
+        self._round_trip()
+        return list(self.words)
+
+    def touch_banned_words(self, scope: int = 0):
+        """Bump a scope's version like the database trigger does (0 = global list)"""
+        self._version += 1
+        self.word_versions[scope] = self._version
+
+    def fetch_banned_word_versions(self, since: Optional[int]) -> Optional[List[dict]]:
+        self._round_trip()
+        if since is None:
+            return [{"scope": 0, "version": self._version}]
+        return [{"scope": scope, "version": v} for scope, v in self.word_versions.items() if v > since]
+
+    def initialize_default_banned_words(self) -> bool:
+        if not self.words:
+            self.words = [w.lower() for w in DEFAULT_BANNED_WORDS]
+        return True
+
+    def load_chat_words(self, chat_id: int) -> Optional[List[str]]:
+        self._round_trip()
+        return list(self.chat_words.get(chat_id, []))
+
+    def _insert_banned_word(self, word: str, chat_id: Optional[int]) -> Tuple[Optional[dict], bool]:
+        self._round_trip()
+        words = self.words if chat_id is None else self.chat_words.setdefault(chat_id, [])
+        row = {"word": word, "chat_id": chat_id}
+        if word in words:
+            return row, False
+        words.append(word)
+        self.touch_banned_words(chat_id or 0)
+        return row, True
+
+    def _delete_banned_word(self, word: str, chat_id: Optional[int]):
+        self._round_trip()
+        words = self.words if chat_id is None else self.chat_words.get(chat_id, [])
+        if word in words:
+            words.remove(word)
+            self.touch_banned_words(chat_id or 0)
+
+    # ==================== License System ====================
+
+    def _fetch_group_license(self, chat_id: int) -> bool:
+        self._round_trip()
+        return chat_id in self.groups
+
+    def _insert_allowed_group(self, chat_id: int, note: str) -> bool:
+        self._round_trip()
+        if chat_id in self.groups:
+            return False
+        self.groups.add(chat_id)
+        return True
+
+    # ==================== Approval Queue ====================
+
+    def save_pending_approval(self, message_id: int, data: dict) -> bool:
+        self._round_trip()
+        self.approvals[message_id] = {"message_id": message_id, **data}
+        return True
+
+    def load_pending_approvals(self, since: int, limit: int) -> List[dict]:
+        self._round_trip()
+        rows = sorted((r for r in self.approvals.values() if r["created_at"] >= since), key=lambda r: r["created_at"], reverse=True)
+        return rows[:limit]
+
+    def delete_pending_approval(self, message_id: int) -> bool:
+        self._round_trip()
+        self.approvals.pop(message_id, None)
+        return True
+
+    def purge_pending_approvals(self, before: int) -> bool:
+        self._round_trip()
+        for message_id in [m for m, r in self.approvals.items() if r["created_at"] < before]:
+            del self.approvals[message_id]
+        return True
+
+    # ==================== Media Verdicts ====================
+
+    def save_media_verdict(self, row: dict) -> bool:
+        self._round_trip()
+        self.verdicts[(row["scope"], row["file_unique_id"])] = dict(row)
+        return True
+
+    def load_media_verdicts(self, since: int, limit: int) -> List[dict]:
+        self._round_trip()
+        rows = sorted((r for r in self.verdicts.values() if r["decided_at"] >= since), key=lambda r: r["decided_at"], reverse=True)
+        return rows[:limit]
+
+    def purge_media_verdicts(self, before: int) -> bool:
+        self._round_trip()
+        for key in [k for k, r in self.verdicts.items() if r["decided_at"] < before]:
+            del self.verdicts[key]
+        return True
+
+    # ==================== Scheduled Deletions ====================
+
+    def save_scheduled_deletions(self, rows: List[dict]) -> bool:
+        self._round_trip()
+        self.deletions.extend(rows)
+        return True
+
+    def load_scheduled_deletions(self) -> List[dict]:
+        self._round_trip()
+        return list(self.deletions)
+
+    def clear_scheduled_deletions(self) -> bool:
+        self._round_trip()
+        self.deletions.clear()
+        return True
+
+
+class RecordingBot:
+    """
+    Stand-in for telegram.Bot that records every outgoing API call.
+
+    Only the methods the handlers use are implemented. Sent/forwarded
+    messages come back as lightweight objects carrying a message_id.
+    """
+
+    defaults = None
+
+    def __init__(self, bot_id: int = 1000, admins: Optional[Dict[int, List[int]]] = None, record: bool = True):
+        self.id = bot_id
+        self.username = "recording_bot"
+        self.admins = admins or {}
+        self.record = record
+        self.calls: List[tuple] = []
+        self.counts: Dict[str, int] = {}
+        self._message_ids = itertools.count(1_000_000)
+
+    def _call(self, method: str, **kwargs):
+        self.counts[method] = self.counts.get(method, 0) + 1
+        if self.record:
+            self.calls.append((method, {k: v for k, v in kwargs.items() if v is not None}))
+
+    def _message(self, chat_id: int) -> SimpleNamespace:
+        return SimpleNamespace(message_id=next(self._message_ids), chat_id=chat_id)
+
+    def reset(self):
+        self.calls.clear()
+        self.counts.clear()
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self._call("send_message", chat_id=chat_id, text=text)
+        return self._message(chat_id)
+
+    async def send_document(self, chat_id, document, **kwargs):
+        self._call("send_document", chat_id=chat_id)
+        return self._message(chat_id)
+
+    async def forward_message(self, chat_id, from_chat_id, message_id, **kwargs):
+        self._call("forward_message", chat_id=chat_id, from_chat_id=from_chat_id, message_id=message_id)
+        return self._message(chat_id)
+
+    async def copy_message(self, chat_id, from_chat_id, message_id, **kwargs):
+        self._call("copy_message", chat_id=chat_id, from_chat_id=from_chat_id, message_id=message_id)
+        return self._message(chat_id)
+
+    async def delete_message(self, chat_id, message_id, **kwargs):
+        self._call("delete_message", chat_id=chat_id, message_id=message_id)
+        return True
+
+    async def delete_messages(self, chat_id, message_ids, **kwargs):
+        self._call("delete_messages", chat_id=chat_id, message_ids=list(message_ids))
+        return True
+
+    async def ban_chat_member(self, chat_id, user_id, **kwargs):
+        self._call("ban_chat_member", chat_id=chat_id, user_id=user_id)
+        return True
+
+    async def unban_chat_member(self, chat_id, user_id, **kwargs):
+        self._call("unban_chat_member", chat_id=chat_id, user_id=user_id)
+        return True
+
+    async def restrict_chat_member(self, chat_id, user_id, permissions=None, **kwargs):
+        self._call("restrict_chat_member", chat_id=chat_id, user_id=user_id)
+        return True
+
+    async def leave_chat(self, chat_id, **kwargs):
+        self._call("leave_chat", chat_id=chat_id)
+        return True
+
+    async def get_chat_administrators(self, chat_id, **kwargs):
+        self._call("get_chat_administrators", chat_id=chat_id)
+        return [
+            SimpleNamespace(user=User(id=user_id, first_name="admin", is_bot=False), status="administrator")
+            for user_id in self.admins.get(chat_id, [])
+        ]
+
+    async def get_chat_member(self, chat_id, user_id, **kwargs):
+        self._call("get_chat_member", chat_id=chat_id, user_id=user_id)
+        status = "administrator" if user_id in self.admins.get(chat_id, []) else "member"
+        return SimpleNamespace(user=User(id=user_id, first_name="user", is_bot=False), status=status)
@@ -0,0 +1,45 @@
+"""
+Update Delivery Latency
+Tracks how long Telegram took to hand us each update
+"""
+
+import time
+from collections import deque
+from typing import Deque, Optional
+from telegram import Update
+
+
+class LatencyWindow:
+    """Rolling window of latency samples (seconds) with percentiles"""
+
+    def __init__(self, size: int = 1000):
+        self._samples: Deque[float] = deque(maxlen=size)
+        self.count = 0
+
+    def add(self, seconds: float):
+        self._samples.append(seconds)
+        self.count += 1
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self._samples: return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def stats(self) -> dict:
+        return {
+            "count": self.count,
+            "p50": self.percentile(50),
+            "p99": self.percentile(99),
+        }
+
+
+# Seconds between Telegram stamping a message and the bot receiving it
+delivery_latency = LatencyWindow()
+
+
+def observe_update(update: Update):
+    """Record delivery latency for updates that carry a message date"""
+    message = update.effective_message
+    if message is None or message.date is None: return
+    delivery_latency.add(max(0.0, time.time() - message.date.timestamp()))
@@ -0,0 +1,100 @@
+"""
+Link Detector
+Precompiled link detection for message text and captions
+"""
+
+import os
+import re
+from typing import Iterable, Optional, Union
+from telegram import MessageEntity
+from src.analysis import MessageAnalysis, latin_skeleton
+
+URL_KEYWORDS = ['http://', 'https://', 'www.', '.com', '.ir', '.net', '.org', 't.me', 'bit.ly']
+LINK_EXTENSIONS = ['com', 'ir', 'net', 'org', 'xyz', 'tk', 'info', 'io', 'me', 'site']
+COMMON_SITES = ['google', 'youtube', 'instagram', 'telegram', 'whatsapp', 'sex', 'porn', 'xxx']
+LINK_PREFIXES = ['http', 'https', 'www', 'tme']
+
+LINK_ENTITY_TYPES = (MessageEntity.URL, MessageEntity.TEXT_LINK)
+
+_SYMBOLS = re.compile(r'[\./,\\_]')
+
+
+def _alternation(words: Iterable[str]) -> str:
+    # Longest first so the regex engine prefers the most specific pattern
+    return "|".join(re.escape(w) for w in sorted(set(words), key=len, reverse=True))
+
+
+class LinkDetector:
+    """
+    Detects plain, hidden and obfuscated links (w w w . g o o g l e . c o m).
+
+    All keyword, site+extension and prefix patterns are compiled into a few
+    regexes once, so a message is scanned a constant number of times no
+    matter how many patterns are configured. detect() returns the name of
+    the rule that fired: entity, keyword, site, domain, prefix or tail.
+    """
+
+    def __init__(self, extra_domains: Iterable[str] = ()):
+        keywords = list(URL_KEYWORDS)
+        domains = []
+        for domain in extra_domains:
+            domain = domain.strip().lower()
+            if not domain: continue
+            if "." in domain: keywords.append(domain)
+            skeleton = latin_skeleton(domain)
+            if skeleton: domains.append(skeleton)
+
+        self._keywords = re.compile(_alternation(keywords))
+
+        # Skeleton rules in one pass, named groups tell which one matched
+        rules = [
+            f"(?P<site>(?:{_alternation(COMMON_SITES)})(?:{_alternation(LINK_EXTENSIONS)}))",
+            f"(?P<prefix>{_alternation(LINK_PREFIXES)})",
+        ]
+        if domains:
+            rules.insert(1, f"(?P<domain>{_alternation(domains)})")
+        self._skeleton_rules = re.compile("|".join(rules))
+
+        self._extensions = tuple(LINK_EXTENSIONS)
+
+    def detect_text(self, text: Union[str, MessageAnalysis]) -> Optional[str]:
+        """Check message text (entities aside), returns the rule name or None"""
+        analysis = text if isinstance(text, MessageAnalysis) else MessageAnalysis(text)
+
+        # Every rule needs Latin letters (fullwidth / styled ones folded), pure Persian text is clean
+        skeleton = analysis.latin
+        if not skeleton: return None
+
+        text_lower = analysis.lower
+        if self._keywords.search(text_lower): return "keyword"
+
+        hit = self._skeleton_rules.search(skeleton)
+        if hit: return hit.lastgroup
+
+        # Bare "something.ext" written with separators: >2 letters before the extension
+        if skeleton.endswith(self._extensions) and _SYMBOLS.search(text_lower):
+            for ext in self._extensions:
+                if skeleton.endswith(ext) and len(skeleton) > len(ext) + 2:
+                    return "tail"
+        return None
+
+    def detect(self, message, analysis: Optional[MessageAnalysis] = None) -> Optional[str]:
+        """
+        Check a message for links.
+
+        Args:
+            message: Telegram message (text or caption)
+            analysis: The message's MessageAnalysis, if the caller already built one
+
+        Returns:
+            Name of the rule that fired or None if no link was found
+        """
+        analysis = analysis or MessageAnalysis.from_message(message)
+        for entity in analysis.entities:
+            if entity.type in LINK_ENTITY_TYPES: return "entity"
+
+        if not analysis.text: return None
+        return self.detect_text(analysis)
+
+
+link_detector = LinkDetector(os.getenv("LINK_EXTRA_DOMAINS", "").split(","))
@@ -0,0 +1,107 @@
+"""
+Media Verdicts
+Remembers the owner's "تایید" / "رد" per file so repeat media skip the approval queue
+"""
+
+import os
+import time
+import asyncio
+import logging
+from typing import Optional
+from src.cache import TTLCache
+from src.database import adb
+from src import events
+
+logger = logging.getLogger(__name__)
+
+# Scope of verdicts shared by every group
+GLOBAL_SCOPE = 0
+
+
+def media_unique_id(message) -> Optional[str]:
+    """
+    Telegram's file_unique_id of a message's media (same file = same ID, in any chat).
+    Photos use their largest size.
+    """
+    if message.photo:
+        return message.photo[-1].file_unique_id
+    for media in (message.sticker, message.animation, message.video):
+        if media is not None:
+            return media.file_unique_id
+    return None
+
+
+class MediaVerdictCache:
+    """
+    Owner verdicts keyed by (scope, file_unique_id).
+
+    Scope is the chat ID when MEDIA_VERDICT_PER_CHAT is set, otherwise one
+    verdict applies everywhere. Verdicts expire after MEDIA_VERDICT_TTL and
+    the least recently used ones are evicted beyond MEDIA_VERDICT_MAX. Every
+    verdict is written to the media_verdicts table and the newest ones are
+    reloaded lazily on the first lookup after a restart.
+    """
+
+    def __init__(self, ttl: float = None, max_size: int = None, per_chat: Optional[bool] = None):
+        self.ttl = ttl or float(os.getenv("MEDIA_VERDICT_TTL", str(30 * 24 * 3600)))
+        self.max_size = max_size or int(os.getenv("MEDIA_VERDICT_MAX", "20000"))
+        self.per_chat = per_chat if per_chat is not None else os.getenv("MEDIA_VERDICT_PER_CHAT", "0") == "1"
+        self._verdicts = TTLCache(ttl=self.ttl, max_size=self.max_size)
+        self._loaded = False
+        self._load_lock = asyncio.Lock()
+        events.subscribe(events.MEDIA_VERDICT, self._remember)
+
+    def _scope(self, chat_id: int) -> int:
+        return chat_id if self.per_chat else GLOBAL_SCOPE
+
+    def _remember(self, scope: int, file_unique_id: str, approved: bool, decided_at: int):
+        remaining = decided_at + self.ttl - time.time()
+        if remaining > 0:
+            self._verdicts.set((scope, file_unique_id), approved, remaining)
+
+    async def _ensure_loaded(self):
+        if self._loaded: return
+        async with self._load_lock:
+            if self._loaded: return
+            cutoff = int(time.time() - self.ttl)
+            rows = await adb.load_media_verdicts(cutoff, self.max_size)
+            # Oldest first so the newest end up most recently used
+            for row in reversed(rows):
+                self._remember(row["scope"], row["file_unique_id"], row["approved"], row["decided_at"])
+            self._loaded = True
+            await adb.purge_media_verdicts(cutoff)
+            logger.info(f"Reloaded {len(rows)} media verdicts")
+
+    async def get(self, chat_id: int, file_unique_id: Optional[str]) -> Optional[bool]:
+        """
+        Look up the verdict for a file in a chat.
+
+        Returns:
+            True (approved), False (rejected) or None (unknown, ask the owner)
+        """
+        if not file_unique_id: return None
+        await self._ensure_loaded()
+        return self._verdicts.get((self._scope(chat_id), file_unique_id))
+
+    async def record(self, chat_id: int, file_unique_id: Optional[str], approved: bool):
+        """Remember the owner's verdict and persist it"""
+        if not file_unique_id: return
+        scope = self._scope(chat_id)
+        decided_at = int(time.time())
+        self._remember(scope, file_unique_id, approved, decided_at)
+        await adb.save_media_verdict({
+            "scope": scope,
+            "file_unique_id": file_unique_id,
+            "approved": approved,
+            "decided_at": decided_at,
+        })
+        events.publish(events.MEDIA_VERDICT, scope=scope, file_unique_id=file_unique_id, approved=approved, decided_at=decided_at)
+
+    def __len__(self) -> int:
+        return len(self._verdicts)
+
+    def stats(self) -> dict:
+        return self._verdicts.stats()
+
+
+media_verdicts = MediaVerdictCache()
@@ -0,0 +1,229 @@
+"""
+Metrics & Instrumentation
+Counters, histograms and gauges exposed in Prometheus text format on a local HTTP endpoint
+"""
+
+import os
+import time
+import bisect
+import logging
+import functools
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+from telegram.request import HTTPXRequest
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(key) + ([extra] if extra else [])
+    if not items: return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+
+class Counter:
+    """Monotonic counter with labels"""
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = _labels(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        key = _labels(labels)
+        with self._lock:
+            return self._values.get(key, 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            snapshot = dict(self._values)
+        for key, value in sorted(snapshot.items()):
+            lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+
+class Histogram:
+    """Latency histogram (seconds) with labels"""
+
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self._series: Dict[LabelKey, list] = {}  # key -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float, **labels):
+        key = _labels(labels)
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += seconds
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {key: list(series) for key, series in self._series.items()}
+        for key, series in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(key, ('le', str(bound)))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(key, ('le', '+Inf'))} {series[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {series[-2]}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {series[-1]}")
+        return lines
+
+
+class Gauge:
+    """Value read from a callback at scrape time"""
+
+    def __init__(self, name: str, help_text: str, callback: Callable[[], float]):
+        self.name = name
+        self.help_text = help_text
+        self.callback = callback
+
+    def render(self) -> List[str]:
+        try:
+            value = self.callback()
+        except Exception as e:
+            logger.debug(f"Gauge {self.name} failed: {e}")
+            return []
+        if value is None: return []
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge", f"{self.name} {value}"]
+
+
+class MetricsRegistry:
+    """Holds every metric and renders the exposition text"""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        return self._metrics.setdefault(name, Counter(name, help_text))
+
+    def histogram(self, name: str, help_text: str) -> Histogram:
+        return self._metrics.setdefault(name, Histogram(name, help_text))
+
+    def gauge(self, name: str, help_text: str, callback: Callable[[], float]) -> Gauge:
+        self._metrics[name] = Gauge(name, help_text, callback)
+        return self._metrics[name]
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+handler_latency = registry.histogram("bot_handler_latency_seconds", "Handler execution time")
+handler_errors = registry.counter("bot_handler_errors_total", "Unhandled exceptions raised by handlers")
+db_latency = registry.histogram("bot_db_call_seconds", "DatabaseManager call time (executor thread)")
+db_errors = registry.counter("bot_db_errors_total", "DatabaseManager errors by method")
+telegram_latency = registry.histogram("bot_telegram_request_seconds", "Telegram Bot API request time")
+telegram_requests = registry.counter("bot_telegram_requests_total", "Telegram Bot API requests by method and HTTP status")
+telegram_rate_limited = registry.counter("bot_telegram_429_total", "Telegram Bot API 429 (flood limit) responses")
+
+
+# ==================== INSTRUMENTATION HELPERS ====================
+
+def timed_handler(name: str):
+    """Decorator recording latency/errors of an async handler"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            except Exception:
+                handler_errors.inc(handler=name)
+                raise
+            finally:
+                handler_latency.observe(time.perf_counter() - started, handler=name)
+        return wrapper
+    return decorator
+
+
+class DatabaseErrorCounter(logging.Handler):
+    """Counts ERROR records of the database modules per method (the methods log and swallow errors)"""
+
+    def __init__(self):
+        super().__init__(level=logging.ERROR)
+
+    def emit(self, record: logging.LogRecord):
+        db_errors.inc(method=record.funcName)
+
+
+class InstrumentedRequest(HTTPXRequest):
+    """HTTPXRequest that counts Bot API calls by method, status and 429s"""
+
+    async def do_request(self, url: str, method: str, request_data=None, *args, **kwargs):
+        api_method = url.rsplit("/", 1)[-1]
+        started = time.perf_counter()
+        try:
+            status, payload = await super().do_request(url, method, request_data, *args, **kwargs)
+        except Exception:
+            telegram_requests.inc(method=api_method, status="error")
+            raise
+        finally:
+            telegram_latency.observe(time.perf_counter() - started, method=api_method)
+
+        telegram_requests.inc(method=api_method, status=status)
+        if status == 429:
+            telegram_rate_limited.inc(method=api_method)
+        return status, payload
+
+
+# ==================== HTTP ENDPOINT ====================
+
+def start_metrics_server(host: str = None, port: int = None):
+    """
+    Serve /metrics from a background thread (flask + werkzeug).
+
+    METRICS_HOST (default 127.0.0.1) / METRICS_PORT (default 9100, 0 disables).
+    """
+    host = host or os.getenv("METRICS_HOST", "127.0.0.1")
+    port = port if port is not None else int(os.getenv("METRICS_PORT", "9100"))
+    if not port:
+        return None
+
+    from flask import Flask, Response
+    from werkzeug.serving import make_server
+
+    app = Flask("metrics")
+
+    @app.route("/metrics")
+    def metrics():
+        return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
+    try:
+        server = make_server(host, port, app, threaded=True)
+    except OSError as e:
+        logger.error(f"Metrics endpoint not started on {host}:{port}: {e}")
+        return None
+
+    thread = threading.Thread(target=server.serve_forever, name="metrics", daemon=True)
+    thread.start()
+    logger.info(f"✅ Metrics on http://{host}:{port}/metrics")
+    return server
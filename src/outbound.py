@@ -0,0 +1,320 @@
+"""
+Outbound Scheduler
+Priority queue with per-chat and global rate limits in front of the Telegram Bot API
+"""
+
+import os
+import time
+import heapq
+import asyncio
+import itertools
+import logging
+from typing import Dict, List, Optional, Tuple
+from telegram.error import RetryAfter
+from src.cache import TTLCache
+from src.deletion_scheduler import deletion_scheduler
+from src.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# Priority classes (lower goes first)
+PRIORITY_BAN = 0       # ban / restrict / unban
+PRIORITY_DELETE = 1    # removing spam
+PRIORITY_NOTICE = 2    # warnings and other short-lived notices
+
+outbound_dropped = registry.counter("bot_outbound_dropped_total", "Outbound calls dropped, by reason")
+outbound_merged = registry.counter("bot_outbound_merged_total", "Warning notices merged into a pending one")
+outbound_retries = registry.counter("bot_outbound_retries_total", "Outbound calls retried after a 429")
+
+
+class OutboundDropped(Exception):
+    """Set on the future of a call the scheduler gave up on"""
+
+    def __init__(self, method: str, reason: str):
+        super().__init__(f"{method} dropped ({reason})")
+        self.method = method
+        self.reason = reason
+
+
+class TokenBucket:
+    """Token bucket that can go into debt: reserve() returns how long to wait"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.resume_at = 0.0
+
+    def reserve(self) -> float:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def refund(self):
+        self.tokens += 1
+
+    def pause(self, seconds: float):
+        """Empty the bucket for `seconds` (Telegram told us to back off)"""
+        self.reserve()
+        self.tokens = min(self.tokens, -seconds * self.rate)
+        self.resume_at = max(self.resume_at, time.monotonic() + seconds)
+
+    def paused(self) -> float:
+        """Seconds left of the current pause (0 if none)"""
+        return max(0.0, self.resume_at - time.monotonic())
+
+
+class _Job:
+    __slots__ = ("priority", "method", "chat_id", "kwargs", "future", "notice_key", "delete_after")
+
+    def __init__(self, priority: int, method: str, chat_id: Optional[int], kwargs: dict):
+        self.priority = priority
+        self.method = method
+        self.chat_id = chat_id
+        self.kwargs = kwargs
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.notice_key: Optional[Tuple[int, int]] = None
+        self.delete_after: Optional[float] = None
+
+
+class OutboundScheduler:
+    """
+    Every moderation call and notice goes through one priority queue.
+
+    A global token bucket (OUTBOUND_GLOBAL_RATE, shared out between the
+    WORKERS processes) paces all calls, and notices also respect a per-chat
+    bucket (OUTBOUND_CHAT_RATE per minute). Bans and deletes are always
+    dequeued before notices. A notice for a user that still has one queued
+    replaces its text instead of adding a second message, and notices that
+    cannot go out within OUTBOUND_NOTICE_MAX_DELAY seconds are dropped.
+    429 responses pause the affected chat (or everything) for retry_after:
+    every call to that chat waits, and the failed call is retried. Dropped
+    calls fail with OutboundDropped.
+    """
+
+    def __init__(self):
+        # Each worker process has its own bucket, together they stay under the bot's limit
+        workers = max(1, int(os.getenv("WORKERS", "1")))
+        self.global_bucket = TokenBucket(
+            rate=float(os.getenv("OUTBOUND_GLOBAL_RATE", "30")) / workers,
+            burst=float(os.getenv("OUTBOUND_GLOBAL_BURST", "30")) / workers,
+        )
+        self.chat_rate = float(os.getenv("OUTBOUND_CHAT_RATE", "20")) / 60
+        self.chat_burst = float(os.getenv("OUTBOUND_CHAT_BURST", "5"))
+        self.notice_max_delay = float(os.getenv("OUTBOUND_NOTICE_MAX_DELAY", "5"))
+        self.max_notices = int(os.getenv("OUTBOUND_MAX_NOTICES", "500"))
+        self.max_retries = 3
+
+        self._chat_buckets = TTLCache(ttl=600, max_size=20000)
+        self._heap: List[tuple] = []
+        self._seq = itertools.count()
+        self._notices: Dict[Tuple[int, int], _Job] = {}
+        self._ready: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._inflight = set()
+        self._bot = None
+        self.sent = 0
+
+    # ==================== API ====================
+
+    def submit(self, method: str, priority: int, chat_id: Optional[int] = None, **kwargs) -> asyncio.Future:
+        """
+        Queue a Bot API call.
+
+        Args:
+            method: Bot method name (e.g. "ban_chat_member")
+            priority: PRIORITY_* class
+            chat_id: Target chat, passed to the method too
+            **kwargs: Method arguments
+
+        Returns:
+            Future with the call's result; awaiting it is optional
+        """
+        if chat_id is not None:
+            kwargs["chat_id"] = chat_id
+        job = _Job(priority, method, chat_id, kwargs)
+        # Fire-and-forget callers never read failures, mark them retrieved
+        job.future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._push(job)
+        return job.future
+
+    def delete(self, chat_id: int, message_id: int) -> asyncio.Future:
+        return self.submit("delete_message", PRIORITY_DELETE, chat_id, message_id=message_id)
+
+    def ban(self, chat_id: int, user_id: int) -> asyncio.Future:
+        return self.submit("ban_chat_member", PRIORITY_BAN, chat_id, user_id=user_id)
+
+    def restrict(self, chat_id: int, user_id: int, permissions) -> asyncio.Future:
+        return self.submit("restrict_chat_member", PRIORITY_BAN, chat_id, user_id=user_id, permissions=permissions)
+
+    def delete_messages(self, chat_id: int, message_ids: List[int]) -> asyncio.Future:
+        """Delete up to 100 messages of one chat in a single call"""
+        if len(message_ids) == 1:
+            return self.delete(chat_id, message_ids[0])
+        return self.submit("delete_messages", PRIORITY_DELETE, chat_id, message_ids=message_ids)
+
+    def notice(self, chat_id: int, user_id: int, text: str, delete_after: float = 5, parse_mode: Optional[str] = "HTML"):
+        """
+        Queue a short-lived notice about `user_id` (deleted after `delete_after` seconds).
+        Replaces the text of a notice for the same user that has not been sent yet.
+        """
+        key = (chat_id, user_id)
+        pending = self._notices.get(key)
+        if pending is not None:
+            pending.kwargs["text"] = text
+            pending.delete_after = delete_after
+            outbound_merged.inc()
+            return
+
+        if len(self._notices) >= self.max_notices:
+            outbound_dropped.inc(reason="queue_full")
+            return
+
+        job = _Job(PRIORITY_NOTICE, "send_message", chat_id, {"chat_id": chat_id, "text": text, "parse_mode": parse_mode})
+        job.future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        job.notice_key = key
+        job.delete_after = delete_after
+        self._notices[key] = job
+        self._push(job)
+
+    # ==================== DISPATCH ====================
+
+    def _push(self, job: _Job):
+        if self._task is None:
+            # Not running (shutting down): call straight through
+            if self._bot is None:
+                logger.error(f"Outbound scheduler not started, {job.method} dropped")
+                self._drop(job, "not_started")
+                return
+            self._spawn(job, 0.0)
+            return
+        heapq.heappush(self._heap, (job.priority, next(self._seq), job))
+        self._ready.set()
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(self.chat_rate, self.chat_burst)
+            self._chat_buckets.set(chat_id, bucket)
+        return bucket
+
+    def _spawn(self, job: _Job, delay: float):
+        task = asyncio.create_task(self._execute(job, delay))
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    async def _run(self):
+        while True:
+            # Take the global token first, then the most urgent job at that moment
+            wait = self.global_bucket.reserve()
+            if wait:
+                await asyncio.sleep(wait)
+            while not self._heap:
+                self._ready.clear()
+                await self._ready.wait()
+            _, _, job = heapq.heappop(self._heap)
+
+            delay = 0.0
+            if job.notice_key is not None:
+                bucket = self._chat_bucket(job.chat_id)
+                delay = bucket.reserve()
+                if delay > self.notice_max_delay:
+                    bucket.refund()
+                    self._drop(job, "chat_rate")
+                    continue
+            elif job.chat_id is not None:
+                # Bans and deletes skip the notice budget but wait out a 429 on their chat
+                bucket = self._chat_buckets.get(job.chat_id)
+                if bucket is not None:
+                    delay = bucket.paused()
+            self._spawn(job, delay)
+
+    def _drop(self, job: _Job, reason: str):
+        if job.notice_key is not None:
+            self._notices.pop(job.notice_key, None)
+        outbound_dropped.inc(reason=reason)
+        if not job.future.done():
+            job.future.set_exception(OutboundDropped(job.method, reason))
+
+    async def _execute(self, job: _Job, delay: float, attempt: int = 0):
+        if delay:
+            await asyncio.sleep(delay)
+        if job.notice_key is not None:
+            # From here on new notices for this user get their own message
+            self._notices.pop(job.notice_key, None)
+            job.notice_key = None
+
+        try:
+            result = await getattr(self._bot, job.method)(**job.kwargs)
+        except RetryAfter as e:
+            retry_after = e.retry_after.total_seconds() if hasattr(e.retry_after, "total_seconds") else float(e.retry_after)
+            if job.chat_id is not None:
+                self._chat_bucket(job.chat_id).pause(retry_after)
+            else:
+                self.global_bucket.pause(retry_after)
+
+            is_notice = job.priority == PRIORITY_NOTICE
+            if attempt >= self.max_retries or (is_notice and retry_after > self.notice_max_delay):
+                logger.warning(f"{job.method} in chat {job.chat_id} dropped after 429 (retry after {retry_after}s)")
+                self._drop(job, "retry_after")
+                return
+            outbound_retries.inc()
+            await self._execute(job, retry_after, attempt + 1)
+            return
+        except Exception as e:
+            logger.debug(f"{job.method} in chat {job.chat_id} failed: {e}")
+            if not job.future.done():
+                job.future.set_exception(e)
+            return
+
+        self.sent += 1
+        if not job.future.done():
+            job.future.set_result(result)
+        if job.delete_after is not None and getattr(result, "message_id", None):
+            deletion_scheduler.schedule(job.chat_id, result.message_id, job.delete_after)
+
+    # ==================== LIFECYCLE ====================
+
+    def start(self, bot):
+        """Start the dispatcher (needs a running event loop)"""
+        if self._task: return
+        self._bot = bot
+        self._ready = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop dispatching; moderation calls still queued are sent, notices are dropped"""
+        if not self._task: return
+        self._task.cancel()
+        try: await self._task
+        except asyncio.CancelledError: pass
+        self._task = None
+
+        pending, self._heap = self._heap, []
+        for _, _, job in pending:
+            if job.priority == PRIORITY_NOTICE:
+                self._drop(job, "shutdown")
+            else:
+                self._spawn(job, 0.0)
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+
+    async def drain(self):
+        """Wait until nothing is queued or in flight (offline tools, tests)"""
+        while self._heap or self._inflight:
+            if self._inflight:
+                await asyncio.gather(*self._inflight, return_exceptions=True)
+            else:
+                await asyncio.sleep(0)
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def stats(self) -> dict:
+        return {"queued": len(self._heap), "pending_notices": len(self._notices), "sent": self.sent}
+
+
+outbound = OutboundScheduler()
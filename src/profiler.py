@@ -0,0 +1,258 @@
+"""
+Profiler
+On-demand CPU profiling and per-stage timing, switched on from the owner chat
+"""
+
+import os
+import sys
+import time
+import asyncio
+import cProfile
+import pstats
+import logging
+import functools
+import threading
+import contextvars
+from collections import Counter
+from typing import Awaitable, Callable, Dict, List, Optional, Union
+from src.metrics import registry
+from src.latency import LatencyWindow
+
+logger = logging.getLogger(__name__)
+
+stage_latency = registry.histogram("bot_stage_seconds", "Wall time of each moderation stage (while stage timing is on)")
+
+Report = Callable[[str, str], Awaitable[None]]
+
+# Time spent in stages nested inside the running one (per task), subtracted from its own
+_nested = contextvars.ContextVar("profiler_nested", default=None)
+
+
+def _describe(filename: str, line: int, name: str) -> str:
+    if filename == "~": return name  # built-in
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler: a side thread snapshots the event loop thread's
+    stack every `interval` seconds. The loop itself runs untouched, so the
+    cost is the sampling thread's share of the GIL.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks: Counter = Counter()  # "outer;...;inner" -> samples
+        self.samples = 0
+        self._target = threading.get_ident()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def enable(self):
+        self._target = threading.get_ident()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+
+    def disable(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(_describe(code.co_filename, code.co_firstlineno, code.co_name))
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+
+    def dump(self, path: str):
+        """Collapsed stacks, one "stack count" per line (flamegraph.pl / speedscope)"""
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+    def top(self, limit: int) -> List[str]:
+        own: Counter = Counter()
+        total: Counter = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            own[frames[-1]] += count
+            for frame in set(frames):
+                total[frame] += count
+        samples = self.samples or 1
+        lines = [f"{'self%':>6} {'total%':>6}  function"]
+        for frame, count in own.most_common(limit):
+            lines.append(f"{100 * count / samples:6.1f} {100 * total[frame] / samples:6.1f}  {frame}")
+        return lines
+
+
+class Profiler:
+    """
+    CPU profiling for a number of seconds or updates, plus per-stage timing.
+
+    Profiling is deterministic (cProfile on the event loop thread, every
+    handler and filter call) or sampling (PROFILE_SAMPLE_INTERVAL, far
+    cheaper under load). When it ends, the top PROFILE_TOP functions are
+    passed to the report callback along with a dump in PROFILE_DIR (.prof
+    for pstats / snakeviz, collapsed stacks .txt when sampling). A run never
+    lasts longer than PROFILE_MAX_SECONDS.
+
+    Stage timing (PROFILE_STAGES=1 or /profile stages on) records the wall
+    time of the functions wrapped with stage() into bot_stage_seconds. A
+    stage called from another one counts only toward itself.
+
+    While nothing is on, the only cost is one attribute check per update
+    and per wrapped call.
+    """
+
+    def __init__(self):
+        self.stages = os.getenv("PROFILE_STAGES", "0") == "1"
+        self.directory = os.getenv("PROFILE_DIR", "profiles")
+        self.max_seconds = float(os.getenv("PROFILE_MAX_SECONDS", "600"))
+        self.sample_interval = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.005"))
+        self.top = int(os.getenv("PROFILE_TOP", "15"))
+        self._session: Union[cProfile.Profile, SamplingProfiler, None] = None
+        self._report: Optional[Report] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._update_limit = 0
+        self._updates = 0
+        self._started = 0.0
+        self._stage_windows: Dict[str, LatencyWindow] = {}
+
+    @property
+    def running(self) -> bool:
+        return self._session is not None
+
+    # ==================== CPU Profiling ====================
+
+    def start(self, seconds: Optional[float] = None, updates: Optional[int] = None,
+              sampling: bool = False, report: Optional[Report] = None) -> bool:
+        """
+        Start profiling until `seconds` pass or `updates` updates are handled.
+
+        Args:
+            seconds: Run time (capped at PROFILE_MAX_SECONDS)
+            updates: Stop after this many updates instead
+            sampling: Sample stacks instead of tracing every call
+            report: Coroutine function called with (summary, dump path) at the end
+
+        Returns:
+            False if a run is already in progress
+        """
+        if self.running: return False
+        session = SamplingProfiler(self.sample_interval) if sampling else cProfile.Profile()
+        self._report = report
+        self._update_limit = updates or 0
+        self._updates = 0
+        self._started = time.perf_counter()
+        duration = min(seconds or self.max_seconds, self.max_seconds)
+        self._timer = asyncio.get_running_loop().call_later(duration, self.stop)
+        self._session = session
+        session.enable()
+        logger.info(f"Profiling started ({'sampling' if sampling else 'deterministic'}, "
+                    f"{f'{updates} updates' if updates else f'{duration:.0f}s'})")
+        return True
+
+    def count_update(self):
+        """Called after each update's handlers; ends update-bounded runs"""
+        if self._session is None: return
+        self._updates += 1
+        if self._update_limit and self._updates >= self._update_limit:
+            self.stop()
+
+    def stop(self) -> bool:
+        """End the current run, write the dump and hand the summary to the report callback"""
+        session = self._session
+        if session is None: return False
+        session.disable()
+        self._session = None
+        self._timer.cancel()
+        elapsed = time.perf_counter() - self._started
+
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        if isinstance(session, SamplingProfiler):
+            path = os.path.join(self.directory, f"profile-{stamp}-{os.getpid()}.txt")
+            session.dump(path)
+            header = f"sampling | {elapsed:.1f}s | {self._updates} updates | {session.samples} samples"
+            lines = session.top(self.top)
+        else:
+            path = os.path.join(self.directory, f"profile-{stamp}-{os.getpid()}.prof")
+            session.dump_stats(path)
+            header = f"deterministic | {elapsed:.1f}s | {self._updates} updates"
+            lines = self._cprofile_top(session)
+        summary = "\n".join([header, *lines])
+        logger.info(f"Profile written to {path}\n{summary}")
+
+        if self._report is not None:
+            asyncio.get_running_loop().create_task(self._report(summary, path))
+            self._report = None
+        return True
+
+    def _cprofile_top(self, session: cProfile.Profile) -> List[str]:
+        stats = pstats.Stats(session).stats
+        ranked = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)
+        lines = [f"{'own ms':>8} {'cum ms':>8} {'calls':>7}  function"]
+        for (filename, line, name), (_, calls, own, cumulative, _) in ranked[:self.top]:
+            lines.append(f"{own * 1000:8.1f} {cumulative * 1000:8.1f} {calls:7d}  {_describe(filename, line, name)}")
+        return lines
+
+    # ==================== Stage Timing ====================
+
+    def stage(self, name: str):
+        """Decorator timing a sync or async function as stage `name` while stage timing is on"""
+        def decorator(func):
+            if asyncio.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def wrapper(*args, **kwargs):
+                    if not self.stages: return await func(*args, **kwargs)
+                    nested = [0.0]
+                    token = _nested.set(nested)
+                    started = time.perf_counter()
+                    try:
+                        return await func(*args, **kwargs)
+                    finally:
+                        self._end_stage(name, time.perf_counter() - started, nested[0], token)
+            else:
+                @functools.wraps(func)
+                def wrapper(*args, **kwargs):
+                    if not self.stages: return func(*args, **kwargs)
+                    nested = [0.0]
+                    token = _nested.set(nested)
+                    started = time.perf_counter()
+                    try:
+                        return func(*args, **kwargs)
+                    finally:
+                        self._end_stage(name, time.perf_counter() - started, nested[0], token)
+            return wrapper
+        return decorator
+
+    def _end_stage(self, name: str, elapsed: float, nested: float, token: contextvars.Token):
+        _nested.reset(token)
+        outer = _nested.get()
+        if outer is not None:
+            outer[0] += elapsed
+        self._observe_stage(name, elapsed - nested)
+
+    def _observe_stage(self, name: str, seconds: float):
+        stage_latency.observe(seconds, stage=name)
+        window = self._stage_windows.get(name)
+        if window is None:
+            window = self._stage_windows[name] = LatencyWindow()
+        window.add(seconds)
+
+    def stage_summary(self) -> str:
+        """Calls and p50 / p99 (ms, last 1000 calls) per stage"""
+        if not self._stage_windows: return "no stage timings yet"
+        lines = [f"{'stage':<10} {'calls':>8} {'p50 ms':>8} {'p99 ms':>8}"]
+        for name, window in self._stage_windows.items():
+            stats = window.stats()
+            lines.append(f"{name:<10} {stats['count']:8d} {stats['p50'] * 1000:8.3f} {stats['p99'] * 1000:8.3f}")
+        return "\n".join(lines)
+
+
+profiler = Profiler()
@@ -0,0 +1,260 @@
+"""
+Update Replay
+Streams recorded Telegram updates (JSONL) through the real handlers against
+in-memory stand-ins and reports every moderation decision with its timing.
+
+Usage:
+    python -m src.replay updates.jsonl[.gz] [--speed 0] [--decisions out.jsonl] [--words words.txt]
+                         [--admin CHAT_ID:USER_ID] [--no-timing]
+
+Each input line is one Update as returned by getUpdates / sent to the webhook.
+Each output line is {"update_id", "chat_id", "user_id", "actions", "ms"}, where
+actions are the Bot API decisions in call order (delete, ban, mute, forward,
+message, ...) followed by one "warn" per warning. With --no-timing two runs
+can be diffed directly.
+"""
+
+import os
+import sys
+import gzip
+import json
+import time
+import asyncio
+import logging
+import argparse
+from typing import Dict, Iterator, List, Optional, TextIO
+
+from telegram import Update
+from telegram.ext import Application
+from src.database import adb, DEFAULT_BANNED_WORDS
+from src.inmemory import InMemoryDatabaseManager, RecordingBot
+from src.bot import register_handlers
+from src.user_registry import user_registry
+from src.warn_ledger import warn_ledger
+from src.deletion_scheduler import deletion_scheduler
+from src.outbound import outbound, TokenBucket
+from src.flood import flood_detector
+from src.latency import LatencyWindow
+
+logger = logging.getLogger(__name__)
+
+# Bot API method -> decision name (lookups like get_chat_member are not decisions)
+ACTIONS = {
+    "delete_message": "delete",
+    "delete_messages": "delete",
+    "ban_chat_member": "ban",
+    "unban_chat_member": "unban",
+    "restrict_chat_member": "mute",
+    "forward_message": "forward",
+    "copy_message": "copy",
+    "send_message": "message",
+    "leave_chat": "leave",
+}
+
+
+class ReplayDatabase(InMemoryDatabaseManager):
+    """In-memory database that licenses every group and records warns"""
+
+    def __init__(self, banned_words: List[str]):
+        super().__init__(banned_words=banned_words)
+        self.warned: List[int] = []
+
+    def _fetch_group_license(self, chat_id: int) -> bool:
+        return True
+
+    def add_warn(self, user_id: int) -> Optional[int]:
+        self.warned.append(user_id)
+        return super().add_warn(user_id)
+
+
+def read_updates(path: str) -> Iterator[dict]:
+    """Yield one update dict per line without loading the file (.gz and "-" for stdin work)"""
+    if path == "-":
+        stream = sys.stdin
+    elif path.endswith(".gz"):
+        stream = gzip.open(path, "rt", encoding="utf-8")
+    else:
+        stream = open(path, encoding="utf-8")
+    try:
+        for line_no, line in enumerate(stream, 1):
+            line = line.strip()
+            if not line: continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                logger.warning(f"Line {line_no} skipped: {e}")
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def recorded_time(update: Update) -> Optional[float]:
+    """When Telegram stamped the update (epoch seconds), if it says"""
+    message = update.effective_message
+    if message is not None and message.date is not None:
+        return message.date.timestamp()
+    member_update = update.chat_member or update.my_chat_member
+    if member_update is not None:
+        return member_update.date.timestamp()
+    return None
+
+
+class Replayer:
+    """
+    Feeds updates one at a time to an Application built with the production
+    handlers. After each update the outbound queue and warn persistence are
+    drained, so every call the update caused is attributed to it.
+
+    The flood detector runs on the recorded message times, so bursts are
+    judged as they happened regardless of the replay speed.
+    """
+
+    def __init__(self, bot: RecordingBot, database: ReplayDatabase, speed: float = 0.0):
+        self.bot = bot
+        self.database = database
+        self.speed = speed
+        self.application: Optional[Application] = None
+        self.latency = LatencyWindow(size=100_000)
+        self.actions: Dict[str, int] = {}
+        self.updates = 0
+        self._now: Optional[float] = None
+
+    async def start(self):
+        adb.manager = self.database
+        self.database.initialize()
+
+        # No rate limits offline: a replay is bounded by the handlers, not by Telegram
+        outbound.global_bucket = TokenBucket(rate=1e9, burst=1e9)
+        outbound.chat_rate = outbound.chat_burst = 1e9
+        flood_detector.clock = lambda: self._now if self._now is not None else time.monotonic()
+
+        self.application = Application.builder().bot(self.bot).updater(None).build()
+        register_handlers(self.application)
+        await self.application.initialize()
+
+        user_registry.start()
+        # Flash-message cleanup is not a decision, it gets a bot of its own
+        await deletion_scheduler.start(RecordingBot(record=False), restore=False)
+        outbound.start(self.bot)
+
+    async def stop(self):
+        await outbound.stop()
+        await warn_ledger.drain()
+        await deletion_scheduler.stop()
+        await user_registry.stop()
+        await self.application.shutdown()
+        flood_detector.clock = time.monotonic
+
+    async def process(self, update: Update) -> dict:
+        """Run one update through the handlers and return its decisions"""
+        stamp = recorded_time(update)
+        if stamp is not None:
+            self._now = stamp
+
+        self.bot.reset()
+        self.database.warned.clear()
+
+        started = time.perf_counter()
+        await self.application.process_update(update)
+        elapsed = time.perf_counter() - started
+        await outbound.drain()
+        await warn_ledger.drain()
+
+        actions = [ACTIONS[method] for method, _ in self.bot.calls if method in ACTIONS]
+        actions += ["warn"] * len(self.database.warned)
+        for action in actions:
+            self.actions[action] = self.actions.get(action, 0) + 1
+        self.latency.add(elapsed)
+        self.updates += 1
+
+        return {
+            "update_id": update.update_id,
+            "chat_id": update.effective_chat.id if update.effective_chat else None,
+            "user_id": update.effective_user.id if update.effective_user else None,
+            "actions": actions,
+            "ms": round(elapsed * 1000, 3),
+        }
+
+    async def run(self, updates: Iterator[dict], out: TextIO, timing: bool = True):
+        first_stamp = first_clock = None
+        for data in updates:
+            try:
+                update = Update.de_json(data, self.bot)
+            except Exception as e:
+                logger.warning(f"Update {data.get('update_id')} skipped: {e}")
+                continue
+
+            if self.speed > 0:
+                stamp = recorded_time(update)
+                if stamp is not None:
+                    if first_stamp is None:
+                        first_stamp, first_clock = stamp, time.monotonic()
+                    wait = (stamp - first_stamp) / self.speed - (time.monotonic() - first_clock)
+                    if wait > 0:
+                        await asyncio.sleep(wait)
+
+            try:
+                decision = await self.process(update)
+            except Exception as e:
+                logger.error(f"Update {update.update_id} failed: {e}")
+                continue
+            if not timing:
+                del decision["ms"]
+            out.write(json.dumps(decision, ensure_ascii=False) + "\n")
+
+    def summary(self, elapsed: float) -> str:
+        stats = self.latency.stats()
+        lines = [
+            f"updates: {self.updates} in {elapsed:.2f}s ({self.updates / elapsed if elapsed else 0:.0f}/s)",
+            f"per update: p50 {(stats['p50'] or 0) * 1000:.3f} ms | p99 {(stats['p99'] or 0) * 1000:.3f} ms",
+            "actions: " + (", ".join(f"{name} {count}" for name, count in sorted(self.actions.items())) or "none"),
+        ]
+        return "\n".join(lines)
+
+
+def parse_admins(values: List[str]) -> Dict[int, List[int]]:
+    admins: Dict[int, List[int]] = {}
+    for value in values:
+        chat_id, user_id = value.split(":")
+        admins.setdefault(int(chat_id), []).append(int(user_id))
+    return admins
+
+
+async def replay(args):
+    words = list(DEFAULT_BANNED_WORDS)
+    if args.words:
+        with open(args.words, encoding="utf-8") as f:
+            words += [line.strip() for line in f if line.strip()]
+
+    bot = RecordingBot(admins=parse_admins(args.admin))
+    replayer = Replayer(bot, ReplayDatabase(words), speed=args.speed)
+    out = open(args.decisions, "w", encoding="utf-8") if args.decisions else sys.stdout
+
+    await replayer.start()
+    started = time.perf_counter()
+    try:
+        await replayer.run(read_updates(args.updates), out, timing=not args.no_timing)
+    finally:
+        elapsed = time.perf_counter() - started
+        await replayer.stop()
+        if out is not sys.stdout:
+            out.close()
+    print(replayer.summary(elapsed), file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded updates through the handlers offline")
+    parser.add_argument("updates", help="JSONL file of updates (.gz or - for stdin)")
+    parser.add_argument("--speed", type=float, default=0.0, help="1 = recorded pace, 10 = ten times faster, 0 = as fast as possible")
+    parser.add_argument("--decisions", help="write decisions here instead of stdout")
+    parser.add_argument("--words", help="extra banned words, one per line")
+    parser.add_argument("--admin", action="append", default=[], metavar="CHAT_ID:USER_ID", help="treat a user as admin of a chat")
+    parser.add_argument("--no-timing", action="store_true", help="leave out per-update times (diffable output)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "ERROR"))
+    asyncio.run(replay(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+"""
+SQLite Backend
+Embedded storage for single-node deployments and offline runs (DB_BACKEND=sqlite)
+"""
+
+import os
+import sqlite3
+import logging
+import threading
+from typing import List, Optional, Tuple
+from src.database import DatabaseManager, DEFAULT_BANNED_WORDS
+from src.metrics import DatabaseErrorCounter
+
+logger = logging.getLogger(__name__)
+logger.addHandler(DatabaseErrorCounter())
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sql", "sqlite_schema.sql")
+
+# Statements are module constants so sqlite3's per-connection statement cache
+# reuses one prepared statement per query (values are always bound, never formatted in)
+SQL_SELECT_USER = "SELECT user_id, username, warn_count FROM users WHERE user_id = ?"
+SQL_INSERT_USER = "INSERT OR IGNORE INTO users (user_id, username) VALUES (?, ?)"
+SQL_UPSERT_USER = (
+    "INSERT INTO users (user_id, username) VALUES (:user_id, :username) "
+    "ON CONFLICT (user_id) DO UPDATE SET username = excluded.username"
+)
+SQL_INCREMENT_WARN = (
+    "INSERT INTO users (user_id, username, warn_count) VALUES (?, 'unknown', 1) "
+    "ON CONFLICT (user_id) DO UPDATE SET warn_count = users.warn_count + 1 "
+    "RETURNING warn_count"
+)
+SQL_RESET_WARNS = "UPDATE users SET warn_count = 0 WHERE user_id = ?"
+SQL_USER_BY_NAME = "SELECT user_id FROM users WHERE username = ? LIMIT 1"
+
+SQL_GLOBAL_WORDS = "SELECT word FROM banned_words WHERE chat_id IS NULL"
+SQL_CHAT_WORDS = "SELECT word FROM banned_words WHERE chat_id = ?"
+SQL_ANY_GLOBAL_WORD = "SELECT 1 FROM banned_words WHERE chat_id IS NULL LIMIT 1"
+SQL_INSERT_WORD = "INSERT OR IGNORE INTO banned_words (word, chat_id) VALUES (?, ?)"
+SQL_DELETE_WORD = "DELETE FROM banned_words WHERE COALESCE(chat_id, 0) = ? AND word = ?"
+SQL_LATEST_VERSION = "SELECT scope, version FROM banned_words_versions ORDER BY version DESC LIMIT 1"
+SQL_VERSIONS_SINCE = "SELECT scope, version FROM banned_words_versions WHERE version > ?"
+
+SQL_GROUP_ALLOWED = "SELECT 1 FROM allowed_groups WHERE chat_id = ?"
+SQL_INSERT_GROUP = "INSERT INTO allowed_groups (chat_id, note) VALUES (?, ?)"
+
+SQL_UPSERT_APPROVAL = (
+    "INSERT INTO pending_approvals (message_id, chat_id, user_id, file_unique_id, created_at) "
+    "VALUES (:message_id, :chat_id, :user_id, :file_unique_id, :created_at) "
+    "ON CONFLICT (message_id) DO UPDATE SET chat_id = excluded.chat_id, user_id = excluded.user_id, "
+    "file_unique_id = excluded.file_unique_id, created_at = excluded.created_at"
+)
+SQL_LOAD_APPROVALS = "SELECT * FROM pending_approvals WHERE created_at >= ? ORDER BY created_at DESC LIMIT ?"
+SQL_DELETE_APPROVAL = "DELETE FROM pending_approvals WHERE message_id = ?"
+SQL_PURGE_APPROVALS = "DELETE FROM pending_approvals WHERE created_at < ?"
+
+SQL_UPSERT_VERDICT = (
+    "INSERT INTO media_verdicts (scope, file_unique_id, approved, decided_at) "
+    "VALUES (:scope, :file_unique_id, :approved, :decided_at) "
+    "ON CONFLICT (scope, file_unique_id) DO UPDATE SET approved = excluded.approved, decided_at = excluded.decided_at"
+)
+SQL_LOAD_VERDICTS = "SELECT * FROM media_verdicts WHERE decided_at >= ? ORDER BY decided_at DESC LIMIT ?"
+SQL_PURGE_VERDICTS = "DELETE FROM media_verdicts WHERE decided_at < ?"
+
+SQL_UPSERT_DELETION = (
+    "INSERT INTO scheduled_deletions (chat_id, message_id, due_at) VALUES (:chat_id, :message_id, :due_at) "
+    "ON CONFLICT (chat_id, message_id) DO UPDATE SET due_at = excluded.due_at"
+)
+SQL_LOAD_DELETIONS = "SELECT chat_id, message_id, due_at FROM scheduled_deletions"
+SQL_CLEAR_DELETIONS = "DELETE FROM scheduled_deletions"
+
+
+class SQLiteDatabaseManager(DatabaseManager):
+    """
+    Storage in a local SQLite file (SQLITE_PATH, ":memory:" for a throwaway one).
+
+    Each executor thread gets its own connection. The file runs in WAL mode,
+    so readers never wait for the writer and worker processes can share it
+    (SQLITE_BUSY_TIMEOUT covers concurrent writers). Multi-row writes
+    (user upserts, default words, scheduled deletions) are one executemany
+    in one transaction.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        super().__init__()
+        self.path = path or os.getenv("SQLITE_PATH", "bot.db")
+        self.busy_timeout = float(os.getenv("SQLITE_BUSY_TIMEOUT", "5"))
+        self._local = threading.local()
+        if self.path == ":memory:":
+            # One database shared by every thread's connection
+            self._target, self._uri = f"file:memdb-{id(self)}?mode=memory&cache=shared", True
+        else:
+            self._target, self._uri = self.path, False
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self._target, timeout=self.busy_timeout, uri=self._uri)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _connect(self):
+        with open(SCHEMA_PATH, encoding="utf-8") as f:
+            self._conn().executescript(f.read())
+        logger.info(f"SQLite database ready at {self.path}")
+
+    # ==================== User Management ====================
+
+    def initialize_user(self, user_id: int, username: str) -> Optional[dict]:
+        try:
+            conn = self._conn()
+            with conn:
+                conn.execute(SQL_INSERT_USER, (user_id, username))
+            row = conn.execute(SQL_SELECT_USER, (user_id,)).fetchone()
+            return dict(row) if row else None
+        except Exception as e:
+            logger.error(f"Error initializing user {user_id}: {e}")
+            return None
+
+    def upsert_users(self, users: List[dict]) -> bool:
+        if not users: return True
+        try:
+            conn = self._conn()
+            with conn:
+                conn.executemany(SQL_UPSERT_USER, users)
+            logger.info(f"Upserted {len(users)} users")
+            return True
+        except Exception as e:
+            logger.error(f"Error upserting {len(users)} users: {e}")
+            return False
+
+    def add_warn(self, user_id: int) -> Optional[int]:
+        try:
+            conn = self._conn()
+            with conn:
+                new_warn_count = conn.execute(SQL_INCREMENT_WARN, (user_id,)).fetchone()[0]
+            logger.info(f"User {user_id} warned. New warn count: {new_warn_count}")
+            return new_warn_count
+        except Exception as e:
+            logger.error(f"Error adding warn to user {user_id}: {e}")
+            return None
+
+    def get_user_stats(self, user_id: int) -> Optional[dict]:
+        try:
+            row = self._conn().execute(SQL_SELECT_USER, (user_id,)).fetchone()
+            if row is None:
+                logger.warning(f"User {user_id} not found")
+                return None
+            return dict(row)
+        except Exception as e:
+            logger.error(f"Error getting stats for user {user_id}: {e}")
+            return None
+
+    def get_user_id_by_username(self, username: str) -> Optional[int]:
+        try:
+            row = self._conn().execute(SQL_USER_BY_NAME, (username.lstrip("@"),)).fetchone()
+            return row[0] if row else None
+        except Exception as e:
+            logger.error(f"Error finding user by username: {e}")
+            return None
+
+    def reset_warns(self, user_id: int) -> bool:
+        try:
+            conn = self._conn()
+            with conn:
+                conn.execute(SQL_RESET_WARNS, (user_id,))
+            logger.info(f"Reset warnings for user {user_id}")
+            return True
+        except Exception as e:
+            logger.error(f"Error resetting warns: {e}")
+            return False
+
+    # ==================== Banned Words Management ====================
+
+    def _fetch_global_words(self) -> List[str]:
+        return [row[0].lower() for row in self._conn().execute(SQL_GLOBAL_WORDS)]
+
+    def _insert_banned_word(self, word: str, chat_id: Optional[int]) -> Tuple[Optional[dict], bool]:
+        conn = self._conn()
+        with conn:
+            created = conn.execute(SQL_INSERT_WORD, (word, chat_id)).rowcount > 0
+        return {"word": word, "chat_id": chat_id}, created
+
+    def _delete_banned_word(self, word: str, chat_id: Optional[int]):
+        conn = self._conn()
+        with conn:
+            conn.execute(SQL_DELETE_WORD, (chat_id or 0, word))
+
+    def load_chat_words(self, chat_id: int) -> Optional[List[str]]:
+        try:
+            return [row[0].lower() for row in self._conn().execute(SQL_CHAT_WORDS, (chat_id,))]
+        except Exception as e:
+            logger.error(f"Error loading banned words for chat {chat_id}: {e}")
+            return None
+
+    def fetch_banned_word_versions(self, since: Optional[int]) -> Optional[List[dict]]:
+        try:
+            if since is None:
+                rows = self._conn().execute(SQL_LATEST_VERSION).fetchall()
+            else:
+                rows = self._conn().execute(SQL_VERSIONS_SINCE, (since,)).fetchall()
+            return [dict(row) for row in rows]
+        except Exception as e:
+            logger.error(f"Error checking banned word versions: {e}")
+            return None
+
+    def initialize_default_banned_words(self) -> bool:
+        try:
+            conn = self._conn()
+            if conn.execute(SQL_ANY_GLOBAL_WORD).fetchone():
+                logger.info("Banned words already exist in database")
+                return True
+            with conn:
+                conn.executemany(SQL_INSERT_WORD, [(word.lower(), None) for word in DEFAULT_BANNED_WORDS])
+            logger.info(f"Initialized {len(DEFAULT_BANNED_WORDS)} default banned words")
+            return True
+        except Exception as e:
+            logger.error(f"Error initializing default banned words: {e}")
+            return False
+
+    # ==================== License System ====================
+
+    def _fetch_group_license(self, chat_id: int) -> bool:
+        return self._conn().execute(SQL_GROUP_ALLOWED, (chat_id,)).fetchone() is not None
+
+    def _insert_allowed_group(self, chat_id: int, note: str) -> bool:
+        conn = self._conn()
+        with conn:
+            conn.execute(SQL_INSERT_GROUP, (chat_id, note))
+        return True
+
+    # ==================== Approval Queue ====================
+
+    def save_pending_approval(self, message_id: int, data: dict) -> bool:
+        try:
+            conn = self._conn()
+            with conn:
+                conn.execute(SQL_UPSERT_APPROVAL, {"file_unique_id": None, **data, "message_id": message_id})
+            return True
+        except Exception as e:
+            logger.error(f"Error saving pending approval {message_id}: {e}")
+            return False
+
+    def load_pending_approvals(self, since: int, limit: int) -> List[dict]:
+        try:
+            return [dict(row) for row in self._conn().execute(SQL_LOAD_APPROVALS, (since, limit))]
+        except Exception as e:
+            logger.error(f"Error loading pending approvals: {e}")
+            return []
+
+    def delete_pending_approval(self, message_id: int) -> bool:
+        try:
+            conn = self._conn()
+            with conn:
+                conn.execute(SQL_DELETE_APPROVAL, (message_id,))
+            return True
+        except Exception as e:
+            logger.error(f"Error deleting pending approval {message_id}: {e}")
+            return False
+
+    def purge_pending_approvals(self, before: int) -> bool:
+        try:
+            conn = self._conn()
+            with conn:
+                conn.execute(SQL_PURGE_APPROVALS, (before,))
+            return True
+        except Exception as e:
+            logger.error(f"Error purging pending approvals: {e}")
+            return False
+
+    # ==================== Media Verdicts ====================
+
+    def save_media_verdict(self, row: dict) -> bool:
+        try:
+            conn = self._conn()
+            with conn:
+                conn.execute(SQL_UPSERT_VERDICT, row)
+            return True
+        except Exception as e:
+            logger.error(f"Error saving media verdict {row.get('file_unique_id')}: {e}")
+            return False
+
+    def load_media_verdicts(self, since: int, limit: int) -> List[dict]:
+        try:
+            rows = [dict(row) for row in self._conn().execute(SQL_LOAD_VERDICTS, (since, limit))]
+            for row in rows:
+                row["approved"] = bool(row["approved"])
+            return rows
+        except Exception as e:
+            logger.error(f"Error loading media verdicts: {e}")
+            return []
+
+    def purge_media_verdicts(self, before: int) -> bool:
+        try:
+            conn = self._conn()
+            with conn:
+                conn.execute(SQL_PURGE_VERDICTS, (before,))
+            return True
+        except Exception as e:
+            logger.error(f"Error purging media verdicts: {e}")
+            return False
+
+    # ==================== Scheduled Deletions ====================
+
+    def save_scheduled_deletions(self, rows: List[dict]) -> bool:
+        if not rows: return True
+        try:
+            conn = self._conn()
+            with conn:
+                conn.executemany(SQL_UPSERT_DELETION, rows)
+            return True
+        except Exception as e:
+            logger.error(f"Error saving {len(rows)} scheduled deletions: {e}")
+            return False
+
+    def load_scheduled_deletions(self) -> List[dict]:
+        try:
+            return [dict(row) for row in self._conn().execute(SQL_LOAD_DELETIONS)]
+        except Exception as e:
+            logger.error(f"Error loading scheduled deletions: {e}")
+            return []
+
+    def clear_scheduled_deletions(self) -> bool:
+        try:
+            conn = self._conn()
+            with conn:
+                conn.execute(SQL_CLEAR_DELETIONS)
+            return True
+        except Exception as e:
+            logger.error(f"Error clearing scheduled deletions: {e}")
+            return False
@@ -0,0 +1,116 @@
+"""
+Update Processor
+Runs updates from different chats concurrently while keeping each chat's updates in order
+"""
+
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, Optional
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+from src.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+updates_dropped = registry.counter("bot_updates_dropped_total", "Updates that skipped the handlers because their chat queue was full")
+update_queue_wait = registry.histogram("bot_update_queue_wait_seconds", "Time an update waited behind its chat and the concurrency limit")
+
+
+def ordering_key(update: object) -> Optional[Hashable]:
+    """Updates with the same key run one at a time, in arrival order (chat, else user)"""
+    if not isinstance(update, Update): return None
+    if update.effective_chat: return update.effective_chat.id
+    if update.effective_user: return ("user", update.effective_user.id)
+    return None
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """
+    Concurrent update processing with per-chat ordering.
+
+    Each chat has at most one update in its handlers; later updates for the
+    same chat wait in a FIFO and are handed the turn when it finishes, so a
+    slow forward or database call only delays its own chat. At most
+    UPDATE_CONCURRENCY updates run at once across chats. A chat with
+    UPDATE_CHAT_QUEUE updates already waiting skips the handlers for new
+    ones and hands them to `on_overflow` instead (e.g. to delete them), and
+    PTB's own limit (UPDATE_MAX_PENDING) bounds waiting plus running
+    updates overall.
+    """
+
+    def __init__(self, concurrency: int = None, chat_queue: int = None, max_pending: int = None,
+                 on_overflow: Optional[Callable[[object], Awaitable[None]]] = None):
+        super().__init__(max_pending or int(os.getenv("UPDATE_MAX_PENDING", "10000")))
+        self.concurrency = concurrency or int(os.getenv("UPDATE_CONCURRENCY", "64"))
+        self.chat_queue = chat_queue or int(os.getenv("UPDATE_CHAT_QUEUE", "100"))
+        self.on_overflow = on_overflow
+        self._running = asyncio.Semaphore(self.concurrency)
+        self._chats: Dict[Hashable, Deque[asyncio.Future]] = {}  # busy chat -> updates waiting for their turn
+        self.active = 0
+        self.waiting = 0
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]):
+        key = ordering_key(update)
+        started = time.perf_counter()
+
+        if key is not None:
+            queue = self._chats.get(key)
+            if queue is None:
+                self._chats[key] = deque()
+            elif len(queue) >= self.chat_queue:
+                updates_dropped.inc()
+                logger.warning(f"Chat {key} has {len(queue)} updates waiting, skipping the handlers for one")
+                coroutine.close()
+                if self.on_overflow is not None:
+                    try:
+                        await self.on_overflow(update)
+                    except Exception as e:
+                        logger.error(f"Overflow handling failed for chat {key}: {e}")
+                return
+            else:
+                turn = asyncio.get_running_loop().create_future()
+                queue.append(turn)
+                self.waiting += 1
+                try:
+                    await turn
+                except asyncio.CancelledError:
+                    if turn.cancelled():
+                        queue.remove(turn)
+                    else:
+                        self._next(key)  # the turn was already ours, pass it on
+                    coroutine.close()
+                    raise
+                finally:
+                    self.waiting -= 1
+
+        try:
+            async with self._running:
+                update_queue_wait.observe(time.perf_counter() - started)
+                self.active += 1
+                try:
+                    await coroutine
+                finally:
+                    self.active -= 1
+        finally:
+            if key is not None:
+                self._next(key)
+
+    def _next(self, key: Hashable):
+        """Give the chat's turn to its oldest waiting update, or mark the chat idle"""
+        queue = self._chats[key]
+        if queue:
+            queue.popleft().set_result(None)
+        else:
+            del self._chats[key]
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    def stats(self) -> dict:
+        return {"active": self.active, "waiting": self.waiting, "busy_chats": len(self._chats)}
@@ -0,0 +1,93 @@
+"""
+Write-Behind User Registry
+Remembers seen users in memory and saves new/renamed ones in batches
+"""
+
+import os
+import asyncio
+import logging
+from typing import Dict, Optional
+from src.database import adb
+
+logger = logging.getLogger(__name__)
+
+
+class UserRegistry:
+    """
+    Replaces a per-message initialize_user round trip.
+
+    observe() is a dict lookup on the hot path. Users that are new or whose
+    username changed are queued and written with one bulk upsert every
+    flush_interval seconds, or sooner once batch_size users are waiting.
+    """
+
+    def __init__(self, flush_interval: float = None, batch_size: int = None, max_seen: int = None):
+        self.flush_interval = flush_interval or float(os.getenv("USER_FLUSH_INTERVAL", "5"))
+        self.batch_size = batch_size or int(os.getenv("USER_FLUSH_BATCH", "500"))
+        self.max_seen = max_seen or int(os.getenv("USER_SEEN_MAX", "500000"))
+        self._seen: Dict[int, str] = {}
+        self._pending: Dict[int, str] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    def observe(self, user_id: int, username: str):
+        """Record a user seen in a message (no I/O)"""
+        if self._seen.get(user_id) == username: return
+
+        if len(self._seen) >= self.max_seen:
+            # Forget the oldest entry; worst case it is upserted again later
+            self._seen.pop(next(iter(self._seen)))
+        self._seen[user_id] = username
+        self._pending[user_id] = username
+
+        if len(self._pending) >= self.batch_size and self._wakeup:
+            self._wakeup.set()
+
+    async def flush(self) -> bool:
+        """Write every pending user in one upsert"""
+        if not self._pending: return True
+
+        batch, self._pending = self._pending, {}
+        rows = [{"user_id": user_id, "username": username} for user_id, username in batch.items()]
+        if await adb.upsert_users(rows):
+            return True
+
+        # Re-queue on failure without overwriting newer usernames
+        for user_id, username in batch.items():
+            self._pending.setdefault(user_id, username)
+        return False
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def start(self):
+        """Start the background flusher (needs a running event loop)"""
+        if self._task: return
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"User registry flusher started (every {self.flush_interval}s / {self.batch_size} users)")
+
+    async def stop(self):
+        """Stop the flusher and drain whatever is still pending"""
+        if self._task:
+            # Let an in-flight upsert finish instead of cancelling it
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self.flush()
+        logger.info("User registry drained")
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+
+user_registry = UserRegistry()
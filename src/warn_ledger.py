@@ -0,0 +1,112 @@
+"""
+Warn Ledger
+Authoritative in-process warn counts in front of the atomic database increment
+"""
+
+import os
+import asyncio
+import logging
+from typing import Dict, Optional, Set
+from src.database import adb
+from src import events
+
+logger = logging.getLogger(__name__)
+
+
+class WarnLedger:
+    """
+    Keeps the current warn count of recently warned users.
+
+    The first warn for a user waits for the atomic increment_warn call and
+    records the returned count. Later warns are counted locally right away
+    (no read, no lost increments) and persisted in the background. The
+    database answer is folded back in, so warns issued by another instance
+    are never undercounted.
+
+    reset() bumps the user's generation; database answers to increments
+    started before it are discarded instead of restoring the old count.
+    """
+
+    def __init__(self, max_users: int = None):
+        self.max_users = max_users or int(os.getenv("WARN_LEDGER_MAX", "100000"))
+        self._counts: Dict[int, int] = {}
+        self._generations: Dict[int, int] = {}  # bumped by every reset
+        self._inflight: Set[asyncio.Task] = set()
+        events.subscribe(events.WARN_CHANGED, self._on_remote_change)
+
+    def get(self, user_id: int) -> Optional[int]:
+        """Warn count known to this process, or None if the user is not in the ledger"""
+        return self._counts.get(user_id)
+
+    def _record(self, user_id: int, count: int) -> int:
+        current = self._counts.get(user_id, 0)
+        if user_id not in self._counts and len(self._counts) >= self.max_users:
+            evicted = next(iter(self._counts))
+            self._counts.pop(evicted)
+            self._generations.pop(evicted, None)
+        self._counts[user_id] = max(current, count)
+        return self._counts[user_id]
+
+    def _on_remote_change(self, user_id: int, count: int):
+        # Another worker warned (count > 0) or reset (count == 0) this user
+        if count == 0:
+            self._forget(user_id)
+        else:
+            self._record(user_id, count)
+
+    def _forget(self, user_id: int):
+        self._counts[user_id] = 0
+        self._generations[user_id] = self._generations.get(user_id, 0) + 1
+
+    async def _persist(self, user_id: int, generation: int):
+        server_count = await adb.add_warn(user_id)
+        if server_count is None:
+            logger.error(f"Warn for user {user_id} not persisted (ledger keeps local count)")
+            return
+        # A reset while the call was in flight wins over its (older) count
+        if user_id in self._counts and self._generations.get(user_id, 0) == generation:
+            self._record(user_id, server_count)
+
+    async def add_warn(self, user_id: int) -> Optional[int]:
+        """
+        Add one warn to a user.
+
+        Args:
+            user_id: Telegram user ID
+
+        Returns:
+            New warn count, or None if the first database increment failed
+            or the user was reset while it was in flight
+        """
+        known = self._counts.get(user_id)
+        if known is not None:
+            self._counts[user_id] = known + 1
+            task = asyncio.create_task(self._persist(user_id, self._generations.get(user_id, 0)))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+            events.publish(events.WARN_CHANGED, user_id=user_id, count=known + 1)
+            return known + 1
+
+        generation = self._generations.get(user_id, 0)
+        server_count = await adb.add_warn(user_id)
+        if server_count is None or self._generations.get(user_id, 0) != generation:
+            return None
+        count = self._record(user_id, server_count)
+        events.publish(events.WARN_CHANGED, user_id=user_id, count=count)
+        return count
+
+    def reset(self, user_id: int):
+        """Forget a user's warns after /unmute reset them in the database"""
+        self._forget(user_id)
+        events.publish(events.WARN_CHANGED, user_id=user_id, count=0)
+
+    async def drain(self):
+        """Wait for background increments (called on shutdown)"""
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+
+warn_ledger = WarnLedger()
@@ -0,0 +1,201 @@
+"""
+Webhook Listener
+Minimal asyncio HTTP server that feeds Telegram webhook updates into the Application
+"""
+
+import os
+import hmac
+import json
+import signal
+import asyncio
+import logging
+from typing import List, Optional, Tuple
+from telegram import Update
+from telegram.ext import Application
+
+logger = logging.getLogger(__name__)
+
+# Only the update types the handlers actually use
+DEFAULT_ALLOWED_UPDATES = [Update.MESSAGE, Update.CHAT_MEMBER, Update.MY_CHAT_MEMBER]
+
+SECRET_HEADER = "x-telegram-bot-api-secret-token"
+
+MAX_HEADERS = 100
+
+
+def get_allowed_updates() -> List[str]:
+    """ALLOWED_UPDATES env (comma separated, or 'all') or the default subset"""
+    value = os.getenv("ALLOWED_UPDATES", "").strip()
+    if not value:
+        return DEFAULT_ALLOWED_UPDATES
+    if value.lower() == "all":
+        return Update.ALL_TYPES
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+class WebhookServer:
+    """
+    Receives POSTed updates and puts them on application.update_queue.
+
+    Requests must carry the X-Telegram-Bot-Api-Secret-Token header when a
+    secret is configured. Method, path, secret and Content-Length (at most
+    max_body bytes) are checked before the body is read, and every read
+    times out after read_timeout seconds. Rejected requests close the
+    connection. Recorded update JSON can be POSTed locally:
+
+        curl -X POST localhost:8443/telegram \\
+             -H "X-Telegram-Bot-Api-Secret-Token: $WEBHOOK_SECRET" \\
+             -d @update.json
+    """
+
+    def __init__(self, application: Application, listen: str, port: int, url_path: str, secret_token: Optional[str] = None,
+                 max_body: int = None, read_timeout: float = None):
+        self.application = application
+        self.listen = listen
+        self.port = port
+        self.url_path = "/" + url_path.strip("/")
+        self.secret_token = secret_token
+        self.max_body = max_body or int(os.getenv("WEBHOOK_MAX_BODY", str(1024 * 1024)))
+        self.read_timeout = read_timeout or float(os.getenv("WEBHOOK_READ_TIMEOUT", "10"))
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.received = 0
+        self.rejected = 0
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_connection, self.listen, self.port)
+        logger.info(f"✅ Webhook listening on {self.listen}:{self.port}{self.url_path}")
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _read_head(self, reader: asyncio.StreamReader) -> Optional[Tuple[str, dict]]:
+        request_line = await reader.readline()
+        if not request_line: return None
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""): break
+            if len(headers) >= MAX_HEADERS:
+                raise ValueError("too many headers")
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        return request_line.decode("latin-1"), headers
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            # Keep-alive: serve requests until the client closes the connection
+            while True:
+                head = await asyncio.wait_for(self._read_head(reader), self.read_timeout)
+                if head is None: break
+                request_line, headers = head
+
+                status = self._check_request(request_line, headers)
+                if status:
+                    # The body was not read, so the connection cannot be reused
+                    writer.write(f"HTTP/1.1 {status}\r\nContent-Length: 0\r\nConnection: close\r\n\r\n".encode())
+                    await writer.drain()
+                    break
+
+                length = int(headers["content-length"])
+                body = await asyncio.wait_for(reader.readexactly(length), self.read_timeout)
+
+                status = await self._handle_body(body)
+                writer.write(f"HTTP/1.1 {status}\r\nContent-Length: 0\r\n\r\n".encode())
+                await writer.drain()
+
+                if headers.get("connection", "").lower() == "close": break
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionResetError, ValueError):
+            pass
+        except Exception as e:
+            logger.error(f"Webhook connection error: {e}")
+        finally:
+            writer.close()
+
+    def _check_request(self, request_line: str, headers: dict) -> Optional[str]:
+        """Status to reject the request with before reading its body, or None"""
+        parts = request_line.split()
+        if len(parts) < 2 or parts[0] != "POST":
+            return "405 Method Not Allowed"
+        if parts[1].split("?")[0] != self.url_path:
+            return "404 Not Found"
+
+        if self.secret_token and not hmac.compare_digest(headers.get(SECRET_HEADER, ""), self.secret_token):
+            self.rejected += 1
+            logger.warning("Webhook request with invalid secret token rejected")
+            return "403 Forbidden"
+
+        length = headers.get("content-length", "")
+        if not length.isdigit():
+            return "411 Length Required"
+        if int(length) > self.max_body:
+            self.rejected += 1
+            logger.warning(f"Webhook request of {length} bytes rejected")
+            return "413 Payload Too Large"
+        return None
+
+    async def _handle_body(self, body: bytes) -> str:
+        try:
+            update = Update.de_json(json.loads(body), self.application.bot)
+        except Exception as e:
+            logger.error(f"Invalid webhook payload: {e}")
+            return "400 Bad Request"
+
+        self.received += 1
+        await self.application.update_queue.put(update)
+        return "200 OK"
+
+
+async def run_webhook(application: Application):
+    """
+    Run the application in webhook mode until SIGINT/SIGTERM.
+
+    Env:
+        WEBHOOK_LISTEN / PORT / WEBHOOK_PATH: listener address (127.0.0.1 unless
+            WEBHOOK_LISTEN opts into e.g. 0.0.0.0)
+        WEBHOOK_MAX_BODY / WEBHOOK_READ_TIMEOUT: request size and read time limits
+        WEBHOOK_SECRET: secret token Telegram must send back
+        WEBHOOK_URL: public base URL; when unset set_webhook is skipped (local testing)
+    """
+    listen = os.getenv("WEBHOOK_LISTEN", "127.0.0.1")
+    port = int(os.getenv("PORT", "8443"))
+    url_path = os.getenv("WEBHOOK_PATH", "telegram")
+    secret_token = os.getenv("WEBHOOK_SECRET") or None
+    public_url = os.getenv("WEBHOOK_URL")
+
+    server = WebhookServer(application, listen, port, url_path, secret_token)
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try: loop.add_signal_handler(sig, stop_event.set)
+        except NotImplementedError: pass
+
+    await application.initialize()
+    if application.post_init:
+        await application.post_init(application)
+    try:
+        if public_url:
+            await application.bot.set_webhook(
+                url=public_url.rstrip("/") + server.url_path,
+                secret_token=secret_token,
+                allowed_updates=get_allowed_updates(),
+            )
+            logger.info(f"✅ Webhook registered at {public_url}")
+        else:
+            logger.warning("WEBHOOK_URL not set, skipping set_webhook (local mode)")
+
+        await application.start()
+        await server.start()
+        await stop_event.wait()
+    finally:
+        await server.stop()
+        if application.running:
+            await application.stop()
+        if application.post_stop:
+            await application.post_stop(application)
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
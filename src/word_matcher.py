@@ -0,0 +1,167 @@
+"""
+Banned Word Matcher
+Compiled multi-pattern (Aho-Corasick) matcher for the banned words list
+"""
+
+from typing import Dict, Iterable, List, NamedTuple, Optional, Union
+from src.analysis import MessageAnalysis, normalize_text
+
+
+class WordMatch(NamedTuple):
+    """First banned word found in a message"""
+    word: str          # Banned word as stored in the database
+    offset: int        # Start offset inside the scanned text
+    normalized: bool   # True if found in the normalized skeleton, not the raw text
+    chat_word: bool = False  # True if it is one of the chat's own words, not the global list
+
+
+class _Automaton:
+    """Aho-Corasick automaton over a fixed set of patterns"""
+
+    def __init__(self, patterns: Dict[str, str]):
+        """
+        Build the trie and failure links.
+
+        Args:
+            patterns: Mapping of pattern -> banned word it belongs to
+        """
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.out: List[Optional[str]] = [None]
+
+        for pattern in patterns:
+            state = 0
+            for ch in pattern:
+                nxt = self.goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append(None)
+                state = nxt
+            self.out[state] = pattern
+
+        # Breadth-first pass: failure links + inherited outputs
+        queue = list(self.goto[0].values())
+        for state in queue:
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                if self.out[nxt] is None:
+                    self.out[nxt] = self.out[self.fail[nxt]]
+
+        self.patterns = patterns
+
+    def search(self, text: str) -> Optional[tuple]:
+        """Return (pattern, start offset) of the earliest-ending match, or None"""
+        goto, fail, out = self.goto, self.fail, self.out
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state] is not None:
+                pattern = out[state]
+                return pattern, i - len(pattern) + 1
+        return None
+
+
+class BannedWordMatcher:
+    """
+    Scans a message for every banned word in one pass.
+
+    Holds two automata: one over the raw (lowercased) words, matched against
+    the lowercased message, and one over their normalized forms, matched
+    against the normalized message skeleton.
+    """
+
+    def __init__(self, words: Iterable[str]):
+        raw: Dict[str, str] = {}
+        normalized: Dict[str, str] = {}
+        for word in words:
+            word_lower = word.lower()
+            if not word_lower: continue
+            raw.setdefault(word_lower, word)
+            word_clean = normalize_text(word_lower)
+            if word_clean:
+                normalized.setdefault(word_clean, word)
+
+        self.words = list(dict.fromkeys(raw.values()))
+        self._raw = _Automaton(raw)
+        self._normalized = _Automaton(normalized)
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def extended(self, words: Iterable[str]) -> "BannedWordMatcher":
+        """New matcher with `words` added (the original is left untouched)"""
+        return BannedWordMatcher(self.words + list(words))
+
+    def find_raw(self, text_lower: str) -> Optional[WordMatch]:
+        hit = self._raw.search(text_lower)
+        if hit:
+            return WordMatch(self._raw.patterns[hit[0]], hit[1], False)
+        return None
+
+    def find_normalized(self, text_clean: str) -> Optional[WordMatch]:
+        hit = self._normalized.search(text_clean)
+        if hit:
+            return WordMatch(self._normalized.patterns[hit[0]], hit[1], True)
+        return None
+
+    def find(self, text: Union[str, MessageAnalysis]) -> Optional[WordMatch]:
+        """
+        Find the first banned word in a message.
+
+        Args:
+            text: Message text or caption, or its MessageAnalysis
+
+        Returns:
+            WordMatch for the first hit or None if the message is clean
+        """
+        if not text or not self.words: return None
+        analysis = text if isinstance(text, MessageAnalysis) else MessageAnalysis(text)
+        if not analysis.text: return None
+        return self.find_raw(analysis.lower) or self.find_normalized(analysis.clean)
+
+
+class LayeredMatcher:
+    """
+    A chat's own banned words on top of the shared global matcher.
+
+    The global automaton is built once and shared by every chat, each chat
+    only compiles its (usually short) overlay. Both layers read the same
+    MessageAnalysis.
+    """
+
+    __slots__ = ("base", "overlay")
+
+    def __init__(self, base: BannedWordMatcher, overlay: BannedWordMatcher):
+        self.base = base
+        self.overlay = overlay
+
+    @property
+    def words(self) -> List[str]:
+        return self.overlay.words + self.base.words
+
+    def __len__(self) -> int:
+        return len(self.base) + len(self.overlay)
+
+    def find(self, text: Union[str, MessageAnalysis]) -> Optional[WordMatch]:
+        """Same contract as BannedWordMatcher.find, chat words checked first"""
+        if not self.overlay.words: return self.base.find(text)
+        if not text: return None
+        analysis = text if isinstance(text, MessageAnalysis) else MessageAnalysis(text)
+        if not analysis.text: return None
+
+        hit = self.overlay.find_raw(analysis.lower)
+        if hit: return hit._replace(chat_word=True)
+        hit = self.base.find_raw(analysis.lower)
+        if hit: return hit
+        hit = self.overlay.find_normalized(analysis.clean)
+        if hit: return hit._replace(chat_word=True)
+        return self.base.find_normalized(analysis.clean)
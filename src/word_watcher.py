@@ -0,0 +1,128 @@
+"""
+Banned Words Watcher
+Picks up banned word changes made by other instances or directly in the database
+"""
+
+import os
+import asyncio
+import logging
+from typing import Callable, List, Optional, Set, Tuple
+from src.database import adb
+
+logger = logging.getLogger(__name__)
+
+# Scope of the global list in version stamps (chat-scoped words use their chat_id)
+GLOBAL_SCOPE = 0
+
+
+class ChangeNotifier:
+    """
+    Source of banned word changes.
+
+    changes(since) returns (latest_version, changed_scopes) or None when the
+    source could not be reached. Push-capable notifiers call `listener()` to
+    wake the watcher immediately instead of waiting for the next poll.
+    """
+
+    listener: Optional[Callable[[], None]] = None
+
+    async def changes(self, since: Optional[int]) -> Optional[Tuple[int, Set[int]]]:
+        raise NotImplementedError
+
+
+class DatabaseChangeNotifier(ChangeNotifier):
+    """Polls the banned_words_versions table (one small indexed query)"""
+
+    async def changes(self, since: Optional[int]) -> Optional[Tuple[int, Set[int]]]:
+        rows = await adb.fetch_banned_word_versions(since)
+        if rows is None: return None
+        if not rows: return (since or 0, set())
+        return max(row["version"] for row in rows), {row["scope"] for row in rows}
+
+
+class LocalChangeNotifier(ChangeNotifier):
+    """In-process stand-in: call notify() to simulate a change from elsewhere"""
+
+    def __init__(self):
+        self.version = 0
+        self._log: List[Tuple[int, int]] = []
+
+    def notify(self, scope: int = GLOBAL_SCOPE):
+        self.version += 1
+        self._log.append((self.version, scope))
+        if self.listener:
+            self.listener()
+
+    async def changes(self, since: Optional[int]) -> Optional[Tuple[int, Set[int]]]:
+        if since is None: return (self.version, set())
+        return self.version, {scope for version, scope in self._log if version > since}
+
+
+class BannedWordsWatcher:
+    """
+    Keeps the banned word caches in step with the database.
+
+    Every `interval` seconds (BANNED_WORDS_POLL) the notifier is asked for
+    scopes changed since the last seen version. A changed global list is
+    reloaded and recompiled in the background while messages keep using the
+    old matcher; a changed chat only drops that chat's overlay.
+    """
+
+    def __init__(self, interval: float = None, notifier: Optional[ChangeNotifier] = None):
+        self.interval = interval or float(os.getenv("BANNED_WORDS_POLL", "30"))
+        self.notifier = notifier or DatabaseChangeNotifier()
+        self.version: Optional[int] = None
+        self.reloads = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def check(self) -> Set[int]:
+        """Poll once and apply changes, returns the scopes that changed"""
+        result = await self.notifier.changes(self.version)
+        if result is None: return set()
+        version, scopes = result
+
+        # First answer is only the baseline: caches were loaded at startup
+        if self.version is None:
+            self.version = version
+            return set()
+        self.version = version
+        if not scopes: return set()
+
+        if GLOBAL_SCOPE in scopes:
+            await adb.load_banned_words_cache()
+            self.reloads += 1
+        for scope in scopes - {GLOBAL_SCOPE}:
+            adb.manager.invalidate_banned_words(scope)
+
+        logger.info(f"Banned words changed (version {version}, {len(scopes)} scopes)")
+        return scopes
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.check()
+            except Exception as e:
+                logger.error(f"Banned words check failed: {e}")
+
+    async def start(self):
+        if self._task: return
+        self._wakeup = asyncio.Event()
+        self.notifier.listener = self._wakeup.set
+        await self.check()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if not self._task: return
+        self._task.cancel()
+        try: await self._task
+        except asyncio.CancelledError: pass
+        self._task = None
+
+
+banned_words_watcher = BannedWordsWatcher()
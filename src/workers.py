@@ -0,0 +1,214 @@
+"""
+Worker Mode
+Chat-sharded multi-process runner: one supervisor receives updates, N workers handle them
+"""
+
+import os
+import signal
+import asyncio
+import logging
+import threading
+import multiprocessing
+from typing import List, Optional
+from telegram import Update
+from telegram.ext import Application, ContextTypes, TypeHandler
+from src import events
+from src.metrics import registry, start_metrics_server, InstrumentedRequest
+
+logger = logging.getLogger(__name__)
+
+# Inbox messages: ("update", update_dict) | ("event", name, payload) | None (stop)
+# Outbox messages: (worker_index, name, payload), name "ready" when a worker is up
+READY = "ready"
+
+routed_updates = registry.counter("bot_worker_updates_total", "Updates routed to each worker")
+
+
+def shard_for(update: Update, workers: int) -> int:
+    """Worker index for an update: same chat -> same worker, so per-chat order is kept"""
+    chat = update.effective_chat
+    user = update.effective_user
+    key = chat.id if chat else (user.id if user else update.update_id)
+    return key % workers
+
+
+# ==================== WORKER PROCESS ====================
+
+def _worker_main(index: int, inbox, outbox):
+    """Process entry point (spawned)"""
+    # Ctrl+C goes to the whole process group, the supervisor stops workers in order
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    logging.basicConfig(
+        format=f'%(asctime)s - worker-{index} - %(name)s - %(levelname)s - %(message)s',
+        level=os.getenv("LOG_LEVEL", "INFO")
+    )
+    # Each worker serves its own /metrics on METRICS_PORT + 1 + index
+    base_port = int(os.getenv("METRICS_PORT", "9100"))
+    if base_port:
+        os.environ["METRICS_PORT"] = str(base_port + 1 + index)
+
+    try:
+        asyncio.run(_worker_loop(index, inbox, outbox))
+    except KeyboardInterrupt:
+        pass
+
+
+async def _worker_loop(index: int, inbox, outbox):
+    from src.bot import setup_application
+
+    events.set_transport(lambda name, payload: outbox.put((index, name, payload)))
+    application = await setup_application(worker_index=index)
+    loop = asyncio.get_running_loop()
+
+    await application.initialize()
+    if application.post_init:
+        await application.post_init(application)
+    try:
+        await application.start()
+        outbox.put((index, READY, {}))
+        logger.info(f"✅ Worker {index} ready")
+
+        while True:
+            message = await loop.run_in_executor(None, inbox.get)
+            if message is None: break
+            if message[0] == "update":
+                await application.update_queue.put(Update.de_json(message[1], application.bot))
+            else:
+                events.dispatch(message[1], message[2])
+    finally:
+        if application.running:
+            await application.stop()
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
+
+
+# ==================== SUPERVISOR ====================
+
+class Supervisor:
+    """
+    Starts the worker processes and relays events between them.
+
+    Updates are pickled as plain dicts onto the owning worker's inbox. Events
+    published by one worker are fanned out to all the others, which keeps
+    license caches, banned word matchers, warn counts and pending approvals
+    consistent across processes.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._ctx = multiprocessing.get_context("spawn")
+        self.inboxes = [self._ctx.Queue() for _ in range(workers)]
+        self.outbox = self._ctx.Queue()
+        self.processes: List[Optional[multiprocessing.Process]] = [None] * workers
+        self._ready = [threading.Event() for _ in range(workers)]
+        self._relay: Optional[threading.Thread] = None
+        self._monitor: Optional[asyncio.Task] = None
+
+    def _spawn(self, index: int):
+        self._ready[index].clear()
+        process = self._ctx.Process(target=_worker_main, args=(index, self.inboxes[index], self.outbox), name=f"worker-{index}")
+        process.start()
+        self.processes[index] = process
+
+    def _wait_ready(self, index: int):
+        while not self._ready[index].wait(1):
+            process = self.processes[index]
+            if not process.is_alive():
+                raise RuntimeError(f"Worker {index} exited during startup (code {process.exitcode})")
+
+    def _relay_events(self):
+        while True:
+            message = self.outbox.get()
+            if message is None: return
+            origin, name, payload = message
+            if name == READY:
+                self._ready[origin].set()
+                continue
+            for index, inbox in enumerate(self.inboxes):
+                if index != origin:
+                    inbox.put(("event", name, payload))
+
+    async def _watch(self):
+        """Restart workers that died (their inbox keeps the queued updates)"""
+        while True:
+            await asyncio.sleep(5)
+            for index, process in enumerate(self.processes):
+                if process is not None and not process.is_alive():
+                    logger.error(f"Worker {index} exited with {process.exitcode}, restarting")
+                    self._spawn(index)
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        self._relay = threading.Thread(target=self._relay_events, name="event-relay", daemon=True)
+        self._relay.start()
+
+        # Worker 0 first: it seeds the database before the others connect
+        self._spawn(0)
+        await loop.run_in_executor(None, self._wait_ready, 0)
+        for index in range(1, self.workers):
+            self._spawn(index)
+        for index in range(1, self.workers):
+            await loop.run_in_executor(None, self._wait_ready, index)
+
+        self._monitor = asyncio.create_task(self._watch())
+        logger.info(f"✅ {self.workers} workers ready")
+
+    async def stop(self):
+        if self._monitor:
+            self._monitor.cancel()
+        for inbox in self.inboxes:
+            inbox.put(None)
+
+        loop = asyncio.get_running_loop()
+        for process in self.processes:
+            if process is None: continue
+            await loop.run_in_executor(None, process.join, 30)
+            if process.is_alive():
+                process.terminate()
+
+        self.outbox.put(None)
+        logger.info("✅ Workers stopped")
+
+    async def route(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        index = shard_for(update, self.workers)
+        self.inboxes[index].put(("update", update.to_dict()))
+        routed_updates.inc(worker=index)
+
+    def queue_depth(self) -> int:
+        return sum(inbox.qsize() for inbox in self.inboxes)
+
+
+def build_supervisor(workers: int) -> Application:
+    """
+    Application that receives updates (polling or webhook, as usual) and
+    hands each one to the worker owning its chat.
+    """
+    token = os.getenv("TELEGRAM_TOKEN")
+    if not token:
+        raise ValueError("TELEGRAM_TOKEN must be set in environment variables")
+
+    supervisor = Supervisor(workers)
+
+    async def on_startup(app):
+        from src.bot import setup_commands
+        registry.gauge("bot_worker_queue_depth", "Updates waiting in worker inboxes", supervisor.queue_depth)
+        start_metrics_server()
+        await supervisor.start()
+        await setup_commands(app)
+
+    async def on_shutdown(app):
+        await supervisor.stop()
+
+    application = (
+        Application.builder()
+        .token(token)
+        .request(InstrumentedRequest(connect_timeout=60, read_timeout=60))
+        .post_init(on_startup)
+        .post_shutdown(on_shutdown)
+        .build()
+    )
+    application.add_handler(TypeHandler(Update, supervisor.route))
+    application.bot_data["supervisor"] = supervisor
+    logger.info(f"🧵 Worker mode: {workers} processes sharded by chat")
+    return application
@@ -0,0 +1,88 @@
+import asyncio
+
+from telegram import ChatMemberUpdated, Update
+
+from src.admin_cache import AdminRoster
+from src.inmemory import RecordingBot
+
+CHAT_ID = -100
+
+
+class SlowBot(RecordingBot):
+    """get_chat_administrators takes a while, or fails when `broken`"""
+
+    def __init__(self, admins, broken: bool = False):
+        super().__init__(admins=admins)
+        self.broken = broken
+
+    async def get_chat_administrators(self, chat_id, **kwargs):
+        await asyncio.sleep(0.02)
+        if self.broken:
+            self._call("get_chat_administrators", chat_id=chat_id)
+            raise RuntimeError("Forbidden: bot is not a member of the chat")
+        return await super().get_chat_administrators(chat_id)
+
+
+ADMIN_RIGHTS = dict.fromkeys([
+    "can_be_edited", "is_anonymous", "can_manage_chat", "can_delete_messages", "can_manage_video_chats",
+    "can_restrict_members", "can_promote_members", "can_change_info", "can_invite_users",
+    "can_post_stories", "can_edit_stories", "can_delete_stories",
+], False)
+
+
+def member(user_id: int, status: str) -> dict:
+    data = {"status": status, "user": {"id": user_id, "is_bot": False, "first_name": "user"}}
+    return {**data, **ADMIN_RIGHTS} if status == "administrator" else data
+
+
+def member_update(user_id: int, old: str, new: str) -> ChatMemberUpdated:
+    return Update.de_json({"update_id": 1, "chat_member": {
+        "chat": {"id": CHAT_ID, "type": "supergroup", "title": "group"},
+        "from": {"id": 10, "is_bot": False, "first_name": "owner"},
+        "date": 0,
+        "old_chat_member": member(user_id, old),
+        "new_chat_member": member(user_id, new),
+    }}, None).chat_member
+
+
+def test_concurrent_misses_make_one_call():
+    async def scenario():
+        roster = AdminRoster()
+        bot = SlowBot({CHAT_ID: [10]})
+        answers = await asyncio.gather(*(roster.is_admin(bot, CHAT_ID, 10) for _ in range(20)))
+        return answers, bot.counts["get_chat_administrators"]
+
+    answers, calls = asyncio.run(scenario())
+    assert all(answers)
+    assert calls == 1
+
+
+def test_failed_load_is_cached_briefly():
+    async def scenario():
+        roster = AdminRoster(negative_ttl=0.1)
+        bot = SlowBot({CHAT_ID: [10]}, broken=True)
+        first = await asyncio.gather(*(roster.get_admins(bot, CHAT_ID) for _ in range(20)))
+        await roster.get_admins(bot, CHAT_ID)
+        calls_while_cached = bot.counts["get_chat_administrators"]
+        await asyncio.sleep(0.12)
+        bot.broken = False
+        return first[0], calls_while_cached, await roster.get_admins(bot, CHAT_ID)
+
+    failed, calls, reloaded = asyncio.run(scenario())
+    assert failed == set()
+    assert calls == 1
+    assert reloaded == {10}
+
+
+def test_member_updates_patch_the_roster():
+    async def scenario():
+        roster = AdminRoster()
+        bot = SlowBot({CHAT_ID: [10]})
+        await roster.get_admins(bot, CHAT_ID)
+        roster.apply_update(member_update(20, "member", "administrator"))
+        promoted = await roster.is_admin(bot, CHAT_ID, 20)
+        roster.apply_update(member_update(10, "administrator", "member"))
+        demoted = await roster.is_admin(bot, CHAT_ID, 10)
+        return promoted, demoted, bot.counts["get_chat_administrators"]
+
+    assert asyncio.run(scenario()) == (True, False, 1)
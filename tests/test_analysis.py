@@ -0,0 +1,33 @@
+import re
+
+import pytest
+
+from src.analysis import normalize_text
+from src.word_matcher import BannedWordMatcher
+
+
+def baseline_normalize(text: str) -> str:
+    """normalize_text before the translate table"""
+    clean = re.sub(r'[^\w\d\u0600-\u06FF]', '', text)
+    clean = clean.replace('_', '')
+    clean = re.sub(r'(.)\1+', r'\1', clean)
+    return clean.lower()
+
+
+@pytest.mark.parametrize("text", [
+    "ت\U000E0041ب\U000E0041ل\U000E0041ی\U000E0041غ",   # tag characters
+    "ت\U000E0100ب\U000E01EFل\U000E0120یغ",               # variation selectors supplement
+    "ت\U0001FB00ب\U0001FB3Cل\U0001FBAFیغ",               # legacy computing symbols
+    "ت\U0001F900ب\U0001FAFFلیغ",                         # emoji
+    "中文广告 تبلیغ",                                      # CJK letters are kept
+    "광고 تبلیغ",                                          # Hangul too
+    "\U00010400\U00010401 spam",                         # astral letters are lowercased, not dropped
+])
+def test_matches_baseline_outside_the_table(text):
+    assert normalize_text(text) == baseline_normalize(text)
+
+
+def test_invisible_characters_do_not_hide_banned_words():
+    matcher = BannedWordMatcher(["تبلیغ"])
+    assert matcher.find("ت\U000E0041ب\U000E0041ل\U000E0041ی\U000E0041غ") is not None
+    assert matcher.find("ت\U000E0100ب\U000E0100ل\U000E0100ی\U000E0100غ") is not None
@@ -0,0 +1,31 @@
+import time
+
+from src.cache import TTLCache
+
+
+def test_entries_expire():
+    cache = TTLCache(ttl=0.05)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=10)
+    assert cache.get("a") == 1
+    time.sleep(0.06)
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+
+
+def test_least_recently_used_evicted_first():
+    cache = TTLCache(ttl=10, max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+
+
+def test_counts_hits_and_misses():
+    cache = TTLCache(ttl=10)
+    cache.set("a", 1)
+    cache.get("a")
+    cache.get("missing")
+    assert (cache.hits, cache.misses) == (1, 1)
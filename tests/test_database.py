@@ -0,0 +1,26 @@
+import pytest
+
+from src.database import DatabaseManager, create_database_manager
+from src.inmemory import InMemoryDatabaseManager
+
+
+class HalfBackend(DatabaseManager):
+    """Implements only the connection, none of the storage methods"""
+
+    def _connect(self):
+        pass
+
+
+def test_incomplete_backend_fails_at_instantiation():
+    with pytest.raises(TypeError, match="abstract"):
+        HalfBackend()
+
+
+def test_complete_backends_instantiate():
+    InMemoryDatabaseManager()
+    create_database_manager("sqlite")
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        create_database_manager("mongodb")
@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+
+from src.database import adb
+from src.deletion_scheduler import DeletionScheduler
+from src.inmemory import InMemoryDatabaseManager, RecordingBot
+
+
+class SlowBot(RecordingBot):
+    async def delete_messages(self, chat_id, message_ids, **kwargs):
+        await asyncio.sleep(0.1)
+        return await super().delete_messages(chat_id, message_ids)
+
+
+@pytest.fixture
+def database():
+    previous = adb.manager
+    adb.manager = InMemoryDatabaseManager()
+    yield adb.manager
+    adb.manager = previous
+
+
+def test_due_deletions_are_grouped_per_chat(database):
+    async def scenario():
+        bot = RecordingBot()
+        scheduler = DeletionScheduler()
+        for chat_id, message_id in [(-100, 1), (-200, 4), (-100, 2), (-100, 3)]:
+            scheduler.schedule(chat_id, message_id, 0)
+        await scheduler.start(bot, restore=False)
+        await asyncio.sleep(0.05)
+        await scheduler.stop()
+        return sorted((args["chat_id"], args["message_ids"]) for _, args in bot.calls), scheduler.stats()
+
+    calls, stats = asyncio.run(scenario())
+    assert calls == [(-200, [4]), (-100, [1, 2, 3])]
+    assert stats == {"queued": 0, "deleted": 4, "requests": 2}
+
+
+def test_pending_deletions_survive_a_restart(database):
+    async def scenario():
+        first = DeletionScheduler()
+        await first.start(RecordingBot(), restore=False)
+        first.schedule(-100, 1, 60)
+        first.schedule(-100, 2, 120)
+        await first.stop()
+        saved = sorted(row["message_id"] for row in database.deletions)
+
+        second = DeletionScheduler()
+        await second.start(RecordingBot())
+        restored = len(second)
+        await second.stop()
+        return saved, restored
+
+    saved, restored = asyncio.run(scenario())
+    assert saved == [1, 2]
+    assert restored == 2
+
+
+def test_stop_finishes_the_round_in_flight(database):
+    async def scenario():
+        bot = SlowBot()
+        scheduler = DeletionScheduler()
+        scheduler.schedule(-100, 1, 0)
+        scheduler.schedule(-100, 2, 0)
+        await scheduler.start(bot, restore=False)
+        await asyncio.sleep(0.02)  # the round is waiting on the Bot API
+        await scheduler.stop()
+        return bot.calls, database.deletions
+
+    calls, persisted = asyncio.run(scenario())
+    assert calls == [("delete_messages", {"chat_id": -100, "message_ids": [1, 2]})]
+    assert persisted == []
@@ -0,0 +1,24 @@
+import os
+import subprocess
+import sys
+
+from src.fingerprint import fingerprint, similarity
+
+TEXT = "cheap followers and likes for your channel, the best offer today"
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def signature_in_subprocess(hash_seed: str) -> str:
+    code = f"from src.fingerprint import fingerprint; print(fingerprint({TEXT!r}).signature)"
+    env = dict(os.environ, PYTHONHASHSEED=hash_seed)
+    return subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, check=True).stdout
+
+
+def test_signature_is_the_same_in_every_process():
+    assert signature_in_subprocess("1") == signature_in_subprocess("2") == f"{fingerprint(TEXT).signature}\n"
+
+
+def test_near_duplicates_are_similar():
+    a = fingerprint(TEXT).signature
+    assert similarity(a, fingerprint(TEXT + "!!").signature) >= 0.7
+    assert similarity(a, fingerprint("a completely different message about the weather").signature) < 0.3
@@ -0,0 +1,37 @@
+from src.flood import FloodDetector
+
+
+def burst(detector: FloodDetector, start: float, count: int, gap: float = 0.1):
+    return [detector.check(-100, 1, now=start + i * gap) for i in range(count)]
+
+
+def test_sixth_quick_message_is_a_flood_and_only_it_is_first():
+    detector = FloodDetector(max_messages=8, window=10, rate=1, burst=5)
+    hits = burst(detector, 100.0, 9)
+    assert hits[:5] == [None] * 5
+    assert hits[5].rule == "rate" and hits[5].first
+    assert all(hit is not None and not hit.first for hit in hits[6:])
+
+
+def test_new_burst_after_the_interval_is_punished_again():
+    detector = FloodDetector(max_messages=8, window=10, rate=1, burst=5)
+    burst(detector, 100.0, 7)
+    assert detector.check(-100, 1, now=105.0) is None  # tokens refilled, still inside the cooldown
+    later = burst(detector, 130.0, 6)
+    assert later[:5] == [None] * 5
+    assert later[5].first
+
+
+def test_sliding_window_resets_after_the_window():
+    detector = FloodDetector(max_messages=3, window=10, rate=100, burst=100)
+    hits = [detector.check(-100, 1, now=t) for t in (100, 101, 102, 103)]
+    assert hits[:3] == [None] * 3
+    assert hits[3].rule == "window" and hits[3].first
+    assert detector.check(-100, 1, now=113.5) is None
+
+
+def test_users_and_chats_are_tracked_separately():
+    detector = FloodDetector(max_messages=8, window=10, rate=1, burst=5)
+    burst(detector, 100.0, 6)
+    assert detector.check(-100, 2, now=100.7) is None
+    assert detector.check(-200, 1, now=100.7) is None
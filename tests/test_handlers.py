@@ -0,0 +1,99 @@
+import asyncio
+
+from telegram import Update
+
+from src.handlers.message_handler import shed_update
+from src.inmemory import RecordingBot
+from src.outbound import outbound
+from src.media_verdicts import media_verdicts
+from src.replay import Replayer, ReplayDatabase
+
+
+def message(update_id: int, chat_id: int, user_id: int, text: str) -> dict:
+    return {"update_id": update_id, "message": {
+        "message_id": update_id,
+        "date": 1_700_000_000 + update_id,
+        "chat": {"id": chat_id, "type": "supergroup", "title": "group"},
+        "from": {"id": user_id, "is_bot": False, "first_name": "user"},
+        "text": text,
+    }}
+
+
+def photo(update_id: int, chat_id: int, user_id: int, file_unique_id: str, caption: str = None) -> dict:
+    data = message(update_id, chat_id, user_id, caption)
+    del data["message"]["text"]
+    data["message"]["photo"] = [{"file_id": file_unique_id, "file_unique_id": file_unique_id, "width": 90, "height": 90}]
+    if caption: data["message"]["caption"] = caption
+    return data
+
+
+def replay(updates, chat_words=None, approved=()):
+    """
+    Actions taken for each update, with `chat_words` {chat_id: [word]} added
+    and the (chat_id, file_unique_id) pairs in `approved` approved first
+    """
+    async def scenario():
+        database = ReplayDatabase(["spam"])
+        replayer = Replayer(RecordingBot(), database)
+        await replayer.start()
+        try:
+            for chat_id, words in (chat_words or {}).items():
+                for word in words:
+                    database.add_banned_word(word, chat_id)
+            for chat_id, file_unique_id in approved:
+                await media_verdicts.record(chat_id, file_unique_id, True)
+            decisions = []
+            for data in updates:
+                update = Update.de_json(data, replayer.bot)
+                decisions.append((await replayer.process(update))["actions"])
+            return decisions
+        finally:
+            await replayer.stop()
+
+    return asyncio.run(scenario())
+
+
+def test_chat_word_does_not_reject_the_message_elsewhere():
+    text = "order the best pepperoni pizza in town from our shop today"
+    first, elsewhere = replay(
+        [message(1, -100, 1, text), message(2, -200, 2, text)],
+        chat_words={-100: ["pepperoni"]},
+    )
+    assert first == ["delete", "message", "warn"]
+    assert elsewhere == []
+
+
+def test_global_word_rejects_near_duplicates_everywhere():
+    text = "cheap followers and likes for your channel, the best spam offer today"
+    reworded = "cheap followers and likes for your channel, the best offer today"
+    first, elsewhere = replay([message(1, -100, 1, text), message(2, -200, 2, reworded)])
+    assert first == ["delete", "message", "warn"]
+    assert elsewhere == ["delete", "message", "warn"]
+
+
+def test_approved_media_caption_is_still_filtered():
+    approved = [(-100, "cat")]
+    clean, link, word = replay([
+        photo(1, -100, 1, "cat"),
+        photo(2, -100, 2, "cat", caption="join t.me/cheap_followers"),
+        photo(3, -100, 3, "cat", caption="best spam here"),
+    ], approved=approved)
+    assert clean == []
+    assert link == ["delete", "message", "warn"]
+    assert word == ["delete", "message", "warn"]
+
+
+def test_overflow_deletes_non_admin_messages_only():
+    async def scenario():
+        bot = RecordingBot(admins={-300: [10]})
+        replayer = Replayer(bot, ReplayDatabase(["spam"]))
+        await replayer.start()
+        try:
+            await shed_update(Update.de_json(message(1, -300, 1, "hello"), bot))
+            await shed_update(Update.de_json(message(2, -300, 10, "hello"), bot))
+            await outbound.drain()
+            return [(method, args.get("message_id")) for method, args in bot.calls if method != "get_chat_administrators"]
+        finally:
+            await replayer.stop()
+
+    assert asyncio.run(scenario()) == [("delete_message", 1)]
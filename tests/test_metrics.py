@@ -0,0 +1,22 @@
+import threading
+
+from src.metrics import Counter
+
+
+def test_counter_render_while_incremented_from_threads():
+    counter = Counter("test_total", "test")
+
+    def work(n):
+        for i in range(2000):
+            counter.inc(method=f"m{(n * 2000 + i) % 500}")
+
+    threads = [threading.Thread(target=work, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for _ in range(50):
+        counter.render()  # must not fail with "dictionary changed size during iteration"
+    for thread in threads:
+        thread.join()
+
+    assert sum(counter.value(method=f"m{i}") for i in range(500)) == 8000
+    assert len(counter.render()) == 2 + 500
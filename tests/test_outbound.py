@@ -0,0 +1,82 @@
+import asyncio
+import time
+
+import pytest
+from telegram.error import RetryAfter
+
+from src.inmemory import RecordingBot
+from src.outbound import OutboundDropped, OutboundScheduler
+
+
+class ThrottledBot(RecordingBot):
+    """Answers 429 to the first `throttled` bans, records when each call went out"""
+
+    def __init__(self, retry_after: float, throttled: int = 1):
+        super().__init__()
+        self.retry_after = retry_after
+        self.throttled = throttled
+        self.sent_at = {}
+
+    async def ban_chat_member(self, chat_id, user_id, **kwargs):
+        if self.throttled:
+            self.throttled -= 1
+            raise RetryAfter(self.retry_after)
+        self.sent_at["ban_chat_member"] = time.monotonic()
+        return await super().ban_chat_member(chat_id, user_id)
+
+    async def delete_message(self, chat_id, message_id, **kwargs):
+        self.sent_at["delete_message"] = time.monotonic()
+        return await super().delete_message(chat_id, message_id)
+
+
+def test_dropped_ban_fails_its_future():
+    async def scenario():
+        scheduler = OutboundScheduler()
+        scheduler.max_retries = 0
+        scheduler.start(ThrottledBot(retry_after=0.01))
+        try:
+            await scheduler.ban(-100, 1)
+        finally:
+            await scheduler.stop()
+
+    with pytest.raises(OutboundDropped):
+        asyncio.run(scenario())
+
+
+def test_retry_after_pauses_deletes_in_the_chat():
+    async def scenario():
+        scheduler = OutboundScheduler()
+        bot = ThrottledBot(retry_after=0.2)
+        scheduler.start(bot)
+        started = time.monotonic()
+        ban = scheduler.ban(-100, 1)
+        await asyncio.sleep(0.05)  # the 429 has come back
+        await scheduler.delete(-100, 5)
+        await ban
+        await scheduler.stop()
+        return bot.sent_at["delete_message"] - started, bot.sent_at["ban_chat_member"] - started
+
+    deleted, banned = asyncio.run(scenario())
+    assert deleted >= 0.2
+    assert banned >= 0.2
+
+
+def test_other_chats_are_not_paused():
+    async def scenario():
+        scheduler = OutboundScheduler()
+        bot = ThrottledBot(retry_after=0.5)
+        scheduler.start(bot)
+        started = time.monotonic()
+        scheduler.ban(-100, 1)
+        await asyncio.sleep(0.05)
+        await scheduler.delete(-200, 5)
+        await scheduler.stop()
+        return bot.sent_at["delete_message"] - started
+
+    assert asyncio.run(scenario()) < 0.5
+
+
+def test_global_rate_is_shared_between_workers(monkeypatch):
+    monkeypatch.setenv("WORKERS", "3")
+    monkeypatch.setenv("OUTBOUND_GLOBAL_RATE", "30")
+    assert OutboundScheduler().global_bucket.rate == 10
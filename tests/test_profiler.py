@@ -0,0 +1,56 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from telegram import Update
+
+from src import events
+from src.handlers.moderation import OWNER_ID, profile, run_profile_command
+from src.inmemory import RecordingBot
+from src.profiler import Profiler, profiler
+
+
+def test_nested_stage_time_counts_only_once():
+    timer = Profiler()
+    timer.stages = True
+
+    @timer.stage("inner")
+    async def inner():
+        await asyncio.sleep(0.05)
+
+    @timer.stage("outer")
+    async def outer():
+        await inner()
+        time.sleep(0.01)
+
+    asyncio.run(outer())
+    outer_time = timer._stage_windows["outer"].stats()["p50"]
+    inner_time = timer._stage_windows["inner"].stats()["p50"]
+    assert inner_time >= 0.05
+    assert 0.01 <= outer_time < 0.04
+
+
+def test_profile_command_is_broadcast_to_other_workers(monkeypatch, tmp_path):
+    monkeypatch.setattr(profiler, "directory", str(tmp_path))
+    published = []
+    events.set_transport(lambda name, payload: published.append((name, payload)))
+    bot = RecordingBot()
+    update = Update.de_json({"update_id": 1, "message": {
+        "message_id": 1, "date": 0, "text": "/profile 30",
+        "chat": {"id": OWNER_ID, "type": "private"},
+        "from": {"id": OWNER_ID, "is_bot": False, "first_name": "owner"},
+    }}, bot)
+
+    async def scenario():
+        await profile(update, SimpleNamespace(bot=bot, args=["30"]))
+        running = profiler.running
+        run_profile_command(bot, "stop")
+        await asyncio.sleep(0)
+        return running
+
+    try:
+        assert asyncio.run(scenario())
+    finally:
+        events.set_transport(None)
+    assert published == [(events.PROFILE_COMMAND, {"action": "start", "seconds": 30.0, "updates": None, "sampling": False})]
+    assert not profiler.running
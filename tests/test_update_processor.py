@@ -0,0 +1,54 @@
+import asyncio
+
+from telegram import Update
+
+from src.update_processor import ChatOrderedUpdateProcessor
+
+
+def update(update_id: int, chat_id: int) -> Update:
+    return Update.de_json({"update_id": update_id, "message": {
+        "message_id": update_id, "date": 0,
+        "chat": {"id": chat_id, "type": "supergroup", "title": "group"},
+        "from": {"id": 1, "is_bot": False, "first_name": "user"},
+        "text": "hi",
+    }}, None)
+
+
+def test_chat_updates_run_in_order():
+    async def scenario():
+        processor = ChatOrderedUpdateProcessor(concurrency=8, chat_queue=10)
+        order = []
+
+        async def handle(n, delay):
+            await asyncio.sleep(delay)
+            order.append(n)
+
+        await asyncio.gather(*(processor.do_process_update(update(n, -100), handle(n, 0.01 * (3 - n))) for n in range(3)))
+        return order
+
+    assert asyncio.run(scenario()) == [0, 1, 2]
+
+
+def test_full_chat_queue_hands_updates_to_overflow():
+    async def scenario():
+        overflow = []
+
+        async def on_overflow(u):
+            overflow.append(u.update_id)
+
+        processor = ChatOrderedUpdateProcessor(concurrency=8, chat_queue=1, on_overflow=on_overflow)
+        release = asyncio.Event()
+        handled = []
+
+        async def handle(n):
+            await release.wait()
+            handled.append(n)
+
+        tasks = [asyncio.create_task(processor.do_process_update(update(n, -100), handle(n))) for n in range(3)]
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(*tasks)
+        return handled, overflow
+
+    assert asyncio.run(scenario()) == ([0, 1], [2])
@@ -0,0 +1,50 @@
+import asyncio
+
+import pytest
+
+from src.database import adb
+from src.inmemory import InMemoryDatabaseManager
+from src.warn_ledger import WarnLedger
+
+
+@pytest.fixture
+def database():
+    previous = adb.manager
+    adb.manager = InMemoryDatabaseManager(latency=0.05)
+    yield adb.manager
+    adb.manager = previous
+
+
+def test_counts_locally_after_first_warn(database):
+    async def scenario():
+        ledger = WarnLedger()
+        assert await ledger.add_warn(1) == 1
+        assert await ledger.add_warn(1) == 2
+        assert await ledger.add_warn(1) == 3
+        await ledger.drain()
+        return ledger.get(1), database.users[1]["warn_count"]
+
+    assert asyncio.run(scenario()) == (3, 3)
+
+
+def test_reset_wins_over_persist_in_flight(database):
+    async def scenario():
+        ledger = WarnLedger()
+        await ledger.add_warn(1)
+        await ledger.add_warn(1)   # persisted in the background, answers 2
+        ledger.reset(1)            # /unmute while that call is in flight
+        await ledger.drain()
+        return ledger.get(1)
+
+    assert asyncio.run(scenario()) == 0
+
+
+def test_reset_during_first_warn_is_not_recorded(database):
+    async def scenario():
+        ledger = WarnLedger()
+        warn = asyncio.create_task(ledger.add_warn(1))
+        await asyncio.sleep(0.01)
+        ledger.reset(1)
+        return await warn, ledger.get(1)
+
+    assert asyncio.run(scenario()) == (None, 0)
@@ -0,0 +1,70 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+from src.webhook import WebhookServer
+
+UPDATE = json.dumps({"update_id": 1, "message": {
+    "message_id": 1, "date": 0, "chat": {"id": -1, "type": "supergroup"},
+    "from": {"id": 2, "is_bot": False, "first_name": "u"}, "text": "hi",
+}}).encode()
+
+
+async def _request(server: WebhookServer, head: str, body: bytes = b"") -> str:
+    reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+    writer.write(head.encode() + b"\r\n" + body)
+    await writer.drain()
+    status = (await reader.readline()).decode().split(" ", 1)[1].strip()
+    writer.close()
+    return status
+
+
+def _run(scenario):
+    async def main():
+        application = SimpleNamespace(bot=None, update_queue=asyncio.Queue())
+        server = WebhookServer(application, "127.0.0.1", 0, "telegram", "secret", max_body=1024, read_timeout=0.2)
+        await server.start()
+        server.port = server._server.sockets[0].getsockname()[1]
+        try:
+            return await scenario(server, application)
+        finally:
+            await server.stop()
+    return asyncio.run(main())
+
+
+def test_accepts_update():
+    async def scenario(server, application):
+        head = f"POST /telegram HTTP/1.1\r\nX-Telegram-Bot-Api-Secret-Token: secret\r\nContent-Length: {len(UPDATE)}\r\n"
+        return await _request(server, head, UPDATE), application.update_queue.qsize()
+
+    assert _run(scenario) == ("200 OK", 1)
+
+
+def test_secret_checked_before_body():
+    async def scenario(server, application):
+        # The body never arrives: a wrong secret must not wait for it
+        head = "POST /telegram HTTP/1.1\r\nX-Telegram-Bot-Api-Secret-Token: wrong\r\nContent-Length: 100000000\r\n"
+        return await asyncio.wait_for(_request(server, head), 1)
+
+    assert _run(scenario) == "403 Forbidden"
+
+
+def test_rejects_oversized_and_missing_length():
+    async def scenario(server, application):
+        big = await _request(server, "POST /telegram HTTP/1.1\r\nX-Telegram-Bot-Api-Secret-Token: secret\r\nContent-Length: 2048\r\n")
+        missing = await _request(server, "POST /telegram HTTP/1.1\r\nX-Telegram-Bot-Api-Secret-Token: secret\r\n")
+        return big, missing, application.update_queue.qsize()
+
+    assert _run(scenario) == ("413 Payload Too Large", "411 Length Required", 0)
+
+
+def test_slow_body_times_out():
+    async def scenario(server, application):
+        reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+        writer.write(b"POST /telegram HTTP/1.1\r\nX-Telegram-Bot-Api-Secret-Token: secret\r\nContent-Length: 10\r\n\r\n")
+        await writer.drain()
+        closed = await asyncio.wait_for(reader.read(), 1)
+        writer.close()
+        return closed
+
+    assert _run(scenario) == b""
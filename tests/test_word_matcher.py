@@ -0,0 +1,28 @@
+from src.inmemory import InMemoryDatabaseManager
+from src.word_matcher import BannedWordMatcher, LayeredMatcher
+
+
+def test_finds_raw_and_obfuscated_words():
+    matcher = BannedWordMatcher(["تبلیغ", "Spam"])
+    assert matcher.find("این یک تبلیغ است").word == "تبلیغ"
+    assert matcher.find("ت.ب.ل.ي.غ").normalized
+    assert matcher.find("S P A M now").word == "Spam"
+    assert matcher.find("سلام دوستان") is None
+
+
+def test_layered_overlay_checked_on_top_of_base():
+    base = BannedWordMatcher(["spam"])
+    layered = LayeredMatcher(base, BannedWordMatcher(["pizza"]))
+    assert layered.find("free pizza").word == "pizza"
+    assert layered.find("spam here").word == "spam"
+    assert base.find("free pizza") is None
+
+
+def test_chat_words_stay_in_their_chat():
+    database = InMemoryDatabaseManager(banned_words=["spam"])
+    database.initialize()
+    database.add_banned_word("pizza", chat_id=-100)
+
+    assert database.get_chat_word_matcher(-100).find("free pizza") is not None
+    assert database.get_chat_word_matcher(-200).find("free pizza") is None
+    assert database.get_banned_word_matcher().find("free pizza") is None
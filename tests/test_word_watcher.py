@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+from src.database import adb
+from src.inmemory import InMemoryDatabaseManager
+from src.word_watcher import BannedWordsWatcher, LocalChangeNotifier
+
+CHAT_ID = -100
+
+
+@pytest.fixture
+def database():
+    previous = adb.manager
+    adb.manager = InMemoryDatabaseManager(banned_words=["spam"])
+    adb.manager.initialize()
+    yield adb.manager
+    adb.manager = previous
+
+
+async def _eventually(condition, timeout: float = 2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not await condition():
+        assert asyncio.get_running_loop().time() < deadline, "change was not picked up"
+        await asyncio.sleep(0.01)
+
+
+def test_global_change_reloads_matcher(database):
+    async def scenario():
+        notifier = LocalChangeNotifier()
+        watcher = BannedWordsWatcher(interval=60, notifier=notifier)
+        await watcher.start()
+        try:
+            assert (await adb.get_banned_word_matcher()).find("free pizza") is None
+
+            # Another instance adds a word: only the notifier tells us
+            database.words.append("pizza")
+            notifier.notify()
+
+            async def reloaded():
+                return (await adb.get_banned_word_matcher()).find("free pizza") is not None
+            await _eventually(reloaded)
+            return watcher.reloads
+        finally:
+            await watcher.stop()
+
+    assert asyncio.run(scenario()) == 1
+
+
+def test_chat_change_only_drops_that_chat(database):
+    async def scenario():
+        notifier = LocalChangeNotifier()
+        watcher = BannedWordsWatcher(interval=60, notifier=notifier)
+        await watcher.start()
+        try:
+            await adb.get_banned_word_matcher(CHAT_ID)
+            await adb.get_banned_word_matcher(CHAT_ID - 1)
+
+            database.chat_words[CHAT_ID] = ["pizza"]
+            notifier.notify(CHAT_ID)
+
+            async def reloaded():
+                return (await adb.get_banned_word_matcher(CHAT_ID)).find("free pizza") is not None
+            await _eventually(reloaded)
+            return (
+                (await adb.get_banned_word_matcher(CHAT_ID - 1)).find("free pizza"),
+                watcher.reloads,
+            )
+        finally:
+            await watcher.stop()
+
+    assert asyncio.run(scenario()) == (None, 0)
+
+
+def test_first_answer_is_only_a_baseline(database):
+    async def scenario():
+        notifier = LocalChangeNotifier()
+        notifier.notify()
+        watcher = BannedWordsWatcher(interval=60, notifier=notifier)
+        return await watcher.check(), watcher.version
+
+    assert asyncio.run(scenario()) == (set(), 1)